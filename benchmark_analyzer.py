@@ -0,0 +1,189 @@
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+from benchmark_pipeline import percentile
+from processor.analyzer import Analyzer
+from processor.keyword_matcher import KeywordMatcher
+
+DEFAULT_SEED = 46
+DEFAULT_DOCS = 20
+KEYWORD_COUNTS = [10, 100, 1000, 10000]
+DOC_LENGTHS = [500, 5000, 50000]
+BATCH_SIZES = [1, 8, 32]
+# The other dimensions while one is swept (about today's keywords.yaml and max_chars)
+BASE = {'keywords': 260, 'doc_length': 3000, 'batch_size': 1}
+
+FINANCE_WORDS = (
+    "revenue earnings guidance quarter shares market growth demand margin outlook contract approval "
+    "partnership acquisition offering dividend buyback forecast analysts investors board management "
+    "strong weak record higher lower expanded reduced raised cut new major"
+).split()
+FILLER_WORDS = (
+    "the a of and to in that said company for on with as its was will by at from this year which "
+    "after during about more than also their has have been expects reported results period"
+).split()
+EXCHANGES = ["NASDAQ", "NYSE", "TSX", "NYSE American"]
+SYLLABLES = "ba be bi bo bu ca ce co cu da de di do fa fe fi fo ga ge go ka ke ki la le li lo ma me mi mo na ne ni no pa pe po ra re ri ro sa se si so ta te ti to va ve vi vo za ze".split()
+
+
+def pseudo_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_keywords(count, seed=DEFAULT_SEED):
+    """
+    `count` distinct keyword phrases of 1-3 words, about half led by a common
+    finance word (so they share matcher buckets, like the real list), split
+    into positive and negative lists with weights. Same seed, same keywords.
+    """
+    rng = random.Random(f"keywords-{seed}")
+    phrases = []
+    seen = set()
+    while len(phrases) < count:
+        words = [rng.choice(FINANCE_WORDS) if rng.random() < 0.5 else pseudo_word(rng)]
+        words += [rng.choice(FINANCE_WORDS + [pseudo_word(rng)]) for _ in range(rng.randint(0, 2))]
+        phrase = " ".join(words)
+        if phrase not in seen:
+            seen.add(phrase)
+            phrases.append(phrase)
+    positive = {phrase: round(rng.uniform(0.2, 1.0), 2) for phrase in phrases[0::2]}
+    negative = {phrase: round(rng.uniform(0.2, 1.0), 2) for phrase in phrases[1::2]}
+    return positive, negative
+
+
+def synthetic_document(length, keywords, seed=DEFAULT_SEED, n=0, keyword_every=40):
+    """
+    About `length` characters of sentence-shaped text with a company and
+    ticker up front and a keyword phrase every ~`keyword_every` words.
+    """
+    rng = random.Random(f"document-{seed}-{length}-{n}")
+    ticker = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rng.randint(3, 4)))
+    parts = [f"{pseudo_word(rng).title()} Corp ({rng.choice(EXCHANGES)}: {ticker}) said today that"]
+    size = len(parts[0])
+    sentence = 0
+    while size < length:
+        if keywords and rng.randrange(keyword_every) == 0:
+            word = rng.choice(keywords)
+        else:
+            word = rng.choice(FILLER_WORDS + FINANCE_WORDS)
+        sentence += 1
+        if sentence > rng.randint(12, 25):
+            word += "."
+            sentence = 0
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:length]
+
+
+def make_analyzer(positive, negative, thresholds=None):
+    """An Analyzer scoring with the given {keyword: weight} lists instead of keywords.yaml."""
+    analyzer = Analyzer(thresholds=thresholds, snapshot_path=None)
+    analyzer.positive_keywords = list(positive)
+    analyzer.negative_keywords = list(negative)
+    analyzer.positive_weights = dict(positive)
+    analyzer.negative_weights = dict(negative)
+    analyzer.keyword_matcher = KeywordMatcher(analyzer.positive_keywords + analyzer.negative_keywords)
+    return analyzer
+
+
+def measure(keywords, doc_length, batch_size, docs=DEFAULT_DOCS, seed=DEFAULT_SEED):
+    """Throughput, latency and memory of Analyzer.analyze for one point of the sweep."""
+    positive, negative = synthetic_keywords(keywords, seed)
+    analyzer = make_analyzer(positive, negative)
+    phrases = list(positive) + list(negative)
+
+    # Cost of building the matcher for this many keywords
+    tracemalloc.start()
+    started = time.perf_counter()
+    matcher = KeywordMatcher(phrases)
+    build_seconds = time.perf_counter() - started
+    matcher_kib = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    del matcher
+
+    corpus = [synthetic_document(doc_length, phrases, seed, n) for n in range(docs)]
+    batches = [corpus[i:i + batch_size] for i in range(0, len(corpus), batch_size)]
+
+    # Warm-up, then timed passes (no tracing: tracemalloc slows allocation-heavy code)
+    analyzer.analyze(batches[0])
+    latencies = []
+    matches = 0
+    started = time.perf_counter()
+    for batch in batches:
+        batch_started = time.perf_counter()
+        results = analyzer.analyze(batch)
+        latencies.append((time.perf_counter() - batch_started) * 1000 / len(batch))
+        matches += sum(r['positive_matches'] + r['negative_matches'] for r in results)
+    elapsed = time.perf_counter() - started
+
+    # Separate pass for the allocation peak of one batch
+    tracemalloc.start()
+    analyzer.analyze(batches[0])
+    peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    return {
+        'keywords': keywords,
+        'doc_length': doc_length,
+        'batch_size': batch_size,
+        'docs': docs,
+        'docs_per_second': round(docs / elapsed, 2),
+        'chars_per_second': round(docs * doc_length / elapsed),
+        'p50_ms_per_doc': round(statistics.median(latencies), 3),
+        'p95_ms_per_doc': round(percentile(latencies, 0.95), 3),
+        'keyword_matches_per_doc': round(matches / docs, 1),
+        'matcher_build_ms': round(build_seconds * 1000, 1),
+        'matcher_kib': round(matcher_kib, 1),
+        'analyze_peak_kib': round(peak_kib, 1),
+    }
+
+
+def sweep_points(keyword_counts, doc_lengths, batch_sizes, grid=False):
+    """(keywords, doc_length, batch_size) to measure: each dimension around BASE, or the full grid."""
+    if grid:
+        return list(itertools.product(keyword_counts, doc_lengths, batch_sizes))
+    points = [(k, BASE['doc_length'], BASE['batch_size']) for k in keyword_counts]
+    points += [(BASE['keywords'], length, BASE['batch_size']) for length in doc_lengths]
+    points += [(BASE['keywords'], BASE['doc_length'], size) for size in batch_sizes]
+    return list(dict.fromkeys(points))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Analyzer scaling benchmark over a seeded synthetic corpus.")
+    arg_parser.add_argument('--keywords', type=int, nargs='+', default=KEYWORD_COUNTS)
+    arg_parser.add_argument('--lengths', type=int, nargs='+', default=DOC_LENGTHS, help="document lengths in characters")
+    arg_parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    arg_parser.add_argument('--docs', type=int, default=DEFAULT_DOCS, help="documents per measurement")
+    arg_parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    arg_parser.add_argument('--grid', action='store_true', help="measure every combination instead of one sweep per dimension")
+    arg_parser.add_argument('--output', help="write the results as JSON to this file")
+    args = arg_parser.parse_args()
+
+    results = []
+    print(f"{'keywords':>9}{'length':>8}{'batch':>6}{'docs/s':>9}{'p95 ms':>9}{'matches':>9}{'build ms':>10}"
+          f"{'matcher KiB':>12}{'peak KiB':>10}")
+    for keywords, length, batch_size in sweep_points(args.keywords, args.lengths, args.batch_sizes, args.grid):
+        row = measure(keywords, length, batch_size, docs=args.docs, seed=args.seed)
+        results.append(row)
+        print(f"{keywords:>9}{length:>8}{batch_size:>6}{row['docs_per_second']:>9}{row['p95_ms_per_doc']:>9}"
+              f"{row['keyword_matches_per_doc']:>9}{row['matcher_build_ms']:>10}{row['matcher_kib']:>12}{row['analyze_peak_kib']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'machine': f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+                'seed': args.seed,
+                'docs': args.docs,
+                'results': results,
+            }, f, indent=2)
+        print(f"Wrote {len(results)} measurements to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import json
+import platform
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark_pipeline import peak_rss_mib, percentile
+from config.log_setup import configure_logging, stop_logging
+from fake_news_server import DEFAULT_SEED, FakeNewsServer, parse_error_rates
+from scraper.fetcher import Fetcher
+from scraper.sitemap_parser import SitemapParser
+
+DEFAULT_HOSTS = 200
+DEFAULT_URLS = 50
+DEFAULT_CONCURRENCY = 64
+DEFAULT_ERRORS = "403=0.01,429=0.01,500=0.01,503=0.01"
+
+
+def make_fetcher(delay=0.0, backoff_scale=0.0):
+    """A Fetcher for the local server: plain HTTP, and politeness delays and backoff scaled down."""
+    return Fetcher(delay_min=delay, delay_max=delay, backoff_scale=backoff_scale, upgrade_http=False)
+
+
+def run_load(server, urls_per_host=DEFAULT_URLS, concurrency=DEFAULT_CONCURRENCY, fetchers_per_host=1,
+             delay=0.0, backoff_scale=0.0):
+    """
+    Discovers up to `urls_per_host` article URLs on every host through its
+    sitemap (SitemapParser), then fetches them with `fetchers_per_host`
+    Fetchers per host (each its own session, like several sites on one
+    domain), `concurrency` fetchers at a time. Returns the client-side
+    numbers merged with the server's counts.
+    """
+    server.reset_stats()
+    lock = threading.Lock()
+    latencies = []
+    outcome = {'ok': 0, 'failed': 0, 'bytes': 0}
+
+    def discover(host):
+        fetcher = make_fetcher(delay, backoff_scale)
+        return SitemapParser(fetcher).get_article_urls(server.sitemap_url(host), urls_per_host, ['/news/'])
+
+    def fetch_all(urls):
+        fetcher = make_fetcher(delay, backoff_scale)
+        for url in urls:
+            started = time.perf_counter()
+            text = fetcher.fetch(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                outcome['ok' if text is not None else 'failed'] += 1
+                outcome['bytes'] += len(text or "")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        discovered = dict(zip(server.hosts, pool.map(discover, server.hosts)))
+    discover_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        batches = [urls[k::fetchers_per_host] for urls in discovered.values() for k in range(fetchers_per_host)]
+        list(pool.map(fetch_all, [batch for batch in batches if batch]))
+    fetch_seconds = time.perf_counter() - started
+
+    urls = sum(len(found) for found in discovered.values())
+    server_stats = server.stats()
+    return {
+        'hosts': len(server.hosts),
+        'urls_per_host': urls_per_host,
+        'concurrency': concurrency,
+        'fetchers_per_host': fetchers_per_host,
+        'urls_discovered': urls,
+        'hosts_short_of_urls': sum(1 for found in discovered.values() if len(found) < urls_per_host),
+        'urls_ok': outcome['ok'],
+        'urls_failed': outcome['failed'],
+        'discover_seconds': round(discover_seconds, 2),
+        'fetch_seconds': round(fetch_seconds, 2),
+        'wall_seconds': round(discover_seconds + fetch_seconds, 2),
+        'urls_per_second': round(urls / fetch_seconds, 1) if fetch_seconds else None,
+        'requests_per_second': round(server_stats['requests'] / (discover_seconds + fetch_seconds), 1),
+        'mib_per_second': round(outcome['bytes'] / (1024 * 1024) / fetch_seconds, 2) if fetch_seconds else None,
+        'p50_ms_per_url': round(statistics.median(latencies), 1) if latencies else None,
+        'p95_ms_per_url': round(percentile(latencies, 0.95), 1) if latencies else None,
+        'max_ms_per_url': round(max(latencies), 1) if latencies else None,
+        'server': server_stats,
+        'peak_rss_mib': peak_rss_mib(),
+    }
+
+
+def format_results(results):
+    server = results['server']
+    return "\n".join([
+        f"{results['hosts']} hosts x {results['urls_per_host']} URLs, {results['concurrency']} workers, "
+        f"{results['fetchers_per_host']} fetcher(s) per host",
+        f"discover  {results['urls_discovered']} URLs in {results['discover_seconds']}s "
+        f"({results['hosts_short_of_urls']} hosts short)",
+        f"fetch     {results['urls_ok']} ok, {results['urls_failed']} failed in {results['fetch_seconds']}s: "
+        f"{results['urls_per_second']} URLs/s, {results['mib_per_second']} MiB/s",
+        f"latency   p50 {results['p50_ms_per_url']} ms, p95 {results['p95_ms_per_url']} ms, "
+        f"max {results['max_ms_per_url']} ms per URL (retries included)",
+        f"server    {server['requests']} requests ({results['requests_per_second']}/s), "
+        f"status {server['status_counts']}",
+        f"errors    {server['retries']} retries over {server['retried_paths']} paths, "
+        f"gave up on {server['final_errors'] or 'none'}; {server['rejected_connections']} connections "
+        f"over the limit (peak {server['peak_connections_per_host']} per host)",
+        f"wall      {results['wall_seconds']}s, peak RSS {results['peak_rss_mib']} MiB",
+    ])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Load-test Fetcher and SitemapParser against local fake news hosts.")
+    arg_parser.add_argument('--hosts', type=int, default=DEFAULT_HOSTS)
+    arg_parser.add_argument('--urls', type=int, default=DEFAULT_URLS, help="article URLs fetched per host")
+    arg_parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="fetchers running at once")
+    arg_parser.add_argument('--fetchers-per-host', type=int, default=1)
+    arg_parser.add_argument('--latency', type=float, default=0.02, help="server seconds per response")
+    arg_parser.add_argument('--jitter', type=float, default=0.01)
+    arg_parser.add_argument('--errors', default=DEFAULT_ERRORS, help="injected statuses, e.g. 403=0.02,503=0.01")
+    arg_parser.add_argument('--max-connections', type=int, help="concurrent connections allowed per host")
+    arg_parser.add_argument('--retry-after', type=int, default=0, help="Retry-After seconds on 429/503")
+    arg_parser.add_argument('--article-bytes', type=int, default=20000)
+    arg_parser.add_argument('--delay', type=float, default=0.0, help="Fetcher pause after each request (seconds)")
+    arg_parser.add_argument('--backoff-scale', type=float, default=0.01, help="multiplies Fetcher's retry backoff")
+    arg_parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    arg_parser.add_argument('--output', help="write the results as JSON to this file")
+    # Fetcher logs every injected failure; the report counts them instead
+    arg_parser.add_argument('--log-level', default="ERROR")
+    args = arg_parser.parse_args()
+    configure_logging(args.log_level)
+
+    server = FakeNewsServer(hosts=args.hosts, articles=args.urls, latency=args.latency, jitter=args.jitter,
+                            error_rates=parse_error_rates(args.errors), max_connections=args.max_connections,
+                            retry_after=args.retry_after, article_bytes=args.article_bytes, seed=args.seed)
+    with server:
+        results = run_load(server, args.urls, args.concurrency, args.fetchers_per_host, args.delay, args.backoff_scale)
+    results['machine'] = f"{platform.system()} {platform.machine()} / Python {platform.python_version()}"
+    results['server_config'] = {'latency': args.latency, 'jitter': args.jitter, 'errors': args.errors,
+                                'max_connections': args.max_connections, 'retry_after': args.retry_after}
+    stop_logging()
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import yaml
+
+from main import get_alert_thresholds
+from processor.analyzer import Analyzer
+from scraper.parser import Parser
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CORPUS_PATH = "fixtures/bench/corpus.json"
+BASELINE_PATH = "fixtures/bench/baseline.json"
+SITES_CONFIG_PATH = "config/sites.yaml"
+STAGES = ['parse', 'discover', 'extract', 'format', 'analyze']
+
+# Allowed slowdown against the baseline before the run fails
+DEFAULT_TOLERANCE = 0.25
+# Peak RSS may grow this much
+RSS_TOLERANCE = 0.20
+# Stage p95 changes smaller than this are timer noise, not regressions
+MIN_P95_DELTA_MS = 0.5
+
+
+def load_corpus(path=CORPUS_PATH):
+    """Corpus entries with their page loaded into 'html' (a Next.js JSON capture becomes its listing page)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    for doc in corpus:
+        with open(doc['path'], 'r', encoding='utf-8') as f:
+            content = f.read()
+        if doc['kind'] == 'listing_json':
+            content = f'<html><body><script id="__NEXT_DATA__" type="application/json">{content}</script></body></html>'
+        doc['html'] = content
+    return corpus
+
+
+def run_document(parser, analyzer, doc, site, timings):
+    """One page through parse -> discover or extract -> format -> analyze; returns documents analyzed."""
+    def timed(stage, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings[stage].append((time.perf_counter() - started) * 1000)
+        return result
+
+    soup = timed('parse', parser.parse, doc['html'])
+
+    if doc['kind'] in ('listing', 'listing_json'):
+        if site.get('type') == 'yahoo_news':
+            timed('discover', parser.extract_yahoo_news_links, soup, doc['url'])
+        else:
+            timed('discover', parser.extract_link_records, soup, doc['url'], site.get('listing'))
+        return 0
+
+    def extract():
+        if doc['kind'] == 'multi_story':
+            stories = parser.extract_multiple_stories(soup, site.get('container_selector'),
+                                                      site.get('title_selector'), site.get('content_selector'))
+            return [f"{story['title']}\n\n{story['content']}" for story in stories]
+        text = parser.extract_text(soup, site.get('content_selector') or 'p')
+        title = parser.extract_title(soup, site.get('title_selector'))
+        parser.extract_date(soup, site.get('date_regex'), site.get('date_format'), doc['url'])
+        return [f"{title}\n\n{text}" if title else text]
+
+    texts = timed('extract', extract)
+    max_chars = site.get('max_chars', 3000)
+    for text in texts:
+        formatted = timed('format', parser.format_for_analysis, text, doc['url'], max_chars)
+        if formatted:
+            timed('analyze', analyzer.analyze, [formatted])
+    return len(texts)
+
+
+def peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_benchmark(iterations=5, corpus_path=CORPUS_PATH):
+    """
+    Runs the corpus `iterations` times after one warm-up pass. Every call is
+    made in the same order each pass, so each call's latency is taken as its
+    median over the passes before the stage percentiles are computed; a GC
+    pause or a busy neighbour in one pass does not read as a regression.
+    Throughput is the median pass's.
+    """
+    with open(SITES_CONFIG_PATH, 'r') as f:
+        sites_config = yaml.safe_load(f)
+    sites = {site['name']: site for site in sites_config.get('sites', [])}
+    corpus = load_corpus(corpus_path)
+    parser = Parser()
+    analyzer = Analyzer(thresholds=get_alert_thresholds(sites_config))
+
+    for doc in corpus:
+        run_document(parser, analyzer, doc, sites[doc['site']], {stage: [] for stage in STAGES})
+
+    timings = {stage: [] for stage in STAGES}
+    pass_seconds = []
+    documents = 0
+    for _ in range(iterations):
+        pass_timings = {stage: [] for stage in STAGES}
+        documents = 0
+        started = time.perf_counter()
+        for doc in corpus:
+            documents += run_document(parser, analyzer, doc, sites[doc['site']], pass_timings)
+        pass_seconds.append(time.perf_counter() - started)
+        for stage, values in pass_timings.items():
+            timings[stage].append(values)
+
+    stages = {}
+    for stage, passes in timings.items():
+        if not passes[0]:
+            continue
+        per_call = [statistics.median(call) for call in zip(*passes)]
+        stages[stage] = {
+            'calls': len(per_call),
+            'p50_ms': round(statistics.median(per_call), 3),
+            'p95_ms': round(percentile(per_call, 0.95), 3),
+        }
+    return {
+        'machine': f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+        'iterations': iterations,
+        'pages': len(corpus),
+        'documents': documents,
+        'seconds': round(sum(pass_seconds), 3),
+        'docs_per_second': round(documents / statistics.median(pass_seconds), 2),
+        'stages': stages,
+        'peak_rss_mib': peak_rss_mib(),
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions against `baseline`, as messages (empty when the run is within tolerance)."""
+    regressions = []
+    if results['docs_per_second'] < baseline['docs_per_second'] * (1 - tolerance):
+        regressions.append(f"docs/sec {results['docs_per_second']} < baseline {baseline['docs_per_second']} "
+                           f"- {tolerance:.0%}")
+    for stage, entry in results['stages'].items():
+        base = baseline['stages'].get(stage)
+        if not base:
+            continue
+        limit = max(base['p95_ms'] * (1 + tolerance), base['p95_ms'] + MIN_P95_DELTA_MS)
+        if entry['p95_ms'] > limit:
+            regressions.append(f"{stage} p95 {entry['p95_ms']} ms > baseline {base['p95_ms']} ms + {tolerance:.0%}")
+    if results['peak_rss_mib'] and baseline.get('peak_rss_mib'):
+        if results['peak_rss_mib'] > baseline['peak_rss_mib'] * (1 + RSS_TOLERANCE):
+            regressions.append(f"peak RSS {results['peak_rss_mib']} MiB > baseline {baseline['peak_rss_mib']} MiB "
+                               f"+ {RSS_TOLERANCE:.0%}")
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = [f"{results['documents']} documents from {results['pages']} pages, median of {results['iterations']} passes: "
+             f"{results['docs_per_second']} docs/sec, peak RSS {results['peak_rss_mib']} MiB",
+             f"{'stage':<10}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'base p95':>10}"]
+    for stage, entry in results['stages'].items():
+        base = (baseline or {}).get('stages', {}).get(stage, {}).get('p95_ms', '')
+        lines.append(f"{stage:<10}{entry['calls']:>7}{entry['p50_ms']:>10.3f}{entry['p95_ms']:>10.3f}{base:>10}")
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Offline end-to-end benchmark over the fixture corpus.")
+    arg_parser.add_argument('--iterations', type=int, default=5, help="passes over the corpus (after one warm-up)")
+    arg_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help="allowed slowdown against the baseline (0.25 = 25%%)")
+    arg_parser.add_argument('--baseline', default=BASELINE_PATH)
+    arg_parser.add_argument('--output', help="also write the results as JSON to this file")
+    # Only after an intentional performance change, on the machine the checks run on
+    arg_parser.add_argument('--update-baseline', action='store_true')
+    args = arg_parser.parse_args()
+
+    results = run_benchmark(args.iterations)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(format_results(results))
+        print(f"Updated baseline in {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(format_results(results))
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+
+    print(format_results(results, baseline))
+    if baseline.get('machine') != results['machine']:
+        print(f"Note: baseline was recorded on {baseline.get('machine')}; timings may not be comparable.")
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    if regressions:
+        sys.exit(1)
+    print("Benchmark Passed!")
+
+
+if __name__ == "__main__":
+    main()
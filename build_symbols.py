@@ -0,0 +1,56 @@
+import csv
+import os
+import sys
+import requests
+from dotenv import load_dotenv
+
+from processor.gazetteer import Gazetteer
+
+# Load environment variables
+load_dotenv()
+
+# SEC's ticker/company/exchange master (refreshed daily by the SEC)
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers_exchange.json"
+# SEC asks automated clients to identify themselves with a contact address
+SEC_USER_AGENT = os.getenv("SEC_USER_AGENT", "stock-data-analysis admin@example.com")
+
+OUTPUT_PATH = "config/symbols.csv"
+
+# SEC exchange labels -> exchange names used by the analyzer's ticker patterns
+EXCHANGE_MAP = {
+    "Nasdaq": "NASDAQ",
+    "NYSE": "NYSE",
+    "OTC": "OTC",
+    "CBOE": "CBOE",
+}
+
+def build_symbols(output_path=OUTPUT_PATH):
+    print(f"Downloading {SEC_TICKERS_URL}...")
+    response = requests.get(SEC_TICKERS_URL, headers={'User-Agent': SEC_USER_AGENT}, timeout=30)
+    response.raise_for_status()
+    payload = response.json()
+
+    fields = payload['fields']
+    rows = [dict(zip(fields, record)) for record in payload['data']]
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'exchange', 'name'])
+        for row in rows:
+            if not row.get('ticker'):
+                continue
+            exchange = EXCHANGE_MAP.get(row.get('exchange'), 'NA')
+            writer.writerow([row['ticker'].upper(), exchange, row.get('name', '')])
+    os.replace(tmp_path, output_path)
+    print(f"Wrote {len(rows)} symbols to {output_path}")
+
+    # Prebuild the index so the first Analyzer() doesn't pay for it
+    gazetteer = Gazetteer(output_path)
+    if not gazetteer.load():
+        print("FAIL: could not load the generated symbol master")
+        sys.exit(1)
+    print(f"Indexed {len(gazetteer.tickers)} symbols into {gazetteer.index_path}")
+
+if __name__ == "__main__":
+    build_symbols()
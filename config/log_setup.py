@@ -0,0 +1,109 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+DEFAULT_LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "text" for cron logs and terminals, "json" for CloudWatch / log shippers
+DEFAULT_LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                    .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Merges the message with its arguments on the calling thread (the
+    arguments may change afterwards) but leaves formatting and I/O to the
+    listener thread.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _stream_handler(fmt, stream):
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """
+    Sends all log records through an in-memory queue to a background thread
+    that formats and writes them, so a slow stdout or log pipe never stalls a
+    pipeline worker. Records below `level` (LOG_LEVEL, default INFO) are
+    dropped before their message is formatted.
+
+    Safe to call again (each Lambda invocation does); the previous listener
+    is flushed and replaced.
+    """
+    global _listener
+    stop_logging()
+    fmt = (fmt or DEFAULT_LOG_FORMAT).lower()
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, _stream_handler(fmt, stream))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    level = level or DEFAULT_LOG_LEVEL
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """
+    Writes out everything still queued and stops the listener thread. Later
+    records are written directly, so nothing logged at exit is lost.
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+            root.addHandler(listener.handlers[0])
+
+
+atexit.register(stop_logging)
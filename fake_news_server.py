@@ -0,0 +1,341 @@
+import argparse
+import collections
+import random
+import re
+import selectors
+import socketserver
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SEED = 47
+# Statuses that can be injected, as {status: fraction of requests}
+ERROR_STATUSES = (403, 429, 500, 502, 503)
+# Loopback addresses used per /24, so host n is 127.0.<n // 250>.<n % 250 + 1>
+HOSTS_PER_BLOCK = 250
+
+SITEMAP_PATH = re.compile(r"^/sitemap-(\d+)\.xml$")
+ARTICLE_PATH = re.compile(r"^/news/(\d+)\.html$")
+FILLER = ("Shares of the company rose after it reported quarterly revenue ahead of estimates and raised "
+          "its outlook for the year, citing strong demand and an expanded partnership. ")
+
+
+def host_address(n):
+    return f"127.0.{n // HOSTS_PER_BLOCK}.{n % HOSTS_PER_BLOCK + 1}"
+
+
+def parse_error_rates(spec):
+    """'403=0.02,500=0.01' -> {403: 0.02, 500: 0.01}"""
+    rates = {}
+    for part in filter(None, (spec or "").split(',')):
+        status, rate = part.split('=')
+        if int(status) not in ERROR_STATUSES:
+            raise ValueError(f"Cannot inject status {status} (one of {ERROR_STATUSES})")
+        rates[int(status)] = float(rate)
+    return rates
+
+
+class FakeNewsServer:
+    """
+    Offline stand-in for the news sites, for load-testing the fetch layer
+    (see benchmark_fetch.py). Each host is its own loopback address
+    (host_address(n)) on one shared port, so Fetcher sees hundreds of distinct
+    hosts - each with its own connection pool and session priming - with no
+    DNS or network access.
+
+    Every host serves:
+      /                  home page (what Fetcher primes its session with)
+      /sitemap.xml       sitemap index -> /sitemap-<k>.xml, `sitemap_size` URLs each
+      /list.html         listing page linking the newest `listing_size` articles
+      /news/<n>.html     article n (about `article_bytes` long), n < `articles`
+
+    Every response waits `latency` +/- `jitter` seconds. `error_rates` maps a
+    status in ERROR_STATUSES to the fraction of requests answered with it;
+    the draw is seeded per (host, path, attempt), so runs repeat and a
+    retried request can succeed. A host's connections beyond
+    `max_connections` get 429 with Retry-After and are closed.
+    """
+
+    def __init__(self, hosts=10, articles=100, latency=0.0, jitter=0.0, error_rates=None, max_connections=None,
+                 retry_after=1, sitemap_size=500, listing_size=50, article_bytes=20000, seed=DEFAULT_SEED):
+        self.hosts = [host_address(n) for n in range(hosts)]
+        self.articles = articles
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = error_rates or {}
+        self.max_connections = max_connections
+        self.retry_after = retry_after
+        self.sitemap_size = sitemap_size
+        self.listing_size = listing_size
+        self.filler = (FILLER * (article_bytes // len(FILLER) + 1))[:article_bytes]
+        self.seed = seed
+        self.port = None
+
+        self._servers = []
+        self._selector = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._connections = collections.Counter()
+        self.reset_stats()
+
+    # --- lifecycle ------------------------------------------------------
+
+    def start(self, port=0):
+        """Binds every host on one port (a free one for 0) and serves from a background thread."""
+        for _ in range(5):
+            try:
+                self._bind(port)
+                break
+            except OSError:
+                self._close_servers()
+                if port:
+                    raise
+        else:
+            raise OSError("Could not find a port free on every loopback host address")
+        self._selector = selectors.DefaultSelector()
+        for server in self._servers:
+            self._selector.register(server, selectors.EVENT_READ)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="fake-news-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._selector:
+            self._selector.close()
+            self._selector = None
+        self._close_servers()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _bind(self, port):
+        self._servers = []
+        for address in self.hosts:
+            server = _HostServer((address, port), _Handler)
+            server.fake = self
+            port = server.server_address[1]
+            self._servers.append(server)
+        self.port = port
+
+    def _close_servers(self):
+        for server in self._servers:
+            server.server_close()
+        self._servers = []
+
+    def _serve(self):
+        # One accept loop for every host; each connection gets its own thread
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                key.fileobj._handle_request_noblock()
+
+    # --- URLs -----------------------------------------------------------
+
+    def base_url(self, host):
+        return f"http://{host}:{self.port}"
+
+    def sitemap_url(self, host):
+        return f"{self.base_url(host)}/sitemap.xml"
+
+    def listing_url(self, host):
+        return f"{self.base_url(host)}/list.html"
+
+    def article_url(self, host, n):
+        return f"{self.base_url(host)}/news/{n}.html"
+
+    # --- responses ------------------------------------------------------
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.status_counts = collections.Counter()
+            # (host, path) -> requests for it so far / status of the latest
+            self.attempts = collections.Counter()
+            self.last_status = {}
+            self.rejected_connections = 0
+            self.peak_connections = 0
+
+    def _open_connection(self, host):
+        """Counts a new connection; False when it is over the host's limit."""
+        with self._lock:
+            self._connections[host] += 1
+            self.peak_connections = max(self.peak_connections, self._connections[host])
+            if self.max_connections and self._connections[host] > self.max_connections:
+                self.rejected_connections += 1
+                return False
+            return True
+
+    def _close_connection(self, host):
+        with self._lock:
+            self._connections[host] -= 1
+
+    def _injected_error(self, host, path, attempt):
+        if not self.error_rates:
+            return None
+        draw = random.Random(f"{self.seed}-{host}-{path}-{attempt}").random()
+        for status, rate in sorted(self.error_rates.items()):
+            if draw < rate:
+                return status
+            draw -= rate
+        return None
+
+    def respond(self, host, path, admitted=True):
+        """(status, content type, body bytes, extra headers) for a GET of `path` on `host`."""
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        path = path.split('?')[0]
+        with self._lock:
+            attempt = self.attempts[(host, path)]
+            self.attempts[(host, path)] += 1
+
+        headers = {}
+        status = 429 if not admitted else self._injected_error(host, path, attempt)
+        if status:
+            content_type, body = "text/html", f"<html><body>Error {status}</body></html>"
+            if status in (429, 503):
+                headers['Retry-After'] = str(self.retry_after)
+        else:
+            status, content_type, body = self._page(host, path)
+        body = body.encode('utf-8')
+
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(body)
+            self.status_counts[status] += 1
+            self.last_status[(host, path)] = status
+        return status, content_type, body, headers
+
+    def _page(self, host, path):
+        base = self.base_url(host)
+        if path == "/":
+            return 200, "text/html", f"<html><head><title>{host}</title></head><body>Home</body></html>"
+        if path == "/sitemap.xml":
+            sitemaps = "".join(f"<sitemap><loc>{base}/sitemap-{k}.xml</loc></sitemap>"
+                               for k in range(-(-self.articles // self.sitemap_size)))
+            return 200, "application/xml", ('<?xml version="1.0" encoding="UTF-8"?>'
+                                            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                            f'{sitemaps}</sitemapindex>')
+        if path == "/list.html":
+            links = "".join(f'<li><a href="/news/{n}.html">Story {n}</a></li>'
+                            for n in range(self.articles - 1, max(-1, self.articles - 1 - self.listing_size), -1))
+            return 200, "text/html", f"<html><body><ul>{links}</ul></body></html>"
+
+        match = SITEMAP_PATH.match(path)
+        if match and int(match.group(1)) * self.sitemap_size < self.articles:
+            # Newest first, like the real news sitemaps
+            first = self.articles - 1 - int(match.group(1)) * self.sitemap_size
+            urls = "".join(f"<url><loc>{base}/news/{n}.html</loc></url>"
+                           for n in range(first, max(-1, first - self.sitemap_size), -1))
+            return 200, "application/xml", ('<?xml version="1.0" encoding="UTF-8"?>'
+                                            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                            f'{urls}</urlset>')
+        match = ARTICLE_PATH.match(path)
+        if match and int(match.group(1)) < self.articles:
+            n = match.group(1)
+            return 200, "text/html", (f"<html><head><title>{host} story {n}</title></head><body>"
+                                      f"<h1>{host} story {n}</h1><p>Story {n}. {self.filler}</p></body></html>")
+        return 404, "text/html", "<html><body>Not found</body></html>"
+
+    def stats(self):
+        """Server-side counts: requests by status, retries and the statuses requests were left with."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'bytes_sent': self.bytes_sent,
+                'status_counts': dict(sorted(self.status_counts.items())),
+                # Home pages are requested once per session, not retried
+                'retried_paths': sum(1 for (_, path), count in self.attempts.items() if count > 1 and path != "/"),
+                'retries': sum(count - 1 for (_, path), count in self.attempts.items() if path != "/"),
+                'final_errors': dict(sorted(collections.Counter(
+                    status for status in self.last_status.values() if status != 200).items())),
+                'rejected_connections': self.rejected_connections,
+                'peak_connections_per_host': self.peak_connections,
+            }
+
+
+class _HostServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+    request_queue_size = 128
+
+    def server_bind(self):
+        # HTTPServer.server_bind looks up the address's FQDN, a DNS timeout per host offline
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = self.server_address[:2]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so Fetcher's connection pools are exercised
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle each response would wait on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.fake = self.server.fake
+        self.host = self.connection.getsockname()[0]
+        self.admitted = self.fake._open_connection(self.host)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.fake._close_connection(self.host)
+
+    def do_GET(self):
+        status, content_type, body, headers = self.fake.respond(self.host, self.path, self.admitted)
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Last-Modified", formatdate(usegmt=True))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if not self.admitted:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve synthetic news hosts on loopback addresses.")
+    arg_parser.add_argument('--hosts', type=int, default=10)
+    arg_parser.add_argument('--articles', type=int, default=1000, help="articles per host")
+    arg_parser.add_argument('--port', type=int, default=8047)
+    arg_parser.add_argument('--latency', type=float, default=0.05, help="seconds per response")
+    arg_parser.add_argument('--jitter', type=float, default=0.02, help="+/- seconds around --latency")
+    arg_parser.add_argument('--errors', default="", help="injected statuses, e.g. 403=0.02,429=0.01,503=0.01")
+    arg_parser.add_argument('--max-connections', type=int, help="concurrent connections allowed per host")
+    arg_parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds on 429/503")
+    args = arg_parser.parse_args()
+
+    server = FakeNewsServer(hosts=args.hosts, articles=args.articles, latency=args.latency, jitter=args.jitter,
+                            error_rates=parse_error_rates(args.errors), max_connections=args.max_connections,
+                            retry_after=args.retry_after).start(args.port)
+    print(f"Serving {args.hosts} hosts: {server.sitemap_url(server.hosts[0])} ... "
+          f"{server.sitemap_url(server.hosts[-1])} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(server.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,40 @@
-from main import main
+from main import main, reduce_run
+from pipeline.shard import Shard
+from config.log_setup import configure_logging, stop_logging
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 def lambda_handler(event, context):
-    print("Received event: " + json.dumps(event, indent=2))
+    configure_logging()
+    logger.info("Received event: %s", json.dumps(event))
     
     try:
-        # Run the main analysis logic
-        main()
+        event = event or {}
+        # Sharded run: {"shard": "0/4", "run_id": ...} per worker, then {"reduce": 4, "run_id": ...};
+        # the same explicit run_id (or RUN_ID) in every event
+        if event.get('reduce'):
+            reduce_run(int(event['reduce']), event.get('run_id'))
+            return {
+                'statusCode': 200,
+                'body': json.dumps('Stock Data Analysis reduce completed successfully.')
+            }
+
+        # Run the main analysis logic, stopping in time to send the email
+        run_seconds = context.get_remaining_time_in_millis() / 1000 if context else None
+        main(run_seconds=run_seconds, shard=Shard.parse(event.get('shard')), run_id=event.get('run_id'))
         
         return {
             'statusCode': 200,
             'body': json.dumps('Stock Data Analysis completed successfully.')
         }
     except Exception as e:
-        print(f"Error during execution: {e}")
+        logger.exception("Error during execution: %s", e)
         return {
             'statusCode': 500,
             'body': json.dumps(f"Error: {str(e)}")
         }
+    finally:
+        # The container is frozen after returning; write out queued records first
+        stop_logging()
@@ -1,279 +1,51 @@
 from config.settings import settings
-from scraper.fetcher import Fetcher
+from config.log_setup import configure_logging
 from scraper.parser import Parser
-from scraper.sitemap_parser import SitemapParser
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.edgar import EdgarWatermark, DEFAULT_EDGAR_WATERMARK_PATH
 from storage.state_manager import StateManager
+from storage.near_duplicates import NearDuplicateIndex
 from processor.analyzer import Analyzer
 from notifier.emailer import Emailer
 from notifier.webhook import WebhookNotifier
+from pipeline.context import RunContext
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.scheduler import CrawlScheduler, DEFAULT_SCHEDULE_STATE_PATH
+from pipeline.shard import Shard, reduce_shards, resolve_run_id, write_shard
+from storage.shard_store import open_shard_store
+from pipeline.daemon import Daemon
+from pipeline.report import RunReport
+from pipeline.profiler import StageProfiler
+import argparse
+import contextlib
+import datetime
+import logging
+import signal
 import yaml
 import os
 
-def main():
-    print("Starting Stock Data Analysis Job...")
-    
-    # Initialize components
-    fetcher = Fetcher()
-    parser = Parser()
-    sitemap_parser = SitemapParser(fetcher)
-    state_manager = StateManager()
-    analyzer = Analyzer()
-    emailer = Emailer()
-    webhook = WebhookNotifier()
-    
-    # Load sites to scrape
-    if not os.path.exists(settings.sites_config_path):
-        print(f"Config file not found: {settings.sites_config_path}")
-        return
-
-    with open(settings.sites_config_path, 'r') as f:
-        sites_config = yaml.safe_load(f)
+logger = logging.getLogger(__name__)
 
-    all_insights = []
-    seen_snippets = set()
-    seen_titles = set()
-
-    import datetime
-
-    for site in sites_config.get('sites', []):
-        site_name = site.get('name')
-        site_type = site.get('type', 'page')
-        raw_url = site.get('url')
-        max_urls = site.get('max_urls', 50)
-        
-        # Handle dynamic date formatting
-        # Support %Y, %m, %d placeholders
-        now = datetime.datetime.now()
-        start_url = now.strftime(raw_url)
-        
-        target_urls = []
-        
-        if site_type == 'sitemap':
-            print(f"Fetching URLs from sitemap: {start_url}")
-            include_filters = site.get('include_filters', [])
-            target_urls = sitemap_parser.get_article_urls(start_url, max_urls=max_urls, include_filters=include_filters)
-        elif site_type == 'page':
-            print(f"Fetching URLs from page: {start_url}")
-            html = fetcher.fetch(start_url)
-            if html:
-                soup = parser.parse(html)
-                all_links = parser.extract_links(soup, start_url)
-                
-                include_filters = site.get('include_filters', [])
-                target_urls = []
-                for link in all_links:
-                    if len(target_urls) >= max_urls:
-                        break
-                    
-                    # Apply filters
-                    if include_filters:
-                        if any(f in link for f in include_filters):
-                            target_urls.append(link)
-                    else:
-                        target_urls.append(link)
-        elif site_type == 'yahoo_news':
-            print(f"Fetching Yahoo Finance News URLs from: {start_url}")
-            html = fetcher.fetch(start_url)
-            if html:
-                soup = parser.parse(html)
-                # target_urls are strictly those with a positive ticker change based on Yahoo layout
-                target_urls = parser.extract_yahoo_news_links(soup, start_url)
-                # Apply configured max limit
-                target_urls = target_urls[:max_urls]
-        else:
-            target_urls = [start_url]
-            
-        print(f"Found {len(target_urls)} URLs to process for {site_name}")
-
-        for url in target_urls:
-            # We must be careful skipping a multi_story_page based on the single URL.
-            # For a multi_story_page, the URL is always the same, but the stories change.
-            # So we only skip single page URLs.
-            if site_type != 'multi_story_page' and state_manager.is_processed(url):
-                # print(f"Skipping: {url}") # Verbose
-                continue
-
-            print(f"Processing: {url}")
-            html = fetcher.fetch(url)
-            if html:
-                soup = parser.parse(html)
-                
-                # Paywall CSS selector check
-                paywall_selector = site.get('paywall_selector')
-                if paywall_selector and parser.has_paywall(soup, paywall_selector):
-                    print(f"    Skipping: Paywall detected via selector ({paywall_selector})")
-                    state_manager.mark_processed(url)
-                    continue
-
-                if site_type == 'multi_story_page':
-                    container_selector = site.get('container_selector')
-                    title_selector = site.get('title_selector')
-                    content_selector = site.get('content_selector')
-                    
-                    stories = parser.extract_multiple_stories(soup, container_selector, title_selector, content_selector)
-                    print(f"  -> Extracted {len(stories)} stories from page.")
-                    
-                    for story in stories:
-                        title = story['title']
-                        text = story['content']
-                        
-                        # Generate a pseudo-url to track deduplication of these sub-stories
-                        import re
-                        slugifier = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
-                        pseudo_url = f"{url}#{slugifier}"
-                        
-                        if state_manager.is_processed(pseudo_url):
-                            print(f"    Skipping already processed story: {title[:50]}...")
-                            continue
-                            
-                        # Deduplicate by exact title in current run
-                        norm_title = " ".join(title.lower().split())
-                        if norm_title in seen_titles:
-                            # print(f"    Skipping duplicate title: {title[:50]}...")
-                            state_manager.mark_processed(pseudo_url)
-                            continue
-                        seen_titles.add(norm_title)
-                        
-                        print(f"    Story: {title[:50]}...")
-                        
-                        min_chars = site.get('min_chars', 0)
-                        if len(text) < min_chars:
-                            print(f"    Skipping: Content length ({len(text)} chars) is below minimum of {min_chars}")
-                            state_manager.mark_processed(pseudo_url)
-                            continue
-
-                        full_text = f"{title}\n\n{text}"
-                        max_chars = site.get('max_chars', 3000)
-                        formatted_text = parser.format_for_analysis(full_text, url, max_chars=max_chars)
-                        
-                        if formatted_text:
-                            insights = analyzer.analyze([formatted_text])
-                            significant_insights = [i for i in insights if abs(i['likelihood_score']) > 0]
-                            
-                            if significant_insights:
-                                print(f"  -> Found {len(significant_insights)} insights for story")
-                                for i in significant_insights:
-                                    i['source_url'] = url # Keep original URL for the email
-                                    i['site_name'] = site_name
-                                    
-                                    snippet_hash = hash(i.get('snippet', ''))
-                                    if snippet_hash not in seen_snippets:
-                                        seen_snippets.add(snippet_hash)
-                                        all_insights.append(i)
-                                        
-                        # Mark this sub-story as processed
-                        state_manager.mark_processed(pseudo_url)
-                    
-                    # Also mark the parent URL as processed so we know we hit it today
-                    # But we'll ignore this check at the top of the loop for multi_story_page anyway.
-                    state_manager.mark_processed(url)
-                    
-                else:
-                    # Original single page processing logic
-                    selector = site.get('content_selector') or 'p' 
-                    text = parser.extract_text(soup, selector)
-                    
-                    # Extract Title
-                    title_selector = site.get('title_selector')
-                    title = parser.extract_title(soup, title_selector)
-                    
-                    # Extract and Filter by Date
-                    date_regex = site.get('date_regex')
-                    date_format = site.get('date_format')
-                    article_date = parser.extract_date(soup, date_regex, date_format, url)
-                    
-                    if article_date:
-                        import datetime
-                        from dateutil import tz
-                        
-                        # Determine current time
-                        now = datetime.datetime.now()
-                        
-                        # Handle timezone awareness
-                        if article_date.tzinfo:
-                            # If article date is aware, make now aware (assume local/system time if not specified, 
-                            # but ideally compare in UTC)
-                            # dateutil parser often returns aware datetimes if TZ abbr is found.
-                            # datetime.now() returns naive local time.
-                            # conversion:
-                            now = datetime.datetime.now(tz=tz.tzlocal())
-                            
-                        # Calculate difference
-                        time_diff = now - article_date
-                        
-                        # Filter: Skip if older than 1 hour (3600 seconds)
-                        # Use total_seconds() to handle timedelta
-                        if time_diff.total_seconds() > 3600:
-                            print(f"    Skipping old article ({time_diff.total_seconds()/3600:.1f}h old): {article_date}")
-                            state_manager.mark_processed(url)
-                            continue
-                        else:
-                            print(f"    Article is fresh ({time_diff.total_seconds()/60:.1f}m ago): {article_date}")
-                    else:
-                        if date_regex:
-                            print("    Warning: Date extraction failed despite configuration.")
-
-                    # Title Extraction & De-duplication
-                    if title:
-                        norm_title = " ".join(title.lower().split())
-                        if norm_title in seen_titles:
-                            print(f"    Skipping duplicate title: {title[:50]}...")
-                            state_manager.mark_processed(url)
-                            continue
-                        seen_titles.add(norm_title)
-                        
-                    print(f"    Title: {title[:50]}..." if title else "    No title found")
-                    
-                    # Check text length before scraping
-                    # Typical paywall stubs are under 500-1000 characters
-                    min_chars = site.get('min_chars', 0)
-                    if len(text) < min_chars:
-                        print(f"    Skipping: Content length ({len(text)} chars) is below minimum of {min_chars} (Possible paywall stub)")
-                        state_manager.mark_processed(url)
-                        continue
-                    
-                    # Format text using legacy encapsulation
-                    # Prepend title to the text for analysis context
-                    full_text = f"{title}\n\n{text}" if title else text
-                
-                max_chars = site.get('max_chars', 3000)
-                formatted_text = parser.format_for_analysis(full_text, url, max_chars=max_chars)
-                texts_to_analyze = [formatted_text] if formatted_text else []
-                
-                if texts_to_analyze:
-                    # Pass the title in metadata if needed, but analyzer works on text list
-                    insights = analyzer.analyze(texts_to_analyze)
-                    significant_insights = [i for i in insights if abs(i['likelihood_score']) > 0]
-                    
-                    if significant_insights:
-                        print(f"  -> Found {len(significant_insights)} insights")
-                        # Attach metadata and de-duplicate
-                        for i in significant_insights:
-                            i['source_url'] = url
-                            i['site_name'] = site_name
-                            
-                            # De-duplication: Check if snippet is already seen
-                            # Using a simple hash of the snippet text to identify duplicates
-                            snippet_hash = hash(i.get('snippet', ''))
-                            if snippet_hash not in seen_snippets:
-                                seen_snippets.add(snippet_hash)
-                                all_insights.append(i)
-                            else:
-                                # print(f"    Duplicate insight skipped.") # Verbose
-                                pass
-
-                # Mark as processed
-                state_manager.mark_processed(url)
+def get_alert_thresholds(sites_config):
+    """Email/watchlist alert thresholds from sites.yaml, with defaults."""
+    return {
+        'email_min_score': sites_config.get('email_min_score', 75),
+        'email_min_sentiment': sites_config.get('email_min_sentiment', 0.5),
+        'email_max_negative_score': sites_config.get('email_max_negative_score', 25),
+        'email_max_negative_sentiment': sites_config.get('email_max_negative_sentiment', -0.5),
+    }
 
+def send_notifications(all_insights, thresholds, emailer, webhook):
+    """Email the insights that meet the alert thresholds and push positive tickers to the watchlist."""
     if all_insights:
         # Get threshold from config
-        min_pos_score = sites_config.get('email_min_score', 75)
-        min_pos_sentiment = sites_config.get('email_min_sentiment', 0.5)
-        max_neg_score = sites_config.get('email_max_negative_score', 25)
-        max_neg_sentiment = sites_config.get('email_max_negative_sentiment', -0.5)
+        min_pos_score = thresholds['email_min_score']
+        min_pos_sentiment = thresholds['email_min_sentiment']
+        max_neg_score = thresholds['email_max_negative_score']
+        max_neg_sentiment = thresholds['email_max_negative_sentiment']
             
-        print(f"Filtering positive insights: score >= {min_pos_score}, sentiment >= {min_pos_sentiment}")
-        print(f"Filtering negative insights: score <= {max_neg_score}, sentiment <= {max_neg_sentiment}")
+        logger.info("Filtering positive insights: score >= %s, sentiment >= %s", min_pos_score, min_pos_sentiment)
+        logger.info("Filtering negative insights: score <= %s, sentiment <= %s", max_neg_score, max_neg_sentiment)
         
         positive_insights = [
             i for i in all_insights 
@@ -294,12 +66,13 @@ def main():
         top_neg_insights = negative_insights[:50]
         
         if not top_pos_insights and not top_neg_insights:
-            print(f"No insights met the thresholds.")
+            logger.info("No insights met the thresholds.")
         else:
             # 1. Send Email (if enabled)
             if settings.enable_insights_email:
                 total_items = len(top_pos_insights) + len(top_neg_insights)
-                print(f"Sending email with {total_items} insights ({len(top_pos_insights)} pos, {len(top_neg_insights)} neg)...")
+                logger.info("Sending email with %d insights (%d pos, %d neg)...",
+                            total_items, len(top_pos_insights), len(top_neg_insights))
 
                 # Format explicitly for better readability with metadata
                 body = emailer.format_results(top_pos_insights, top_neg_insights)
@@ -309,7 +82,7 @@ def main():
                 subject = f"Stock Analysis Report for {date_str} - {total_items} Items"
                 emailer.send_email(subject, body)
             else:
-                print("Insights email is disabled. Skipping.")
+                logger.info("Insights email is disabled. Skipping.")
 
             # 2. Watchlist API Integration (if enabled)
             if settings.enable_watchlist_api:
@@ -321,13 +94,13 @@ def main():
                         tickers_to_send.add(ticker)
                 
                 if tickers_to_send:
-                    print(f"Sending {len(tickers_to_send)} unique tickers to Watchlist API...")
+                    logger.info("Sending %d unique tickers to Watchlist API...", len(tickers_to_send))
                     success, msg = webhook.send_tickers(list(tickers_to_send))
                     
                     if not success:
-                        print(f"API Error: {msg}")
+                        logger.error("API Error: %s", msg)
                         if settings.enable_api_error_email:
-                            print("Sending error notification email...")
+                            logger.info("Sending error notification email...")
                             error_subject = f"Watchlist API Error - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}"
                             error_body = (
                                 f"An error occurred while sending tickers to the Watchlist API.\n\n"
@@ -336,13 +109,209 @@ def main():
                             )
                             emailer.send_email(error_subject, error_body)
                 else:
-                    print("No positive tickers found in top insights to send.")
+                    logger.info("No positive tickers found in top insights to send.")
             else:
-                print("Watchlist API integration is disabled. Skipping.")
+                logger.info("Watchlist API integration is disabled. Skipping.")
     else:
-        print("No significant insights found during this run.")
+        logger.info("No significant insights found during this run.")
 
-    print("Job completed.")
+def load_sites_config():
+    """Parsed config/sites.yaml, or None if it is missing."""
+    if not os.path.exists(settings.sites_config_path):
+        logger.error("Config file not found: %s", settings.sites_config_path)
+        return None
+
+    with open(settings.sites_config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+def build_context(sites_config):
+    """Creates the shared components (each site gets its own Fetcher)."""
+    parser = Parser()
+    canonicalizer = UrlCanonicalizer()
+    state_manager = StateManager()
+
+    # The analyzer skips VADER for documents that cannot reach these thresholds
+    thresholds = get_alert_thresholds(sites_config)
+    analyzer = Analyzer(thresholds=thresholds)
+    source = "snapshot" if analyzer.snapshot_hit else "parsed sources"
+    logger.info("Analyzer ready in %.0f ms (import %.0f ms, init %.0f ms from %s)",
+                analyzer.startup_seconds * 1000, (analyzer.startup_seconds - analyzer.init_seconds) * 1000,
+                analyzer.init_seconds * 1000, source)
+
+    # Reworded syndications/follow-up copies of articles seen in recent runs
+    near_duplicates = NearDuplicateIndex(
+        os.getenv("NEAR_DUP_INDEX_PATH", "near_duplicates.db"),
+        max_distance=sites_config.get('near_dup_max_distance', 6),
+        retention_days=sites_config.get('near_dup_retention_days', 7),
+    )
+
+    return RunContext(parser, canonicalizer, state_manager, analyzer, near_duplicates, thresholds)
+
+def main(run_seconds=None, profile=None, shard=None, run_id=None):
+    """
+    One scrape/analyze/notify run. `run_seconds` is the time the run may take
+    (the Lambda's remaining time, else RUN_DEADLINE_SECONDS or
+    `run_deadline_seconds` in sites.yaml); fetching stops early enough to
+    still send the email. `profile` (default: ENABLE_PROFILING) profiles
+    every stage, see pipeline.profiler.
+
+    With a `shard` (pipeline.shard.Shard) this is one worker of a sharded
+    run: it processes its share and leaves its insights in SHARD_STORE under
+    `run_id` (else RUN_ID; one of them is required) instead of sending;
+    reduce_run() sends for the whole run.
+    """
+    if shard:
+        # Checked before any work: results without a run id could not be reduced
+        run_id = resolve_run_id(run_id)
+    logger.info("Starting Stock Data Analysis Job%s...", f" (shard {shard})" if shard else "")
+
+    emailer = Emailer()
+    webhook = WebhookNotifier()
+
+    # Load sites to scrape
+    sites_config = load_sites_config()
+    if sites_config is None:
+        return
+
+    ctx = build_context(sites_config)
+    canonicalizer = ctx.canonicalizer
+    state_manager = ctx.state_manager
+    near_duplicates = ctx.near_duplicates
+    analyzer = ctx.analyzer
+    thresholds = ctx.thresholds
+
+    # Sites are discovered concurrently and their articles stream through
+    # bounded queues: fetch -> parse -> filters -> analyze -> aggregate
+    sites = sites_config.get('sites', [])
+    run_seconds = run_seconds or float(os.getenv("RUN_DEADLINE_SECONDS", 0)) or sites_config.get('run_deadline_seconds')
+    # A shard keeps its own carried URLs, yields and EDGAR watermark
+    state_path = f"{DEFAULT_SCHEDULE_STATE_PATH}.{shard.name}" if shard else DEFAULT_SCHEDULE_STATE_PATH
+    scheduler = CrawlScheduler(run_seconds, reserve_seconds=sites_config.get('notify_reserve_seconds', 60),
+                               state_path=state_path)
+    profile = settings.enable_profiling if profile is None else profile
+    profiler = StageProfiler().start() if profile else None
+    watermark = EdgarWatermark(f"{DEFAULT_EDGAR_WATERMARK_PATH}.{shard.name}" if shard else DEFAULT_EDGAR_WATERMARK_PATH)
+    pipeline = ArticlePipeline(ctx, sites_config, scheduler=scheduler, profiler=profiler, shard=shard,
+                               watermark=watermark)
+    logger.info("Processing %d sites with %d discovery workers, %d parse and %d analyze workers...",
+                len(sites), pipeline.site_workers, pipeline.parse_workers, pipeline.analyze_workers)
+    stages = pipeline.run(sites)
+    logger.info("Pipeline stages:\n%s", stages.report())
+    guard = pipeline.memory_guard
+    if guard.cap_mib:
+        logger.info("Memory cap %.0f MiB: %s", guard.cap_mib,
+                    "reached, remaining articles left for the next run" if guard.tripped else "not reached")
+    scheduler.save()
+    watermark.save()
+    logger.info("%s", scheduler.report())
+    if ctx.skip_counts:
+        logger.info("Skipped: %s", ", ".join(f"{reason} {count}" for reason, count in sorted(ctx.skip_counts.items())))
+    all_insights = ctx.all_insights
+
+    # Commit the last batch of processed URLs before notifying
+    state_manager.flush()
+    near_duplicates.flush()
+    logger.info("Near-duplicates dropped before analysis: %d of %d articles",
+                near_duplicates.dropped, near_duplicates.checked)
+    logger.info("%s", state_manager.bloom_report())
+    logger.info("Fetches avoided: %d duplicate URLs dropped at discovery "
+                "(%d were variants of the same canonical URL), %d served from the fetch cache, "
+                "%d dated outside the freshness window by their URL",
+                canonicalizer.duplicates_dropped, canonicalizer.variants_merged,
+                ctx.fetch_cache_hits, ctx.skip_counts['stale_url_date'])
+
+    if analyzer.scored_count:
+        logger.info("Analyzer pruned %d of %d documents before VADER (cannot reach an alert threshold).",
+                    analyzer.pruned_count, analyzer.scored_count)
+
+    # Structured per-site report, appended to the run history
+    extra = {'shard': str(shard), 'run_id': run_id} if shard else {}
+    report = ctx.report.finish(pipeline=stages.stats(), skipped=dict(ctx.skip_counts), **extra)
+    logger.info("Run report:\n%s", RunReport.summary(report))
+    RunReport.append_to(report)
+
+    with profiler.section('notify') if profiler else contextlib.nullcontext():
+        if shard:
+            write_shard(open_shard_store(), run_id, shard, all_insights, report)
+        else:
+            send_notifications(all_insights, thresholds, emailer, webhook)
+
+    if profiler:
+        profiler.stop()
+        logger.info("Profile:\n%s", profiler.report())
+        path = profiler.write()
+        if path:
+            logger.info("Profile written to %s (flamegraph input: stacks.folded)", path)
+
+    logger.info("Job completed.")
+
+def reduce_run(shards, run_id=None):
+    """Final step of a sharded run: merges the `shards` workers' insights and sends once."""
+    run_id = resolve_run_id(run_id)
+    logger.info("Reducing run %s (%d shards)...", run_id, shards)
+    sites_config = load_sites_config()
+    if sites_config is None:
+        return None
+    thresholds = get_alert_thresholds(sites_config)
+    emailer = Emailer()
+    webhook = WebhookNotifier()
+    return reduce_shards(open_shard_store(), run_id, shards,
+                         notify=lambda insights: send_notifications(insights, thresholds, emailer, webhook))
+
+def run_daemon():
+    """Watch mode: poll each site on its own interval and alert on new insights as they appear."""
+    logger.info("Starting Stock Data Analysis daemon...")
+    emailer = Emailer()
+    webhook = WebhookNotifier()
+
+    sites_config = load_sites_config()
+    if sites_config is None:
+        return
+
+    ctx = build_context(sites_config)
+    daemon = Daemon(ctx, sites_config,
+                    notify=lambda insights: send_notifications(insights, ctx.thresholds, emailer, webhook))
+
+    # Finish the current cycle and checkpoint before exiting
+    def handle_stop(signum, frame):
+        logger.info("Stop requested; finishing the current cycle...")
+        daemon.stop()
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGTERM, handle_stop)
+
+    daemon.run()
+    ctx.state_manager.flush()
+    ctx.near_duplicates.flush()
+    logger.info("Daemon stopped.")
+
+def shard_arg(spec):
+    try:
+        return Shard.parse(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 if __name__ == "__main__":
-    main()
+    arg_parser = argparse.ArgumentParser(description="Scrape news sites, score stock insights and send alerts.")
+    arg_parser.add_argument('--daemon', action='store_true',
+                            help="keep running and poll each site on its own interval (sites.yaml poll_seconds)")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="profile every pipeline stage (cProfile, tracemalloc, stack samples) into PROFILE_DIR")
+    arg_parser.add_argument('--shard', type=shard_arg, metavar="I/N",
+                            help="run as worker I of N (0-based): only its share of sites/URLs, results to SHARD_STORE")
+    arg_parser.add_argument('--reduce', type=int, metavar="N",
+                            help="merge the results of N shard workers and send the alerts once")
+    arg_parser.add_argument('--run-id', help="shared by the workers and the reduce step of one run "
+                                             "(default: RUN_ID); required with --shard and --reduce")
+    args = arg_parser.parse_args()
+    if (args.shard or args.reduce) and not (args.run_id or os.getenv("RUN_ID")):
+        arg_parser.error("--shard and --reduce need --run-id (or RUN_ID)")
+    if args.daemon and args.profile:
+        # A profile covers one run's stages; watch mode never finishes one to write it
+        arg_parser.error("--profile profiles a single run; it cannot be combined with --daemon")
+    configure_logging()
+    if args.daemon:
+        run_daemon()
+    elif args.reduce:
+        reduce_run(args.reduce, args.run_id)
+    else:
+        main(profile=args.profile or None, shard=args.shard, run_id=args.run_id)
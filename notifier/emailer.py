@@ -1,8 +1,11 @@
+import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 class Emailer:
     def __init__(self):
         self.sender = settings.email_sender
@@ -14,7 +17,7 @@ class Emailer:
 
     def send_email(self, subject, body):
         if not self.sender or not self.password or (not self.recipients and not self.bcc):
-            print("Email configuration missing. Skipping email.")
+            logger.warning("Email configuration missing. Skipping email.")
             return
 
         try:
@@ -61,9 +64,9 @@ class Emailer:
             all_recipients = self.recipients + self.bcc
             server.sendmail(self.sender, all_recipients, text)
             server.quit()
-            print(f"Email sent to To: {self.recipients}, Bcc: {self.bcc}")
+            logger.info("Email sent to To: %s, Bcc: %s", self.recipients, self.bcc)
         except Exception as e:
-            print(f"Failed to send email: {e}")
+            logger.error("Failed to send email: %s", e)
 
     def format_results(self, pos_insights, neg_insights):
         if not pos_insights and not neg_insights:
@@ -3,6 +3,8 @@ import requests
 import json
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 class WebhookNotifier:
     def __init__(self):
         self.api_url = settings.watchlist_api_url
@@ -14,11 +16,11 @@ class WebhookNotifier:
         :param tickers: List of ticker symbols (strings)
         """
         if not tickers:
-            logging.info("No tickers to send to watchlist.")
+            logger.info("No tickers to send to watchlist.")
             return
 
         if not self.api_key:
-            logging.warning("WATCHLIST_API_KEY not set. Skipping API call.")
+            logger.warning("WATCHLIST_API_KEY not set. Skipping API call.")
             return
 
         headers = {
@@ -29,33 +31,29 @@ class WebhookNotifier:
         payload = {"symbols": list(tickers)}
         
         try:
-            logging.info(f"Sending {len(tickers)} tickers to {self.api_url}...")
-            print(f"DEBUG: Webhook Payload: {json.dumps(payload)}") # Explicit print for cron log
+            logger.info("Sending %d tickers to %s...", len(tickers), self.api_url)
+            logger.debug("Webhook payload: %s", payload)
             
             response = requests.post(self.api_url, json=payload, headers=headers, timeout=10)
             
-            print(f"DEBUG: Webhook Response Code: {response.status_code}") # Explicit print
+            logger.debug("Webhook response code: %s", response.status_code)
             
             if response.status_code == 200:
                 try:
                     resp_json = response.json()
                     msg = f"Successfully sent tickers. Response: {resp_json}"
-                    print(f"DEBUG: Webhook Success: {msg}") # Explicit print
-                    logging.info(msg)
+                    logger.info(msg)
                     return True, msg
                 except json.JSONDecodeError:
                     msg = f"Successfully sent tickers (200 OK) but failed to decode JSON. Body: {response.text}"
-                    print(f"DEBUG: Webhook JSON Error: {msg}")
-                    logging.warning(msg)
+                    logger.warning(msg)
                     return True, msg
             else:
                 msg = f"Failed to send tickers. Status: {response.status_code}, Body: {response.text}"
-                print(f"DEBUG: Webhook Fail: {msg}")
-                logging.error(msg)
+                logger.error(msg)
                 return False, msg
                 
         except Exception as e:
             msg = f"Error sending tickers to watchlist API: {e}"
-            print(f"DEBUG: Webhook Exception: {msg}")
-            logging.error(msg)
+            logger.error(msg)
             return False, msg
@@ -0,0 +1,581 @@
+import datetime
+import logging
+import re
+import time
+
+from scraper.edgar import DEFAULT_SEC_USER_AGENT, EdgarFeed
+from scraper.parser import Parser
+from scraper.sitemap_parser import SitemapParser
+from processor.insight import Insight
+from pipeline.memory import MemoryGuard, current_rss_mib, default_cap_mib
+from pipeline.stages import Stage, Pipeline
+
+logger = logging.getLogger(__name__)
+
+# Articles older than this are skipped (per site: `max_age_minutes`)
+DEFAULT_MAX_AGE_MINUTES = 60
+
+# A date-only URL date is local to the site; allow for any UTC offset
+URL_DATE_TZ_SLACK = datetime.timedelta(hours=14)
+
+
+def _now_for(published):
+    """Current time comparable with `published` (aware if it is)."""
+    if published.tzinfo:
+        from dateutil import tz
+        return datetime.datetime.now(tz=tz.tzlocal())
+    return datetime.datetime.now()
+
+
+def max_age(site):
+    return datetime.timedelta(minutes=site.get('max_age_minutes', DEFAULT_MAX_AGE_MINUTES))
+
+
+def url_date_is_stale(published, date_format, window, now=None):
+    """
+    True if an article dated `published` by its URL is certainly older than
+    `window`. Without a time of day in `date_format` the article may be from
+    any moment of that day, in the site's time zone, so only days that ended
+    before the window count.
+    """
+    now = now or _now_for(published)
+    latest = published
+    if not any(code in (date_format or "") for code in ("%H", "%I", "%M")):
+        latest = published + datetime.timedelta(days=1) + URL_DATE_TZ_SLACK
+    return now - latest > window
+
+
+def _listed_timestamp(article):
+    """Listing publish time as a POSIX timestamp; 0 when unknown (sorts last)."""
+    published_at = article.listing and article.listing.get('published_at')
+    return published_at.timestamp() if published_at else 0.0
+
+
+class Article:
+    """One unit of work moving through the pipeline (a page, or a story cut from one)."""
+
+    __slots__ = ('site', 'url', 'state_key', 'listing', 'html', 'soup', 'title', 'text', 'article_date',
+                 'full_text', 'insights')
+
+    def __init__(self, site, url, state_key=None, listing=None):
+        self.site = site
+        self.url = url
+        # What the listing page said about it: title, published_at, tickers
+        self.listing = listing
+        # What gets marked processed: the URL, or a pseudo-URL for a story
+        self.state_key = state_key or url
+        self.html = None
+        self.soup = None
+        self.title = None
+        self.text = ""
+        self.article_date = None
+        self.full_text = None
+        self.insights = None
+
+    def release(self):
+        """Frees the page (html and soup) once nothing downstream needs it."""
+        Parser.free(self.soup)
+        self.html = self.soup = None
+
+
+def _site_name(item):
+    """Site of a stage item: a site config (discovery) or an Article."""
+    return (item.site if isinstance(item, Article) else item).get('name')
+
+
+class ArticlePipeline:
+    """
+    discover -> fetch -> parse -> filters -> analyze -> aggregate, as stages
+    joined by bounded queues (see pipeline.stages).
+
+    Discovery runs `site_workers` sites at a time. Fetching gets one lane per
+    site, so each host still sees one request at a time while other sites
+    proceed. Parsing and analysis overlap with fetching in their own workers.
+    Each skip rule is its own filter stage; a dropped article is marked
+    processed so later runs don't fetch it again.
+
+    Sizes come from sites.yaml: `site_workers`, `pipeline_queue_size`,
+    `parse_workers`, `analyze_workers`. With a `scheduler`
+    (pipeline.scheduler.CrawlScheduler) sites and articles are started in its
+    order and fetching stops at its deadlines. With a `profiler`
+    (pipeline.profiler.StageProfiler) every stage handler is profiled.
+
+    Memory is bounded per article: the html goes once parsed, the soup once
+    extracted (or the article is dropped), the text once analyzed, and the
+    insights are kept as compact processor.insight.Insight objects without
+    the article text (`keep_insight_text: true` keeps it). Fetching stops at
+    the `max_memory_mb` cap (pipeline.memory.MemoryGuard), and each site's
+    peak RSS goes into the run report.
+
+    With a `shard` (pipeline.shard.Shard) only that worker's share is
+    processed: the sites it owns (`shard_by: site`), or by default every
+    site's discovered URLs that it owns (`shard_by: url`).
+
+    A `sec_edgar` site lists new filings from EDGAR's current-filings feed
+    (scraper.edgar.EdgarFeed), of its `form_types`; each is fetched as its
+    primary document and scored on that text, cut to `max_chars`. With a
+    `watermark` (scraper.edgar.EdgarWatermark) the feed is read only back to
+    where the previous run left off; `max_urls` caps the new filings fetched,
+    and those cut or not fetched stay ahead of the watermark.
+    """
+
+    def __init__(self, ctx, sites_config=None, scheduler=None, profiler=None, shard=None, watermark=None):
+        sites_config = sites_config or {}
+        self.ctx = ctx
+        self.scheduler = scheduler
+        self.profiler = profiler
+        self.shard = shard
+        self.watermark = watermark
+        self.shard_by = sites_config.get('shard_by', 'url')
+        self.site_workers = max(1, int(sites_config.get('site_workers', 4)))
+        self.queue_size = max(1, int(sites_config.get('pipeline_queue_size', 32)))
+        self.parse_workers = max(1, int(sites_config.get('parse_workers', 2)))
+        self.analyze_workers = max(1, int(sites_config.get('analyze_workers', 2)))
+        self.keep_insight_text = bool(sites_config.get('keep_insight_text', False))
+        self.memory_guard = MemoryGuard(default_cap_mib(sites_config))
+
+    def run(self, sites):
+        """Builds the stages and runs `sites` through them; returns the Pipeline for its stats."""
+        pipeline = self.build()
+        if self.shard and self.shard_by == 'site':
+            sites = [site for site in sites if self.shard.owns(site.get('name'))]
+        if self.scheduler:
+            sites = self.scheduler.order_sites(sites)
+        pipeline.run(sites)
+        return pipeline
+
+    def build(self):
+        size = self.queue_size
+        stages = [
+            Stage('discover', self.discover, workers=self.site_workers, queue_size=size),
+            Stage('fetch', self.fetch, queue_size=size, lane_key=lambda article: article.site.get('name')),
+            Stage('parse', self.parse, workers=self.parse_workers, queue_size=size),
+            self._filter('paywall', self.not_paywalled),
+            Stage('extract', self.extract, queue_size=size),
+            self._filter('processed', self.story_unprocessed, mark=False),
+            self._filter('freshness', self.is_fresh),
+            self._filter('duplicate_title', self.title_unclaimed),
+            self._filter('min_chars', self.long_enough),
+            self._filter('near_duplicate', self.not_near_duplicate),
+            Stage('analyze', self.analyze, workers=self.analyze_workers, queue_size=size),
+            Stage('aggregate', self.aggregate, queue_size=size),
+        ]
+        for stage in stages:
+            stage.handler = self._timed(stage.name, stage.handler)
+            if self.profiler:
+                stage.handler = self.profiler.wrap(stage.name, stage.handler, _site_name)
+        return Pipeline(stages)
+
+    def _timed(self, stage, handler):
+        """
+        Wraps a stage handler to add its wall and CPU time to the run report,
+        per site. Only time inside the handler counts, not time its worker
+        spends blocked on the next stage's queue.
+        """
+        report = self.ctx.report
+
+        def timed(item):
+            site_name = _site_name(item)
+            wall, cpu = time.perf_counter(), time.thread_time()
+            results = iter(handler(item) or ())
+            while True:
+                try:
+                    result = next(results)
+                except StopIteration:
+                    report.add_time(site_name, stage, time.perf_counter() - wall, time.thread_time() - cpu)
+                    report.observe_rss(site_name, current_rss_mib())
+                    return
+                report.add_time(site_name, stage, time.perf_counter() - wall, time.thread_time() - cpu)
+                report.observe_rss(site_name, current_rss_mib())
+                yield result
+                wall, cpu = time.perf_counter(), time.thread_time()
+        return timed
+
+    def _filter(self, name, keep, mark=True):
+        """Stage passing on articles for which `keep(article)` is true."""
+        def handler(article):
+            if keep(article):
+                yield article
+                return
+            self.ctx.count_skip(name, site=article.site.get('name'))
+            article.release()
+            if mark:
+                self.ctx.state_manager.mark_processed(article.state_key)
+        return Stage(name, handler, queue_size=self.queue_size)
+
+    # --- discover -------------------------------------------------------
+
+    def discover(self, site):
+        """Lists a site's article URLs that still need processing, newest listed first."""
+        ctx = self.ctx
+        parser = ctx.parser
+        site_name = site.get('name')
+        if self.scheduler and not self.scheduler.start_site(site):
+            logger.info("Skipping %s: no time left before the run deadline", site_name)
+            return
+        fetcher = ctx.fetcher_for(site_name)
+
+        site_type = site.get('type', 'page')
+        raw_url = site.get('url')
+        max_urls = site.get('max_urls', 50)
+
+        # Handle dynamic date formatting
+        # Support %Y, %m, %d placeholders
+        now = datetime.datetime.now()
+        start_url = now.strftime(raw_url)
+
+        target_urls = []
+        listed = {}
+
+        if site_type == 'sitemap':
+            logger.debug("Fetching URLs from sitemap: %s", start_url)
+            include_filters = site.get('include_filters', [])
+            target_urls = SitemapParser(fetcher).get_article_urls(start_url, max_urls=max_urls, include_filters=include_filters)
+        elif site_type == 'page':
+            logger.debug("Fetching URLs from page: %s", start_url)
+            html = fetcher.fetch(start_url)
+            if html:
+                soup = parser.parse(html)
+                # Listing metadata (title, publish time, tickers) rides along with each URL
+                all_records = parser.extract_link_records(soup, start_url, site.get('listing'))
+                parser.free(soup)
+
+                include_filters = site.get('include_filters', [])
+                for record in all_records:
+                    if len(target_urls) >= max_urls:
+                        break
+
+                    # Apply filters
+                    if include_filters:
+                        if any(f in record['url'] for f in include_filters):
+                            target_urls.append(record['url'])
+                            listed[record['url']] = record
+                    else:
+                        target_urls.append(record['url'])
+                        listed[record['url']] = record
+        elif site_type == 'yahoo_news':
+            logger.debug("Fetching Yahoo Finance News URLs from: %s", start_url)
+            html = fetcher.fetch(start_url)
+            if html:
+                soup = parser.parse(html)
+                # target_urls are strictly those with a positive ticker change based on Yahoo layout
+                target_urls = parser.extract_yahoo_news_links(soup, start_url)
+                parser.free(soup)
+                # Apply configured max limit
+                target_urls = target_urls[:max_urls]
+        elif site_type == 'sec_edgar':
+            logger.debug("Fetching EDGAR current filings from: %s", start_url)
+            user_agent = site.get('user_agent') or DEFAULT_SEC_USER_AGENT
+            if not user_agent:
+                logger.warning("No user_agent for %s (or SEC_USER_AGENT): EDGAR refuses clients that do not "
+                               "declare themselves", site_name)
+            feed = EdgarFeed(fetcher, parser, user_agent=user_agent)
+            since = self.watermark.get(site_name) if self.watermark else None
+            # Not capped at max_urls here: filings already processed must not take up the budget
+            filings, listed_back_to = feed.new_filings(start_url, since=since, form_types=site.get('form_types'),
+                                                       max_pages=site.get('max_feed_pages', 5))
+            for record in filings:
+                target_urls.append(record['url'])
+                listed[record['url']] = record
+            if self.watermark and listed_back_to:
+                self.watermark.propose(site_name, listed_back_to)
+        else:
+            target_urls = [start_url]
+
+        # URLs the previous run ran out of time for
+        if self.scheduler:
+            for record in self.scheduler.carried(site_name):
+                if record['url'] not in listed:
+                    target_urls.append(record['url'])
+                    listed[record['url']] = record
+
+        # One canonical form per article from here on (state keys, dedup, fetch cache)
+        rules = site.get('canonical')
+        listed_by_canonical = {}
+        for url, record in listed.items():
+            listed_by_canonical.setdefault(ctx.canonicalizer.canonicalize(url, rules), record)
+        target_urls = ctx.canonicalizer.dedupe(target_urls, rules)
+        logger.info("Found %d URLs to process for %s", len(target_urls), site_name,
+                    extra={'site': site_name, 'urls_found': len(target_urls)})
+        ctx.report.count(site_name, 'urls_found', len(target_urls))
+
+        if self.shard and self.shard_by == 'url':
+            owned = [url for url in target_urls if self.shard.owns(url)]
+            ctx.report.count(site_name, 'other_shards', len(target_urls) - len(owned))
+            target_urls = owned
+
+        target_urls = self.drop_stale_urls(site, target_urls)
+
+        # We must be careful skipping a multi_story_page based on the single URL.
+        # For a multi_story_page, the URL is always the same, but the stories change.
+        # So we only skip single page URLs (one batched state lookup per site).
+        if site_type != 'multi_story_page':
+            listed_count = len(target_urls)
+            target_urls = ctx.state_manager.filter_unprocessed(target_urls)
+            if listed_count > len(target_urls):
+                ctx.count_skip('processed', listed_count - len(target_urls), site=site_name)
+
+        articles = [Article(site, url, listing=listed_by_canonical.get(url)) for url in target_urls]
+        articles = [article for article in articles if self.listed_as_wanted(article)]
+        # Freshest first, so a budget cut leaves the oldest ones behind
+        articles.sort(key=lambda article: -_listed_timestamp(article))
+        if site_type == 'sec_edgar' and len(articles) > max_urls:
+            # The newest max_urls new filings; the rest stay ahead of the watermark for the next run
+            for article in articles[max_urls:]:
+                self._hold_watermark(article)
+            ctx.count_skip('max_urls', len(articles) - max_urls, site=site_name)
+            articles = articles[:max_urls]
+        yield from articles
+
+    def _hold_watermark(self, article):
+        """Keeps an EDGAR filing that was not fetched ahead of the watermark, so the next run lists it again."""
+        published_at = article.listing.get('published_at') if article.listing else None
+        if self.watermark and article.site.get('type') == 'sec_edgar' and published_at:
+            self.watermark.hold(article.site.get('name'), published_at)
+
+    def listed_as_wanted(self, article):
+        """
+        Applies the freshness window and run-wide title dedup to what the
+        listing page said about an article, so it is never fetched when the
+        post-fetch filters would drop it anyway.
+        """
+        listing = article.listing
+        if not listing:
+            return True
+        published_at = listing.get('published_at')
+        if published_at and _now_for(published_at) - published_at > max_age(article.site):
+            reason = 'stale_listing_date'
+        elif listing.get('title') and not self.ctx.claim_title(listing['title'], owner=article.state_key):
+            reason = 'duplicate_listing_title'
+        else:
+            return True
+        self.ctx.count_skip(reason, site=article.site.get('name'))
+        self.ctx.state_manager.mark_processed(article.url)
+        return False
+
+    def drop_stale_urls(self, site, urls):
+        """
+        Drops URLs whose embedded date (`url_date_regex`/`url_date_format`)
+        is already outside the site's freshness window, before any fetch or
+        state lookup. With `mark_stale_urls: true` they are also marked processed.
+        """
+        url_date_regex = site.get('url_date_regex')
+        if not url_date_regex:
+            return urls
+        url_date_format = site.get('url_date_format')
+        window = max_age(site)
+
+        fresh, stale = [], []
+        for url in urls:
+            published = self.ctx.parser.extract_date(None, url_date_regex, url_date_format, url)
+            if published and url_date_is_stale(published, url_date_format, window):
+                stale.append(url)
+            else:
+                fresh.append(url)
+
+        if stale:
+            logger.debug("Skipping %d URLs dated outside the freshness window for %s", len(stale), site.get('name'))
+            self.ctx.count_skip('stale_url_date', len(stale), site=site.get('name'))
+            if site.get('mark_stale_urls'):
+                for url in stale:
+                    self.ctx.state_manager.mark_processed(url)
+        return fresh
+
+    # --- fetch / parse --------------------------------------------------
+
+    def fetch(self, article):
+        site_name = article.site.get('name')
+        if self.scheduler and not self.scheduler.allow_fetch(site_name):
+            # Out of time: left for the next run
+            self.scheduler.carry(site_name, article.url, article.listing)
+            self._hold_watermark(article)
+            self.ctx.count_skip('deadline', site=site_name)
+            return
+        if self.memory_guard.over_cap():
+            # Not marked: fetched by a later run
+            if self.scheduler:
+                self.scheduler.carry(site_name, article.url, article.listing)
+            self._hold_watermark(article)
+            self.ctx.count_skip('memory_cap', site=site_name)
+            return
+        logger.debug("Processing: %s", article.url)
+        started = time.perf_counter()
+        fetcher = self.ctx.fetcher_for(site_name)
+        if article.site.get('type') == 'sec_edgar':
+            # Listed as the filing's index page; what gets scored is its primary document
+            article.html = EdgarFeed(fetcher, self.ctx.parser, user_agent=None).fetch_primary_document(article.url)
+        else:
+            article.html = fetcher.fetch(article.url)
+        if self.scheduler:
+            self.scheduler.record_fetch(site_name, time.perf_counter() - started)
+        if article.html:
+            self.ctx.report.count(site_name, 'fetched')
+            self.ctx.report.count(site_name, 'bytes', len(article.html.encode('utf-8', 'replace')))
+            yield article
+        else:
+            # Not marked: a failed fetch is retried next run
+            self._hold_watermark(article)
+            self.ctx.count_skip('fetch_failed', site=site_name)
+
+    def parse(self, article):
+        article.soup = self.ctx.parser.parse(article.html)
+        article.html = None
+        yield article
+
+    def not_paywalled(self, article):
+        # Paywall CSS selector check
+        paywall_selector = article.site.get('paywall_selector')
+        if paywall_selector and self.ctx.parser.has_paywall(article.soup, paywall_selector):
+            logger.debug("Skipping %s: paywall detected via selector (%s)", article.url, paywall_selector)
+            return False
+        return True
+
+    def extract(self, article):
+        """Pulls title, text and date out of the page; a multi_story_page fans out into its stories."""
+        parser = self.ctx.parser
+        site = article.site
+        soup = article.soup
+
+        if site.get('type', 'page') == 'multi_story_page':
+            container_selector = site.get('container_selector')
+            title_selector = site.get('title_selector')
+            content_selector = site.get('content_selector')
+
+            stories = parser.extract_multiple_stories(soup, container_selector, title_selector, content_selector)
+            article.release()
+            logger.debug("Extracted %d stories from %s", len(stories), article.url)
+
+            for story in stories:
+                # Generate a pseudo-url to track deduplication of these sub-stories
+                slugifier = re.sub(r'[^a-z0-9]+', '-', story['title'].lower()).strip('-')
+                child = Article(site, article.url, state_key=f"{article.url}#{slugifier}")
+                child.title = story['title']
+                child.text = story['content']
+                child.full_text = f"{child.title}\n\n{child.text}"
+                yield child
+
+            # Also mark the parent URL as processed so we know we hit it today
+            # But we never skip a multi_story_page on its URL anyway.
+            self.ctx.state_manager.mark_processed(article.url)
+            return
+
+        if site.get('type') == 'sec_edgar':
+            # The whole filing document, cut to what the analyzer will read anyway
+            article.text = EdgarFeed.document_text(soup, site.get('max_chars', 3000))
+            article.title = article.listing.get('title') if article.listing else None
+            article.article_date = article.listing.get('published_at') if article.listing else None
+            article.release()
+            article.full_text = f"{article.title}\n\n{article.text}" if article.title else article.text
+            yield article
+            return
+
+        # Original single page processing logic
+        selector = site.get('content_selector') or 'p'
+        article.text = parser.extract_text(soup, selector)
+
+        # Extract Title
+        article.title = parser.extract_title(soup, site.get('title_selector'))
+
+        # Extract Date (filtered by the freshness stage)
+        date_regex = site.get('date_regex')
+        article.article_date = parser.extract_date(soup, date_regex, site.get('date_format'), article.url)
+        article.release()
+        if not article.article_date and date_regex:
+            logger.warning("Date extraction failed despite configuration: %s", article.url)
+
+        # Prepend title to the text for analysis context
+        article.full_text = f"{article.title}\n\n{article.text}" if article.title else article.text
+        yield article
+
+    # --- filters --------------------------------------------------------
+
+    def story_unprocessed(self, article):
+        if article.state_key == article.url:
+            return True
+        if self.ctx.state_manager.is_processed(article.state_key):
+            logger.debug("Skipping already processed story: %.50s...", article.title)
+            return False
+        return True
+
+    def is_fresh(self, article):
+        article_date = article.article_date
+        if not article_date:
+            return True
+
+        now = _now_for(article_date)
+
+        # Calculate difference
+        time_diff = now - article_date
+
+        # Filter: Skip if older than the site's window (1 hour by default)
+        if time_diff > max_age(article.site):
+            logger.debug("Skipping old article %s (%.1fh old): %s",
+                         article.url, time_diff.total_seconds() / 3600, article_date)
+            return False
+        logger.debug("Article is fresh (%.1fm ago): %s", time_diff.total_seconds() / 60, article_date)
+        return True
+
+    def title_unclaimed(self, article):
+        title = article.title
+        is_story = article.state_key != article.url
+        # Deduplicate by exact title in current run
+        if title and not self.ctx.claim_title(title, owner=article.state_key):
+            if not is_story:
+                logger.debug("Skipping duplicate title: %.50s...", title)
+            return False
+        if is_story:
+            logger.debug("Story: %.50s...", title)
+        else:
+            logger.debug("Title: %.50s...", title or "(none found)")
+        return True
+
+    def long_enough(self, article):
+        # Typical paywall stubs are under 500-1000 characters
+        min_chars = article.site.get('min_chars', 0)
+        if len(article.text) < min_chars:
+            logger.debug("Skipping %s: content length (%d chars) is below minimum of %d (possible paywall stub)",
+                         article.url, len(article.text), min_chars)
+            return False
+        return True
+
+    def not_near_duplicate(self, article):
+        duplicate_of = self.ctx.near_duplicates.check(article.full_text, article.state_key)
+        if duplicate_of:
+            logger.debug("Skipping %s: near-duplicate of %s", article.url, duplicate_of)
+            return False
+        return True
+
+    # --- analyze / aggregate --------------------------------------------
+
+    def analyze(self, article):
+        max_chars = article.site.get('max_chars', 3000)
+        formatted_text = self.ctx.parser.format_for_analysis(article.full_text, article.url, max_chars=max_chars)
+        article.text = article.full_text = None
+
+        article.insights = []
+        if formatted_text:
+            insights = self.ctx.analyzer.analyze([formatted_text])
+            article.insights = [i for i in insights if abs(i['likelihood_score']) > 0]
+        yield article
+
+    def aggregate(self, article):
+        site_name = article.site.get('name')
+        if article.insights:
+            logger.debug("Found %d insights in %s", len(article.insights), article.url)
+            self.ctx.report.count(site_name, 'insights', len(article.insights))
+            if self.scheduler:
+                self.scheduler.record_insights(site_name, len(article.insights))
+            # Attach metadata and de-duplicate
+            for result in article.insights:
+                i = Insight.from_result(result, keep_text=self.keep_insight_text)
+                i['source_url'] = article.url # Keep original URL for the email
+                i['site_name'] = site_name
+                if article.listing and article.listing.get('tickers'):
+                    i['ticker_hints'] = article.listing['tickers']
+
+                # De-duplication: skipped if the snippet was already seen
+                self.ctx.add_insight(i)
+
+        # Mark as processed
+        self.ctx.state_manager.mark_processed(article.state_key)
+        return ()
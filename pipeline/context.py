@@ -0,0 +1,118 @@
+import collections
+import logging
+import threading
+import time
+
+from scraper.fetcher import Fetcher
+from pipeline.report import RunReport
+
+logger = logging.getLogger(__name__)
+
+# Watch mode forgets run-wide titles/snippets past this many (processed URLs still skip repeats)
+MAX_SEEN_ENTRIES = 20000
+# Watch mode applies the state and near-duplicate retention windows this often
+# (a one-shot run applies them when the stores are opened)
+RETENTION_INTERVAL_SECONDS = 86400
+
+
+class RunContext:
+    """
+    Components and run-wide results shared by every site worker.
+
+    The de-duplication sets and the insight list are only touched under
+    `lock`, so sites can run concurrently and still merge into one result.
+    """
+
+    def __init__(self, parser, canonicalizer, state_manager, analyzer, near_duplicates, thresholds,
+                 fetcher_factory=Fetcher):
+        self.parser = parser
+        self.canonicalizer = canonicalizer
+        self.state_manager = state_manager
+        self.analyzer = analyzer
+        self.near_duplicates = near_duplicates
+        self.thresholds = thresholds
+        # Called once per site; each site gets its own session
+        self.fetcher_factory = fetcher_factory
+
+        self.lock = threading.Lock()
+        self.fetchers = {}
+        # Normalized title -> URL that claimed it
+        self.seen_titles = {}
+        self.seen_snippets = set()
+        self.all_insights = []
+        # Articles dropped per pipeline filter (paywall, freshness, ...)
+        self.skip_counts = collections.Counter()
+        # Per-site counts and stage timings for the run history
+        self.report = RunReport()
+        # The stores applied their retention when opened
+        self.retention_applied_at = time.time()
+
+    def start_cycle(self):
+        """
+        Resets per-run results so a long-lived context can run again (watch
+        mode); fetcher sessions, components and state caches stay warm.
+        """
+        with self.lock:
+            self.all_insights = []
+            self.skip_counts.clear()
+            self.report = RunReport()
+            if len(self.seen_titles) > MAX_SEEN_ENTRIES:
+                self.seen_titles.clear()
+            if len(self.seen_snippets) > MAX_SEEN_ENTRIES:
+                self.seen_snippets.clear()
+            fetchers = list(self.fetchers.values())
+        for fetcher in fetchers:
+            fetcher.clear_cache()
+        self.canonicalizer.reset()
+        if time.time() - self.retention_applied_at >= RETENTION_INTERVAL_SECONDS:
+            self.apply_retention()
+
+    def apply_retention(self):
+        """Expires processed URLs and near-duplicate fingerprints past their retention windows."""
+        self.retention_applied_at = time.time()
+        compacted = self.state_manager.compact()
+        pruned = self.near_duplicates.prune()
+        logger.info("Retention applied: %d processed URLs and %d near-duplicate fingerprints expired",
+                    compacted, pruned)
+
+    def fetcher_for(self, site_name):
+        """The site's Fetcher, shared by its discovery and fetch stages."""
+        with self.lock:
+            fetcher = self.fetchers.get(site_name)
+            if fetcher is None:
+                fetcher = self.fetchers[site_name] = self.fetcher_factory()
+            return fetcher
+
+    @property
+    def fetch_cache_hits(self):
+        return sum(fetcher.cache_hits for fetcher in self.fetchers.values())
+
+    def count_skip(self, reason, count=1, site=None):
+        with self.lock:
+            self.skip_counts[reason] += count
+        if site:
+            self.report.skip(site, reason, count)
+
+    def claim_title(self, title, owner=None):
+        """
+        True the first time a (normalized) title is seen this run, or when
+        `owner` (the article's URL) is the one that claimed it, so a title
+        claimed from a listing page still passes for its own article.
+        """
+        norm_title = " ".join(title.lower().split())
+        with self.lock:
+            if norm_title in self.seen_titles:
+                return owner is not None and self.seen_titles[norm_title] == owner
+            self.seen_titles[norm_title] = owner
+            return True
+
+    def add_insight(self, insight):
+        """Keeps the insight unless one with the same snippet was already kept."""
+        # Using a simple hash of the snippet text to identify duplicates
+        snippet_hash = hash(insight.get('snippet', ''))
+        with self.lock:
+            if snippet_hash in self.seen_snippets:
+                return False
+            self.seen_snippets.add(snippet_hash)
+            self.all_insights.append(insight)
+            return True
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.scheduler import CrawlScheduler, DEFAULT_SCHEDULE_STATE_PATH
+from pipeline.report import RunReport, DEFAULT_HISTORY_PATH
+from scraper.edgar import EdgarWatermark, DEFAULT_EDGAR_WATERMARK_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("DAEMON_CHECKPOINT_PATH", "daemon_checkpoint.json")
+
+
+class Daemon:
+    """
+    Watch mode: one long-lived process polls each site on its own interval
+    (`poll_seconds` per site, default `poll_interval_seconds` in sites.yaml)
+    and alerts on each cycle's new insights, instead of a cron job paying the
+    full startup cost every hour.
+
+    The RunContext stays warm across cycles (fetcher sessions, analyzer,
+    state caches, near-duplicate index); only per-cycle results are reset.
+
+    After every cycle the checkpoint file records when each site was last
+    polled and the alerts about to be sent. A restart resumes the polling
+    schedule and resends alerts a crash interrupted, so alerts are delivered
+    at least once.
+    """
+
+    def __init__(self, ctx, sites_config, notify, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+                 schedule_state_path=DEFAULT_SCHEDULE_STATE_PATH, history_path=DEFAULT_HISTORY_PATH,
+                 watermark_path=DEFAULT_EDGAR_WATERMARK_PATH):
+        self.ctx = ctx
+        self.sites_config = sites_config
+        self.sites = sites_config.get('sites', [])
+        self.default_interval = float(sites_config.get('poll_interval_seconds', 300))
+        # Called with the list of new insights after each cycle
+        self.notify = notify
+        self.checkpoint_path = checkpoint_path
+        self.schedule_state_path = schedule_state_path
+        self.history_path = history_path
+        # sec_edgar sites read the filings feed only back to the previous cycle
+        self.watermark = EdgarWatermark(watermark_path)
+
+        self.last_polled = {}
+        self.pending_alerts = []
+        self.cycles = 0
+        self._stop = threading.Event()
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read daemon checkpoint %s: %s", self.checkpoint_path, e)
+            return
+        self.last_polled = checkpoint.get('last_polled', {})
+        self.pending_alerts = checkpoint.get('pending_alerts', [])
+        logger.info("Resuming from checkpoint: %d sites polled before, %d alerts pending",
+                    len(self.last_polled), len(self.pending_alerts))
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                # Insights are dict-like (processor.insight.Insight); saved as plain dicts
+                alerts = [dict(alert) for alert in self.pending_alerts]
+                json.dump({'last_polled': self.last_polled, 'pending_alerts': alerts}, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
+        except OSError as e:
+            logger.warning("Could not save daemon checkpoint %s: %s", self.checkpoint_path, e)
+
+    def interval(self, site):
+        return float(site.get('poll_seconds', self.default_interval))
+
+    def next_poll(self, site):
+        """Wall-clock time the site is due (its last poll plus its interval)."""
+        return self.last_polled.get(site.get('name'), 0.0) + self.interval(site)
+
+    def due_sites(self, now=None):
+        now = now or time.time()
+        return [site for site in self.sites if self.next_poll(site) <= now]
+
+    def run_cycle(self, sites):
+        """Polls `sites` once, checkpoints, then sends their new insights."""
+        ctx = self.ctx
+        ctx.start_cycle()
+        polled_at = time.time()
+        scheduler = CrawlScheduler(state_path=self.schedule_state_path)
+        stages = ArticlePipeline(ctx, self.sites_config, scheduler=scheduler, watermark=self.watermark).run(sites)
+
+        # Processed URLs and the alerts they produced are on disk before anything is sent
+        ctx.state_manager.flush()
+        ctx.near_duplicates.flush()
+        scheduler.save()
+        self.watermark.save()
+        for site in sites:
+            self.last_polled[site.get('name')] = polled_at
+        self.pending_alerts.extend(ctx.all_insights)
+        self._save_checkpoint()
+        if self.history_path:
+            RunReport.append_to(ctx.report.finish(mode='daemon', pipeline=stages.stats(),
+                                                  skipped=dict(ctx.skip_counts)), self.history_path)
+        self.cycles += 1
+        logger.info("Cycle %d: polled %s in %.1fs, %d new insights", self.cycles,
+                    ", ".join(s.get('name') for s in sites), time.time() - polled_at, len(ctx.all_insights))
+        self.send_pending()
+
+    def send_pending(self):
+        if not self.pending_alerts:
+            return
+        self.notify(self.pending_alerts)
+        self.pending_alerts = []
+        self._save_checkpoint()
+
+    def run(self, max_cycles=None):
+        """Polls until stop() (or `max_cycles` cycles), sleeping until the next site is due."""
+        self.send_pending()
+        while not self._stop.is_set():
+            due = self.due_sites()
+            if due:
+                try:
+                    self.run_cycle(due)
+                except Exception as e:
+                    # Keep polling; the failed sites are retried when next due
+                    logger.exception("Error in poll cycle: %s", e)
+                    for site in due:
+                        self.last_polled[site.get('name')] = time.time()
+                if max_cycles and self.cycles >= max_cycles:
+                    break
+                continue
+            wait = min(self.next_poll(site) for site in self.sites) - time.time() if self.sites else self.default_interval
+            self._stop.wait(max(wait, 0.1))
+
+    def stop(self):
+        """Ends the loop after the current cycle (safe to call from a signal handler)."""
+        self._stop.set()
@@ -0,0 +1,82 @@
+import gc
+import logging
+import os
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Stop fetching once the process uses more than this (MiB, 0 = no cap)
+DEFAULT_MAX_MEMORY_MB = float(os.getenv("MAX_MEMORY_MB", 0))
+# Without a cap, on Lambda: this share of the function's memory (the rest is
+# headroom for the articles in flight and for sending)
+LAMBDA_MEMORY_SHARE = 0.85
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mib():
+    """Resident set size now (Linux /proc), else the peak so far; None if unknown."""
+    try:
+        with open("/proc/self/statm", 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mib()
+
+
+def peak_rss_mib():
+    """Highest resident set size of the process so far; None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def default_cap_mib(sites_config=None):
+    """MAX_MEMORY_MB, else `max_memory_mb` in sites.yaml, else a share of the Lambda's memory, else None."""
+    cap = DEFAULT_MAX_MEMORY_MB or (sites_config or {}).get('max_memory_mb')
+    if not cap and os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE"):
+        cap = float(os.environ["AWS_LAMBDA_FUNCTION_MEMORY_SIZE"]) * LAMBDA_MEMORY_SHARE
+    return float(cap) if cap else None
+
+
+class MemoryGuard:
+    """
+    Peak-memory cap for a run. The fetch stage asks over_cap() before each
+    download; past the cap a full garbage collection gets one chance to
+    bring the process back under it, then the guard trips and stays tripped
+    for the run (freed memory is rarely returned to the OS). Articles not
+    fetched are left for the next run, and the run still sends its alerts
+    instead of being killed mid-way.
+    """
+
+    def __init__(self, cap_mib=None):
+        self.cap_mib = cap_mib
+        self.tripped = False
+        self.peak_mib = 0.0
+        self._lock = threading.Lock()
+
+    def over_cap(self):
+        if not self.cap_mib:
+            return False
+        with self._lock:
+            if self.tripped:
+                return True
+            rss = current_rss_mib()
+            if rss is None:
+                return False
+            if rss > self.cap_mib:
+                gc.collect()
+                rss = current_rss_mib()
+            self.peak_mib = max(self.peak_mib, rss)
+            if rss > self.cap_mib:
+                self.tripped = True
+                logger.warning("Memory at %.0f MiB is over the %.0f MiB cap; no more articles are fetched this run",
+                               rss, self.cap_mib)
+            return self.tripped
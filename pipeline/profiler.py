@@ -0,0 +1,253 @@
+import cProfile
+import collections
+import contextlib
+import datetime
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profile")
+# Profile every Nth item of each stage (1 = all of them)
+DEFAULT_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", 1))
+DEFAULT_TOP_N = int(os.getenv("PROFILE_TOP_N", 15))
+# Seconds between stack samples for the flamegraph
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Site name used for work that is not per site (sending notifications)
+RUN_SITE = "run"
+
+
+class StageProfiler:
+    """
+    Profiling mode (`main.py --profile`, or ENABLE_PROFILING=true): every
+    sampled pipeline step runs under cProfile and tracemalloc, and a sampler
+    thread records its call stacks.
+
+    Sampled steps run one at a time, so each profile and memory peak belongs
+    to one site and stage; unsampled items (`sample_every`) run concurrently
+    as usual. Nothing is wrapped when profiling is off.
+
+    write() produces, in one directory per run:
+      stacks.folded   collapsed stacks ("site;stage;frame;... count") for
+                      flamegraph.pl, speedscope or inferno
+      <site>.pstats   merged cProfile data per site (snakeviz, pstats)
+      hotspots.txt    per-site stage table and top-N functions by own time
+      summary.json    the same numbers, machine-readable
+    """
+
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR, sample_every=DEFAULT_SAMPLE_EVERY, top_n=DEFAULT_TOP_N,
+                 sample_interval=DEFAULT_SAMPLE_INTERVAL, memory=True):
+        self.output_dir = output_dir
+        self.sample_every = max(1, int(sample_every))
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self.memory = memory
+
+        self.stats = {}
+        # (site, stage) -> {'sampled', 'seconds', 'peak_bytes'}
+        self.stages = {}
+        self.stacks = collections.Counter()
+        self.top_allocations = []
+        self._seen = collections.Counter()
+        self._lock = threading.Lock()
+        self._step_lock = threading.Lock()
+        # thread id -> (site, stage) of the step it is running
+        self._active = {}
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started_tracemalloc = False
+
+    # --- lifecycle ------------------------------------------------------
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_stacks, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            self.top_allocations = [
+                {'where': str(stat.traceback), 'size_kib': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.top_n]
+            ]
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    # --- wrapping -------------------------------------------------------
+
+    def wrap(self, stage, handler, site_of):
+        """
+        Stage handler (a generator function, see pipeline.stages) profiling
+        every `sample_every`-th item; `site_of(item)` names the item's site.
+        """
+        def profiled(item):
+            with self._lock:
+                self._seen[stage] += 1
+                sampled = (self._seen[stage] - 1) % self.sample_every == 0
+            if not sampled:
+                yield from handler(item) or ()
+                return
+            site_name = site_of(item)
+            self._count_sampled(site_name, stage)
+            results = iter(handler(item) or ())
+            while True:
+                try:
+                    result = self._step(site_name, stage, results.__next__)
+                except StopIteration:
+                    return
+                yield result
+        return profiled
+
+    @contextlib.contextmanager
+    def section(self, stage, site_name=RUN_SITE):
+        """Profiles the body of the with block as one step (e.g. sending notifications)."""
+        self._count_sampled(site_name, stage)
+        with self._step_lock:
+            started = self._begin(site_name, stage)
+            try:
+                yield
+            finally:
+                self._end(site_name, stage, *started)
+
+    def _count_sampled(self, site_name, stage):
+        with self._lock:
+            entry = self.stages.setdefault((site_name, stage), {'sampled': 0, 'seconds': 0.0, 'peak_bytes': 0})
+            entry['sampled'] += 1
+
+    def _step(self, site_name, stage, step):
+        with self._step_lock:
+            started = self._begin(site_name, stage)
+            try:
+                return step()
+            finally:
+                self._end(site_name, stage, *started)
+
+    def _begin(self, site_name, stage):
+        base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._active[threading.get_ident()] = (site_name, stage)
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile, base, time.perf_counter()
+
+    def _end(self, site_name, stage, profile, base, started):
+        profile.disable()
+        elapsed = time.perf_counter() - started
+        self._active.pop(threading.get_ident(), None)
+        peak = tracemalloc.get_traced_memory()[1] - base if tracemalloc.is_tracing() else 0
+        with self._lock:
+            entry = self.stages[(site_name, stage)]
+            entry['seconds'] += elapsed
+            entry['peak_bytes'] = max(entry['peak_bytes'], peak)
+            try:
+                if site_name in self.stats:
+                    self.stats[site_name].add(profile)
+                else:
+                    self.stats[site_name] = pstats.Stats(profile)
+            except TypeError:
+                # Nothing was called during the step
+                pass
+
+    def _sample_stacks(self):
+        """Records the stack of the running sampled step every `sample_interval` seconds."""
+        while not self._stop.wait(self.sample_interval):
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, (site_name, stage) in list(self._active.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and frame.f_code is not _STEP_CODE:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                root = f"{site_name.replace(';', '_')};{stage}".replace(" ", "_")
+                with self._lock:
+                    self.stacks[";".join([root] + stack[::-1])] += 1
+
+    # --- output ---------------------------------------------------------
+
+    def hotspots(self, site_name, top_n=None):
+        """The site's top functions by own time: dicts with calls, tottime, cumtime, function."""
+        stats = self.stats.get(site_name)
+        if stats is None:
+            return []
+        rows = []
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            where = f"{os.path.basename(filename)}:{line}({func})" if line else func
+            rows.append({'function': where, 'calls': calls, 'tottime': tottime, 'cumtime': cumtime})
+        rows.sort(key=lambda row: row['tottime'], reverse=True)
+        return rows[:top_n or self.top_n]
+
+    def summary(self):
+        """JSON-ready per-site stage times, memory peaks and hotspots."""
+        sites = {}
+        for (site_name, stage), entry in sorted(self.stages.items()):
+            sites.setdefault(site_name, {'stages': {}})['stages'][stage] = {
+                'sampled': entry['sampled'],
+                'seconds': round(entry['seconds'], 4),
+                'peak_kib': round(entry['peak_bytes'] / 1024, 1),
+            }
+        for site_name, site in sites.items():
+            site['hotspots'] = [dict(row, tottime=round(row['tottime'], 4), cumtime=round(row['cumtime'], 4))
+                                for row in self.hotspots(site_name)]
+        return {'sample_every': self.sample_every, 'sites': sites, 'top_allocations': self.top_allocations}
+
+    def report(self):
+        """Text table per site: time and memory peak per stage, then the top-N hotspots."""
+        lines = []
+        for site_name, site in self.summary()['sites'].items():
+            lines.append(f"== {site_name}")
+            lines.append(f"{'stage':<16}{'sampled':>8}{'seconds':>10}{'peak KiB':>10}")
+            for stage, entry in site['stages'].items():
+                lines.append(f"{stage:<16}{entry['sampled']:>8}{entry['seconds']:>10.3f}{entry['peak_kib']:>10.1f}")
+            lines.append(f"{'calls':>8}{'tottime':>10}{'cumtime':>10}  function")
+            for row in site['hotspots']:
+                lines.append(f"{row['calls']:>8}{row['tottime']:>10.4f}{row['cumtime']:>10.4f}  {row['function']}")
+        return "\n".join(lines)
+
+    def write(self):
+        """Writes the profile files to a new timestamped directory; returns its path (None on failure)."""
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, stamp)
+        try:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, "stacks.folded"), 'w') as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            for site_name, stats in self.stats.items():
+                stats.dump_stats(os.path.join(path, f"{_file_safe(site_name)}.pstats"))
+            with open(os.path.join(path, "hotspots.txt"), 'w') as f:
+                f.write(self.report() + "\n")
+            with open(os.path.join(path, "summary.json"), 'w') as f:
+                json.dump(self.summary(), f, indent=2)
+        except OSError as e:
+            logger.warning("Could not write profile to %s: %s", path, e)
+            return None
+        return path
+
+
+def _file_safe(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+# Stack sampling stops at the profiler's own frames
+_STEP_CODE = StageProfiler._step.__code__
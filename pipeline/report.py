@@ -0,0 +1,137 @@
+import datetime
+import functools
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from pipeline.memory import peak_rss_mib
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.getenv("RUN_HISTORY_PATH", "logs/run_history.jsonl")
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    """APP_VERSION, else the git commit of the working tree, else "unknown"."""
+    version = os.getenv("APP_VERSION")
+    if version:
+        return version
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+class RunReport:
+    """
+    Structured per-site account of one run: URLs found/fetched, bytes,
+    wall and CPU time per pipeline stage, skips by reason, insights and the
+    highest RSS seen after any of the site's pipeline steps.
+
+    Pipeline workers update it concurrently (under `lock`); finish() returns
+    the JSON-ready report and append_to() adds it as one line to the history
+    file, so throughput can be compared between versions.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def _site(self, site_name):
+        entry = self.sites.get(site_name)
+        if entry is None:
+            entry = self.sites[site_name] = {
+                'site': site_name,
+                'urls_found': 0,
+                'fetched': 0,
+                'bytes': 0,
+                'insights': 0,
+                'peak_rss_mib': None,
+                'skipped': {},
+                'stages': {},
+            }
+        return entry
+
+    def count(self, site_name, key, n=1):
+        with self.lock:
+            entry = self._site(site_name)
+            entry[key] = entry.get(key, 0) + n
+
+    def skip(self, site_name, reason, n=1):
+        with self.lock:
+            skipped = self._site(site_name)['skipped']
+            skipped[reason] = skipped.get(reason, 0) + n
+
+    def add_time(self, site_name, stage, wall_seconds, cpu_seconds):
+        with self.lock:
+            timing = self._site(site_name)['stages'].setdefault(
+                stage, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0}
+            )
+            timing['calls'] += 1
+            timing['wall_seconds'] += wall_seconds
+            timing['cpu_seconds'] += cpu_seconds
+
+    def observe_rss(self, site_name, rss_mib):
+        if rss_mib is None:
+            return
+        with self.lock:
+            entry = self._site(site_name)
+            entry['peak_rss_mib'] = round(max(entry['peak_rss_mib'] or 0.0, rss_mib), 1)
+
+    def finish(self, **extra):
+        """The report as a JSON-ready dict; `extra` adds run-level fields (pipeline stats, ...)."""
+        with self.lock:
+            sites = json.loads(json.dumps(list(self.sites.values())))
+        for entry in sites:
+            for timing in entry['stages'].values():
+                timing['wall_seconds'] = round(timing['wall_seconds'], 4)
+                timing['cpu_seconds'] = round(timing['cpu_seconds'], 4)
+        report = {
+            'started_at': self.started_at.isoformat(),
+            'version': code_version(),
+            'wall_seconds': round(time.perf_counter() - self._started, 3),
+            'cpu_seconds': round(time.process_time() - self._cpu_started, 3),
+            'peak_rss_mib': round(max([peak_rss_mib() or 0.0] + [entry['peak_rss_mib'] or 0.0 for entry in sites]), 1) or None,
+            'totals': {
+                key: sum(entry.get(key, 0) for entry in sites)
+                for key in ('urls_found', 'fetched', 'bytes', 'insights')
+            },
+            'sites': sites,
+        }
+        report.update(extra)
+        return report
+
+    @staticmethod
+    def append_to(report, path=DEFAULT_HISTORY_PATH):
+        """Appends `report` as one JSON line to the history file."""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'a') as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            logger.warning("Could not append run report to %s: %s", path, e)
+
+    @staticmethod
+    def summary(report):
+        """One line per site for the console."""
+        lines = []
+        for entry in report['sites']:
+            busy = sum(t['wall_seconds'] for t in entry['stages'].values())
+            skipped = ", ".join(f"{reason} {n}" for reason, n in sorted(entry['skipped'].items())) or "none"
+            lines.append(
+                f"{entry['site']}: {entry['urls_found']} found, {entry['fetched']} fetched "
+                f"({entry['bytes'] / 1024:.0f} KiB), {entry['insights']} insights, "
+                f"{busy:.1f}s in stages, peak RSS {entry.get('peak_rss_mib')} MiB; skipped: {skipped}"
+            )
+        return "\n".join(lines)
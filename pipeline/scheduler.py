@@ -0,0 +1,183 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE_STATE_PATH = os.getenv("SCHEDULE_STATE_PATH", "schedule_state.json")
+
+# Weight of the latest run in the per-site yield/speed averages
+EWMA_ALPHA = 0.3
+
+# Carried-over URLs older than this are dropped (they are long stale by then)
+CARRYOVER_MAX_AGE = datetime.timedelta(hours=24)
+
+
+class CrawlScheduler:
+    """
+    Keeps a run inside its time limit.
+
+    The run gets a deadline (`run_seconds` minus `reserve_seconds`, kept for
+    flushing state and sending the email). Each site gets a budget inside it
+    (`budget_seconds` in sites.yaml, default: until the deadline); once a
+    site's budget or the deadline is spent its remaining URLs are not fetched
+    but carried over to the next run, and sites not yet started are skipped.
+
+    Sites start in order of past yield (insights per second spent), new sites
+    first so they get measured. Within a site the newest listed articles go
+    first. Per-site averages and the carry-over live in `state_path`.
+    """
+
+    def __init__(self, run_seconds=None, reserve_seconds=60, state_path=DEFAULT_SCHEDULE_STATE_PATH):
+        self.started = time.monotonic()
+        self.deadline = None
+        if run_seconds:
+            self.deadline = self.started + max(0.0, run_seconds - reserve_seconds)
+        self.state_path = state_path
+        self.state = self._load()
+
+        self.lock = threading.Lock()
+        self.site_deadlines = {}
+        # This run: site -> {'articles', 'insights', 'seconds'}
+        self.run_stats = {}
+        # Next run: site -> {url: listing record}
+        self.carryover = {}
+        self.skipped_sites = []
+        # Sites whose previous carry-over was taken up this run
+        self._resumed = set()
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {'sites': {}, 'carryover': {}}
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            state.setdefault('sites', {})
+            state.setdefault('carryover', {})
+            return state
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read schedule state %s: %s", self.state_path, e)
+            return {'sites': {}, 'carryover': {}}
+
+    def time_left(self):
+        """Seconds until the run deadline (None without one)."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def expected_yield(self, site_name):
+        history = self.state['sites'].get(site_name)
+        if not history:
+            return None
+        return history.get('insights', 0.0) / max(history.get('seconds', 0.0), 1.0)
+
+    def order_sites(self, sites):
+        """Unmeasured sites first, then by insights per second in past runs."""
+        def key(site):
+            expected = self.expected_yield(site.get('name'))
+            return (expected is not None, -(expected or 0.0))
+        return sorted(sites, key=key)
+
+    def start_site(self, site):
+        """Sets the site's deadline; False if the run has no time left for it."""
+        name = site.get('name')
+        now = time.monotonic()
+        deadline = self.deadline
+        if site.get('budget_seconds'):
+            site_deadline = now + float(site['budget_seconds'])
+            deadline = site_deadline if deadline is None else min(deadline, site_deadline)
+        with self.lock:
+            self.site_deadlines[name] = deadline
+            self.run_stats.setdefault(name, {'articles': 0, 'insights': 0, 'seconds': 0.0})
+            if deadline is not None and now >= deadline:
+                self.skipped_sites.append(name)
+                return False
+        return True
+
+    def allow_fetch(self, site_name):
+        deadline = self.site_deadlines.get(site_name, self.deadline)
+        return deadline is None or time.monotonic() < deadline
+
+    def carried(self, site_name):
+        """Listing records left unfetched by the previous run, still recent enough."""
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - CARRYOVER_MAX_AGE
+        with self.lock:
+            self._resumed.add(site_name)
+        records = []
+        for entry in self.state['carryover'].get(site_name, []):
+            carried_at = datetime.datetime.fromisoformat(entry['carried_at'])
+            if carried_at < cutoff:
+                continue
+            record = dict(entry['record'])
+            if record.get('published_at'):
+                record['published_at'] = datetime.datetime.fromisoformat(record['published_at'])
+            records.append(record)
+        return records
+
+    def carry(self, site_name, url, listing=None):
+        record = dict(listing or {'url': url, 'title': None, 'published_at': None, 'tickers': []})
+        record['url'] = url
+        with self.lock:
+            self.carryover.setdefault(site_name, {})[url] = record
+
+    def record_fetch(self, site_name, seconds):
+        with self.lock:
+            stats = self.run_stats.setdefault(site_name, {'articles': 0, 'insights': 0, 'seconds': 0.0})
+            stats['articles'] += 1
+            stats['seconds'] += seconds
+
+    def record_insights(self, site_name, count):
+        with self.lock:
+            stats = self.run_stats.setdefault(site_name, {'articles': 0, 'insights': 0, 'seconds': 0.0})
+            stats['insights'] += count
+
+    def save(self):
+        """Folds this run into the per-site averages and writes the carry-over."""
+        sites = self.state['sites']
+        for name, stats in self.run_stats.items():
+            if not stats['articles']:
+                continue
+            history = sites.get(name)
+            if history is None:
+                sites[name] = {key: float(stats[key]) for key in ('articles', 'insights', 'seconds')}
+                continue
+            for key in ('articles', 'insights', 'seconds'):
+                history[key] = (1 - EWMA_ALPHA) * history.get(key, 0.0) + EWMA_ALPHA * stats[key]
+
+        carried_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        # Sites that never started keep what they were already carrying
+        carryover = {name: entries for name, entries in self.state['carryover'].items() if name not in self._resumed}
+        for name, records in self.carryover.items():
+            entries = []
+            for record in records.values():
+                record = dict(record)
+                if isinstance(record.get('published_at'), datetime.datetime):
+                    record['published_at'] = record['published_at'].isoformat()
+                entries.append({'carried_at': carried_at, 'record': record})
+            carryover[name] = carryover.get(name, []) + entries
+        self.state['carryover'] = carryover
+
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning("Could not save schedule state %s: %s", self.state_path, e)
+
+    def report(self):
+        carried = sum(len(records) for records in self.carryover.values())
+        elapsed = time.monotonic() - self.started
+        line = f"Scheduler: finished in {elapsed:.0f}s"
+        time_left = self.time_left()
+        if time_left is not None:
+            line += f" ({time_left:.0f}s before the deadline)"
+        line += f", {carried} URLs carried over to the next run"
+        if self.skipped_sites:
+            line += f", sites not started: {', '.join(self.skipped_sites)}"
+        return line
@@ -0,0 +1,121 @@
+import datetime
+import hashlib
+import logging
+import os
+
+from processor.insight import Insight
+
+logger = logging.getLogger(__name__)
+
+# Marker the reduce step leaves so the alerts for a run go out once
+REDUCED_MARKER = "reduced"
+
+
+def resolve_run_id(run_id=None):
+    """
+    `run_id`, else RUN_ID. There is no default: anything derived from the
+    clock (say, the current hour) splits workers started on either side of
+    a boundary, and a late reduce would look for the wrong run.
+    """
+    run_id = run_id or os.getenv("RUN_ID")
+    if not run_id:
+        raise ValueError("A sharded run needs a run id shared by its workers and the reduce step "
+                         "(--run-id, RUN_ID, or \"run_id\" in the Lambda event)")
+    return run_id
+
+
+class Shard:
+    """
+    Worker `index` of `count` ("i/n", 0 <= i < n). A key (site name or
+    canonical URL) belongs to exactly one worker, picked by a stable hash,
+    so every worker given the same sites and URLs agrees on the split
+    without talking to the others.
+    """
+
+    def __init__(self, index, count):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index}/{count}: need 0 <= i < n")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec):
+        """Shard from "i/n" (e.g. "0/4"); None for None or ""."""
+        if not spec:
+            return None
+        try:
+            index, count = (int(part) for part in str(spec).split('/'))
+        except ValueError:
+            raise ValueError(f"Invalid shard {spec!r}: expected i/n, e.g. 0/4") from None
+        return cls(index, count)
+
+    def owns(self, key):
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % self.count == self.index
+
+    @property
+    def name(self):
+        return f"shard-{self.index:03d}-of-{self.count:03d}"
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+
+def write_shard(store, run_id, shard, insights, report=None):
+    """Leaves a worker's insights (and its run report) in the shared store for the reduce step."""
+    location = store.put(run_id, shard.name, {
+        'run_id': run_id,
+        'shard': str(shard),
+        'written_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'insights': [dict(insight) for insight in insights],
+        'report': report,
+    })
+    logger.info("Shard %s wrote %d insights to %s", shard, len(insights), location)
+    return location
+
+
+def reduce_shards(store, run_id, count, notify):
+    """
+    Merges the workers' insights for `run_id`, drops duplicates (same
+    snippet, as within a run) and calls `notify(insights)` once, which applies
+    the alert thresholds and sends. Missing shards are reported, not waited
+    for; a second reduce of the same run sends nothing. With no results at
+    all nothing is sent or marked, so the reduce can be run again later.
+    """
+    results = {name: payload for name, payload in store.get_all(run_id).items() if name.startswith("shard-")}
+    expected = {Shard(index, count).name for index in range(count)}
+    missing = sorted(expected - set(results))
+    if not results:
+        logger.warning("Run %s: no shard results found; nothing sent", run_id)
+        return {'run_id': run_id, 'shards': 0, 'missing': missing, 'insights': 0, 'duplicates': 0, 'sent': False}
+    if missing:
+        logger.warning("Run %s: no result from %d of %d shards (%s)", run_id, len(missing), count, ", ".join(missing))
+
+    insights = []
+    seen_snippets = set()
+    duplicates = 0
+    for name in sorted(results):
+        for fields in results[name].get('insights', []):
+            snippet_hash = hash(fields.get('snippet', ''))
+            if snippet_hash in seen_snippets:
+                duplicates += 1
+                continue
+            seen_snippets.add(snippet_hash)
+            insights.append(Insight(**fields))
+
+    summary = {
+        'run_id': run_id,
+        'shards': len(results),
+        'missing': missing,
+        'insights': len(insights),
+        'duplicates': duplicates,
+        'sent': False,
+    }
+    if not store.claim(run_id, REDUCED_MARKER):
+        logger.warning("Run %s was already reduced; not sending again", run_id)
+        return summary
+    logger.info("Run %s: %d insights from %d shards (%d duplicates dropped)",
+                run_id, len(insights), len(results), duplicates)
+    notify(insights)
+    summary['sent'] = True
+    return summary
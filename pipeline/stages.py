@@ -0,0 +1,189 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a worker its input is exhausted
+_DONE = object()
+
+
+class StageStats:
+    """Counters for one stage; updated by its workers under `lock`."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.lanes = 0
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.max_depth = 0
+        # Time spent in the handler, excluding time blocked on a full downstream queue
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def throughput(self):
+        """Items handled per second of the stage's lifetime."""
+        elapsed = self.elapsed()
+        return self.received / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'workers': self.workers * max(self.lanes, 1),
+            'received': self.received,
+            'emitted': self.emitted,
+            'errors': self.errors,
+            'max_queue_depth': self.max_depth,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'items_per_second': round(self.throughput(), 2),
+        }
+
+
+class Stage:
+    """
+    A pipeline step: `workers` threads take items from a bounded queue, call
+    `handler(item)` and pass everything it yields to the next stage.
+
+    A full downstream queue blocks the worker, so a slow stage holds back the
+    ones before it and memory stays bounded by the queue sizes.
+
+    With `lane_key`, items are split into lanes (e.g. one per site), each with
+    its own queue and workers, so one busy lane cannot starve the others.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=32, lane_key=None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.lane_key = lane_key
+        self.stats = StageStats(name, workers)
+        self.downstream = None
+        self.done = threading.Event()
+
+        self._lanes = {}
+        self._threads = []
+        self._active = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _lane(self, key):
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = queue.Queue(maxsize=self.queue_size)
+                self.stats.lanes = len(self._lanes)
+                if self.stats.started is None:
+                    self.stats.started = time.perf_counter()
+                for n in range(self.workers):
+                    self._active += 1
+                    thread = threading.Thread(
+                        target=self._work, args=(lane,), name=f"{self.name}-{key}-{n}", daemon=True
+                    )
+                    self._threads.append(thread)
+                    thread.start()
+            return lane
+
+    def put(self, item):
+        """Queues an item, blocking while this stage's (lane) queue is full."""
+        lane = self._lane(self.lane_key(item) if self.lane_key else None)
+        lane.put(item)
+        depth = lane.qsize()
+        with self.stats.lock:
+            self.stats.max_depth = max(self.stats.max_depth, depth)
+
+    def depth(self):
+        return sum(lane.qsize() for lane in list(self._lanes.values()))
+
+    def close(self):
+        """Called once the upstream will send nothing more."""
+        with self._lock:
+            self._closed = True
+            lanes = list(self._lanes.values())
+            idle = self._active == 0
+        for lane in lanes:
+            for _ in range(self.workers):
+                lane.put(_DONE)
+        if idle:
+            self._finish()
+
+    def _finish(self):
+        self.stats.finished = time.perf_counter()
+        if self.downstream:
+            self.downstream.close()
+        self.done.set()
+
+    def _work(self, lane):
+        while True:
+            item = lane.get()
+            if item is _DONE:
+                break
+            with self.stats.lock:
+                self.stats.received += 1
+            started = time.perf_counter()
+            blocked = 0.0
+            try:
+                for result in self.handler(item) or ():
+                    with self.stats.lock:
+                        self.stats.emitted += 1
+                    if self.downstream:
+                        put_started = time.perf_counter()
+                        self.downstream.put(result)
+                        blocked += time.perf_counter() - put_started
+            except Exception as e:
+                with self.stats.lock:
+                    self.stats.errors += 1
+                logger.error("Error in %s stage: %s", self.name, e)
+            with self.stats.lock:
+                self.stats.busy_seconds += time.perf_counter() - started - blocked
+                self.stats.blocked_seconds += blocked
+
+        with self._lock:
+            self._active -= 1
+            last = self._active == 0 and self._closed
+        if last:
+            self._finish()
+
+
+class Pipeline:
+    """Stages connected in order; the first stage is fed with `run(items)`."""
+
+    def __init__(self, stages):
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+
+    def run(self, items):
+        """Feeds `items` to the first stage and blocks until every stage has drained."""
+        first = self.stages[0]
+        for item in items:
+            first.put(item)
+        first.close()
+        for stage in self.stages:
+            stage.done.wait()
+
+    def stats(self):
+        return [stage.stats.as_dict() for stage in self.stages]
+
+    def report(self):
+        """Per-stage table: workers, items in/out, peak queue depth, busy time, throughput."""
+        lines = [f"{'Stage':<16}{'Workers':>8}{'In':>7}{'Out':>7}{'MaxQ':>6}{'Busy s':>9}{'Blocked s':>11}{'Items/s':>9}"]
+        for row in self.stats():
+            lines.append(
+                f"{row['stage']:<16}{row['workers']:>8}{row['received']:>7}{row['emitted']:>7}"
+                f"{row['max_queue_depth']:>6}{row['busy_seconds']:>9.2f}{row['blocked_seconds']:>11.2f}"
+                f"{row['items_per_second']:>9.2f}"
+            )
+        return "\n".join(lines)
@@ -1,11 +1,34 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import logging
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import concurrent.futures
 import os
+import threading
+
+from processor.gazetteer import Gazetteer
+from processor.keyword_matcher import KeywordMatcher
+from processor.scanner import DocumentScanner
+from processor.snapshot import DEFAULT_SNAPSHOT_PATH, AnalyzerSnapshot, source_fingerprint, vader_source_files
+
+# Time spent importing this module and its dependencies (VADER, scanner, ...)
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+logger = logging.getLogger(__name__)
 
 class Analyzer:
-    def __init__(self):
-        self.sia = SentimentIntensityAnalyzer()
+    def __init__(self, thresholds=None, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+        init_started = time.perf_counter()
+
+        # Alert thresholds (email_min_score, email_min_sentiment, email_max_negative_score,
+        # email_max_negative_sentiment from sites.yaml). When set, documents that cannot
+        # reach either alert are pruned before the VADER pass.
+        self.thresholds = thresholds
+        self.scored_count = 0
+        self.pruned_count = 0
+        # Site workers share one Analyzer; the counters are updated under this lock
+        self._count_lock = threading.Lock()
         
         # Load keywords from config
         self.keywords_config_path = "config/keywords.yaml"
@@ -13,12 +36,69 @@ class Analyzer:
         self.negative_keywords = []
         self.positive_weights = {}
         self.negative_weights = {}
-        
-        self.load_keywords()
+        self.keyword_matcher = KeywordMatcher([])
+        self.scanner = DocumentScanner()
+
+        # Optional symbol master for ticker validation and company resolution
+        self.gazetteer = Gazetteer("config/symbols.csv")
+
+        # Lexicons, keywords, matcher and gazetteer come from one pickled snapshot
+        # when it is fresh; otherwise they are parsed and the snapshot rewritten.
+        self.snapshot = AnalyzerSnapshot(snapshot_path) if snapshot_path else None
+        self.snapshot_hit = self._restore_snapshot()
+        if not self.snapshot_hit:
+            self.sia = SentimentIntensityAnalyzer()
+            self.load_keywords()
+            self.gazetteer.load()
+            self._save_snapshot()
+
+        self.init_seconds = time.perf_counter() - init_started
+        # Import-to-ready cost, excluding whatever the caller did in between
+        self.startup_seconds = IMPORT_SECONDS + self.init_seconds
+
+    def _snapshot_fingerprint(self):
+        return source_fingerprint(
+            [self.keywords_config_path, self.gazetteer.source_path] + vader_source_files()
+        )
+
+    def _restore_snapshot(self):
+        if not self.snapshot:
+            return False
+        state = self.snapshot.load(self._snapshot_fingerprint())
+        if state is None:
+            return False
+
+        # SentimentIntensityAnalyzer only needs its lexicon dicts once constructed
+        self.sia = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        self.sia.lexicon = state['lexicon']
+        self.sia.emojis = state['emojis']
+
+        self.positive_keywords = state['positive_keywords']
+        self.negative_keywords = state['negative_keywords']
+        self.positive_weights = state['positive_weights']
+        self.negative_weights = state['negative_weights']
+        self.keyword_matcher = state['keyword_matcher']
+        self.gazetteer = state['gazetteer']
+        return True
+
+    def _save_snapshot(self):
+        if not self.snapshot:
+            return
+        state = {
+            'lexicon': self.sia.lexicon,
+            'emojis': self.sia.emojis,
+            'positive_keywords': self.positive_keywords,
+            'negative_keywords': self.negative_keywords,
+            'positive_weights': self.positive_weights,
+            'negative_weights': self.negative_weights,
+            'keyword_matcher': self.keyword_matcher,
+            'gazetteer': self.gazetteer,
+        }
+        self.snapshot.save(state, self._snapshot_fingerprint())
 
     def load_keywords(self):
         if not os.path.exists(self.keywords_config_path):
-            logging.error(f"Keywords config file not found: {self.keywords_config_path}")
+            logger.error("Keywords config file not found: %s", self.keywords_config_path)
             return
             
         try:
@@ -33,17 +113,92 @@ class Analyzer:
             negative_data = config.get('negative_keywords', [])
             self.negative_keywords = [item['name'] for item in negative_data]
             self.negative_weights = {item['name']: item['weight'] for item in negative_data}
+
+            # One matcher for both lists: indices below len(positive_keywords) are positive
+            self.keyword_matcher = KeywordMatcher(self.positive_keywords + self.negative_keywords)
             
-            logging.info(f"Loaded {len(self.positive_keywords)} positive and {len(self.negative_keywords)} negative keywords.")
+            logger.info("Loaded %d positive and %d negative keywords.", len(self.positive_keywords), len(self.negative_keywords))
             
         except Exception as e:
-            logging.error(f"Error loading keywords config: {e}")
+            logger.error("Error loading keywords config: %s", e)
 
-    def _calculate_score(self, text):
-        import math
+    def _resolve_entity(self, text, scan):
+        """
+        Picks (ticker, exchange, company) from the scanner's exchange candidates.
+
+        With a symbol master loaded, generic "(ABC)" guesses must be known symbols
+        (so acronyms like "(CEO)" are skipped), explicit exchange tickers must exist
+        on exchanges the master covers, and known company names are used as a
+        fallback when no ticker candidate survives.
+        """
+        gazetteer = self.gazetteer if self.gazetteer and self.gazetteer.loaded else None
+
+        for _, match_start, ticker, exchange in scan.exchange_candidates:
+            known = None
+            if gazetteer:
+                known = gazetteer.lookup(ticker)
+                if exchange == 'NA':
+                    if not known:
+                        continue
+                    exchange = known[0]
+                elif gazetteer.covers(exchange) and not known:
+                    continue
+
+            company = self._company_before(text, match_start)
+            if not company and known:
+                company = known[1] or None
+            return ticker, exchange, company
+
+        if gazetteer:
+            for _, symbol in gazetteer.find_companies(text):
+                exchange, name = gazetteer.lookup(symbol)
+                return symbol, exchange, name or None
+
+        return None, None, None
+
+    def _company_before(self, text, match_start):
+        """Guesses the company name from the capitalized words right before a ticker match."""
+        # Look at the text immediately preceding the match start
+        # We want consecutive capitalized words.
+        preceding_text = text[:match_start].strip()
+
+        # Split by non-word chars (keeping spaces) to analyze words
+        # Working backwards:
+        words = preceding_text.split()
+        company_words = []
+        for w in reversed(words):
+            # Clean punctuation first
+            clean_w = w.strip("(),.")
+
+            if not clean_w:
+                continue
+
+            # Check if word starts with uppercase (and isn't just a tiny stop word if we want to be strict, but mainly check Case)
+            if clean_w[0].isupper():
+                # If we have existing words and this is a Capitalized word, add it
+                company_words.insert(0, clean_w)
+            elif clean_w.lower() in ['inc', 'ltd', 'corp', 'group', 'holdings'] and not company_words:
+                 # Allow these suffix words even if lowercase in some sloppy text, but usually they are Cap.
+                 pass
+            else:
+                # Stop if we hit a lowercase word (likely "announced", "that", "the")
+                # Exception: "of" in "Bank of America"
+                if clean_w.lower() == 'of' and company_words:
+                    company_words.insert(0, w) # keep original w for "of"
+                    continue
+                break
+
+        if company_words:
+            return " ".join(company_words)
+        return None
+
+    # First 150 chars of the cleaned text are treated as the headline
+    HEADLINE_LIMIT = 150
+
+    def _clean_text(self, text):
+        """Returns (url, text) with the ++{URL} content++, encapsulation stripped."""
         import re
-        
-        # 0. Clean Text
+
         # Capture URL if present in encapsulation format: ++{URL} content++,
         url_match = re.search(r'^\+\+\{([^}]+)\}', text)
         url = url_match.group(1) if url_match else None
@@ -53,77 +208,25 @@ class Analyzer:
         text = re.sub(r'^\+\+\{[^}]*\}\s*', '', text)
         text = re.sub(r'^\+\+\s*', '', text)  # Fallback for ++ without URL
         text = re.sub(r'\+\+,?\s*$', '', text)
-        
-        # 1. Metadata Extraction
-        ticker = None
-        exchange = None
-        company = None
-        
+        return url, text
+
+    def _extract_metadata(self, text, url, scan):
+        """Returns (ticker, exchange, company) for a cleaned document."""
+        import re
+
         # Custom extraction for StockWatch using URL
         if url and 'stockwatch.com' in url.lower():
             # Example: https://www.stockwatch.com/News/Item/U-by1144152-U!SPTY-20260309/U/SPTY
             sw_match = re.search(r'U!([A-Za-z0-9.\-]+)-\d{8}', url)
             if sw_match:
-                ticker = sw_match.group(1)
-                exchange = "NA" # Default for extracted symbols
-
-        if not ticker:
-            # Define patterns for ticker extraction
-            # Heuristic: Priority to explicit exchanges, then generic parens
-            exchange_patterns = [
-                (r'(?:NYSE|New York Stock Exchange)\s*:\s*([A-Z]+)', 'NYSE'),
-                (r'(?:NASDAQ|Nasdaq)\s*:\s*([A-Z]+)', 'NASDAQ'),
-                (r'(?:TSX|Toronto Stock Exchange)\s*:\s*([A-Z]+)', 'TSX'),
-                (r'(?:LSE|London Stock Exchange|LN)\s*:\s*([A-Z]+)', 'LN'),
-                (r'(?:SIX)\s*:\s*([A-Z]+)', 'SIX'), # Added from user example "SIX: RO"
-                (r'\(([A-Z]{3,5})\)', 'NA') # Generic Fallback
-            ]
-            
-            for pattern_str, ex_name in exchange_patterns:
-                pattern = re.compile(pattern_str)
-                match = pattern.search(text)
-                if match:
-                    ticker = match.group(1).strip()
-                    exchange = ex_name
-                
-                    # Attempt to extract Company Name
-                    # Look at the text immediately preceding the match start
-                    # We want consecutive capitalized words.
-                    match_start = match.start()
-                    preceding_text = text[:match_start].strip()
-                    
-                    # Split by non-word chars (keeping spaces) to analyze words
-                    # Working backwards:
-                    words = preceding_text.split()
-                    company_words = []
-                    for w in reversed(words):
-                        # Clean punctuation first
-                        clean_w = w.strip("(),.")
-                        
-                        if not clean_w:
-                            continue
-
-                        # Check if word starts with uppercase (and isn't just a tiny stop word if we want to be strict, but mainly check Case)
-                        if clean_w[0].isupper():
-                            # If we have existing words and this is a Capitalized word, add it
-                            company_words.insert(0, clean_w)
-                        elif clean_w.lower() in ['inc', 'ltd', 'corp', 'group', 'holdings'] and not company_words:
-                             # Allow these suffix words even if lowercase in some sloppy text, but usually they are Cap.
-                             pass 
-                        else:
-                            # Stop if we hit a lowercase word (likely "announced", "that", "the")
-                            # Exception: "of" in "Bank of America"
-                            if clean_w.lower() == 'of' and company_words:
-                                company_words.insert(0, w) # keep original w for "of"
-                                continue
-                            break
-                    
-                    if company_words:
-                        company = " ".join(company_words)
-                    
-                    break
-
-        # 1. VaderSentiment analysis (General Tone) - Sentence Level Averaging
+                return sw_match.group(1), "NA", None # Default exchange for extracted symbols
+
+        return self._resolve_entity(text, scan)
+
+    def _vader_score(self, text):
+        """VaderSentiment analysis (General Tone) - Sentence Level Averaging."""
+        import re
+
         # Split by common sentence terminators (. ! ?)
         sentences = re.split(r'(?<=[.!?]) +', text.replace('\n', ' '))
         
@@ -141,101 +244,46 @@ class Analyzer:
             sentiment_scores = self.sia.polarity_scores(text)
             vader_score = sentiment_scores['compound']
 
-        logging.info(f"VADER Average Score: {vader_score:.3f} (over {len(sent_scores)} sentences)")
-        
-        # 2. Keyword Matching with enhancements
-        text_lower = text.lower()
-        headline_limit = 150 # First 150 chars treated as headline
-        headline_text = text_lower[:headline_limit]
-        body_text = text_lower[headline_limit:]
-        
-        # Single-word negation terms
-        negation_words = {"not", "no", "never", "unlikely", "refuse", "deny", "denied",
-                          "reject", "rejected", "without", "lack", "lacking", "fails",
-                          "failed", "unable", "hardly", "barely", "neither", "nor"}
-        # Multi-word negation phrases (checked via substring match on preceding context)
-        negation_phrases = [
-            "failed to", "unable to", "lack of", "fell short of", "falls short of",
-            "did not", "does not", "do not", "has not", "have not", "had not",
-            "will not", "would not", "could not", "cannot", "can not",
-            "no longer", "not yet", "far from", "anything but",
-        ]
-        
-        # Pre-compile word-boundary patterns for each keyword
-        def _build_keyword_pattern(keyword_lower):
-            """Build a regex pattern with word boundaries for a keyword."""
-            escaped = re.escape(keyword_lower)
-            return re.compile(r'\b' + escaped + r'\b', re.IGNORECASE)
-
-        keyword_patterns = {}
-        for kw in self.positive_keywords + self.negative_keywords:
-            keyword_patterns[kw] = _build_keyword_pattern(kw.lower())
-
-        def calculate_keyword_impact(keywords, weights, is_positive):
-            total_impact = 0.0
-            found_matches = []
-
-            for keyword in keywords:
-                pattern = keyword_patterns[keyword]
-
-                for match in pattern.finditer(text_lower):
-                    idx = match.start()
-
-                    # Context Check: Look at up to 5 words / ~50 chars before keyword
-                    context_start = max(0, idx - 50)
-                    preceding_text = text_lower[context_start:idx]
-                    preceding_words = set(preceding_text.split()[-5:])
-
-                    # Check single-word negation terms
-                    is_negated = bool(preceding_words & negation_words)
-                    # Check multi-word negation phrases in the preceding context
-                    if not is_negated:
-                        for phrase in negation_phrases:
-                            if phrase in preceding_text:
-                                is_negated = True
-                                break
-
-                    weight = weights.get(keyword, 0)
-
-                    # Headline Multiplier
-                    if idx < headline_limit:
-                        weight *= 2.0
-
-                    # Negation Logic
-                    if is_negated:
-                        # Flip impact: Positive -> Negative, Negative -> Positive
-                        # Reduce weight slightly as negated sentiment is often softer
-                        weight *= -0.8
-
-                    total_impact += weight
-                    found_matches.append(f"{keyword}{'(H)' if idx < headline_limit else ''}{'(NEG)' if is_negated else ''}")
-
-            return total_impact, found_matches
-
-        pos_impact, pos_matches = calculate_keyword_impact(self.positive_keywords, self.positive_weights, True)
-        neg_impact, neg_matches = calculate_keyword_impact(self.negative_keywords, self.negative_weights, False)
-        
-        logging.info(f"Positive Matches: {pos_matches}, Impact: {pos_impact}")
-        logging.info(f"Negative Matches: {neg_matches}, Impact: {neg_impact}")
-        
-        # Net Keyword Score
-        raw_keyword_score = pos_impact - neg_impact
-        
-        # Normalize Keyword Score using tanh to squeeze into -1.0 to 1.0
-        # Scaling factor of 5.0 allows better differentiation across a wider range
-        # of signal strengths (tanh saturates ~0.96 at raw_score=9, ~0.76 at raw_score=5)
-        keyword_norm = math.tanh(raw_keyword_score / 5.0)
-        
-        # 3. Final Combined Score
-        # Formula: 30% VADER, 70% Keywords
-        combined_score = (0.3 * vader_score) + (0.7 * keyword_norm)
-        
-        # Map -1.0..1.0 to 0..100
-        # -1 -> 0 (Bearish), 0 -> 50 (Neutral), 1 -> 100 (Bullish)
-        final_score = (combined_score + 1) * 50
-        
-        logging.info(f"Raw Keyword: {raw_keyword_score}, Norm Keyword: {keyword_norm}, Combined: {combined_score}, Final: {final_score}")
+        logger.debug("VADER Average Score: %.3f (over %d sentences)", vader_score, len(sent_scores))
+        return vader_score
+
+    @staticmethod
+    def _match_label(keyword, idx, is_negated):
+        return f"{keyword}{'(H)' if idx < Analyzer.HEADLINE_LIMIT else ''}{'(NEG)' if is_negated else ''}"
+
+    def _keyword_impact(self, keyword_hits, scan, is_positive):
+        """Sums weighted keyword matches of one polarity; returns (impact, match labels)."""
+        if is_positive:
+            keywords, weights, index_offset = self.positive_keywords, self.positive_weights, 0
+        else:
+            keywords, weights, index_offset = self.negative_keywords, self.negative_weights, len(self.positive_keywords)
+
+        total_impact = 0.0
+        found_matches = []
+
+        for k, keyword in enumerate(keywords):
+            for idx in keyword_hits.get(k + index_offset, ()):
+                # Context Check: negation cue in the ~5 words / ~50 chars before keyword
+                is_negated = scan.is_negated(idx)
+
+                weight = weights.get(keyword, 0)
+
+                # Headline Multiplier
+                if idx < self.HEADLINE_LIMIT:
+                    weight *= 2.0
 
+                # Negation Logic
+                if is_negated:
+                    # Flip impact: Positive -> Negative, Negative -> Positive
+                    # Reduce weight slightly as negated sentiment is often softer
+                    weight *= -0.8
+
+                total_impact += weight
+                found_matches.append(self._match_label(keyword, idx, is_negated))
+
+        return total_impact, found_matches
+
+    def _build_result(self, text, final_score, vader_score, pos_matches, neg_matches, ticker, exchange, company):
         # Prepare info string
         info_str = ""
         if ticker:
@@ -261,13 +309,94 @@ class Analyzer:
             'company': company
         }
 
+    def _can_reach_alert(self, keyword_norm):
+        """
+        True if some VADER score could still put this document over an alert threshold.
+
+        VADER sentence averages lie in [-1, 1] and carry 30% of the combined score, so
+        the keyword part alone bounds the final score to a +/-15 point band.
+        """
+        thresholds = self.thresholds
+        best_score = round(((0.3 * 1.0) + (0.7 * keyword_norm) + 1) * 50, 2)
+        worst_score = round(((0.3 * -1.0) + (0.7 * keyword_norm) + 1) * 50, 2)
+
+        positive = (best_score >= thresholds.get('email_min_score', 75)
+                    and thresholds.get('email_min_sentiment', 0.5) <= 1.0)
+        negative = (worst_score <= thresholds.get('email_max_negative_score', 25)
+                    and thresholds.get('email_max_negative_sentiment', -0.5) >= -1.0)
+        return positive or negative
+
+    def _calculate_score(self, text):
+        import math
+        
+        # 0. Clean Text
+        url, text = self._clean_text(text)
+        
+        # Single pass over the document for negation scopes and exchange/ticker cues
+        text_lower = text.lower()
+        scan = self.scanner.scan(text, text_lower)
+
+        # 1. Metadata Extraction
+        ticker, exchange, company = self._extract_metadata(text, url, scan)
+
+        # 2. Keyword Matching with enhancements (cheap, so it runs before VADER)
+        keyword_hits = self.keyword_matcher.find(text_lower)
+        pos_impact, pos_matches = self._keyword_impact(keyword_hits, scan, True)
+        neg_impact, neg_matches = self._keyword_impact(keyword_hits, scan, False)
+        
+        logger.debug("Positive Matches: %s, Impact: %s", pos_matches, pos_impact)
+        logger.debug("Negative Matches: %s, Impact: %s", neg_matches, neg_impact)
+        
+        # Net Keyword Score
+        raw_keyword_score = pos_impact - neg_impact
+        
+        # Normalize Keyword Score using tanh to squeeze into -1.0 to 1.0
+        # Scaling factor of 5.0 allows better differentiation across a wider range
+        # of signal strengths (tanh saturates ~0.96 at raw_score=9, ~0.76 at raw_score=5)
+        keyword_norm = math.tanh(raw_keyword_score / 5.0)
+
+        # Early exit: skip the per-sentence VADER pass if no VADER value can reach an alert
+        if self.thresholds and not self._can_reach_alert(keyword_norm):
+            logger.debug("Pruned before VADER: keyword norm %.3f cannot reach an alert threshold", keyword_norm)
+            return None
+
+        # 1. VaderSentiment analysis (General Tone)
+        vader_score = self._vader_score(text)
+        
+        # 3. Final Combined Score
+        # Formula: 30% VADER, 70% Keywords
+        combined_score = (0.3 * vader_score) + (0.7 * keyword_norm)
+        
+        # Map -1.0..1.0 to 0..100
+        # -1 -> 0 (Bearish), 0 -> 50 (Neutral), 1 -> 100 (Bullish)
+        final_score = (combined_score + 1) * 50
+        
+        logger.debug("Raw Keyword: %s, Norm Keyword: %s, Combined: %s, Final: %s",
+                     raw_keyword_score, keyword_norm, combined_score, final_score)
+
+        return self._build_result(text, final_score, vader_score, pos_matches, neg_matches, ticker, exchange, company)
+
     def analyze(self, texts):
         """
         Analyze a list of texts (articles/paragraphs).
-        Returns a sorted list of insights.
+        Returns a sorted list of insights; with thresholds set, texts that cannot
+        reach an alert are left out and counted in pruned_count.
         """
         results = []
-        
+        if len(texts) == 1:
+            # The pipeline scores one article at a time: no pool to start, and
+            # the work stays on the calling thread (where a profiler can see it)
+            try:
+                score_data = self._calculate_score(texts[0])
+            except Exception as e:
+                logger.error("Error analyzing text: %s", e)
+                return results
+            with self._count_lock:
+                self.scored_count += 1
+                if score_data is None:
+                    self.pruned_count += 1
+            return [score_data] if score_data is not None else results
+
         # Use ThreadPool logic
         # Note: ThreadPoolExecutor works fine with instance methods in Python 3
         num_workers = os.cpu_count() or 4
@@ -280,10 +409,26 @@ class Analyzer:
                 text = future_to_text[future]
                 try:
                     score_data = future.result()
+                    with self._count_lock:
+                        self.scored_count += 1
+                        if score_data is None:
+                            self.pruned_count += 1
+                    if score_data is None:
+                        continue
                     results.append(score_data)
                 except Exception as e:
-                    logging.error(f"Error analyzing text: {e}")
+                    logger.error("Error analyzing text: %s", e)
         
         # Sort by likelihood score descending
         results.sort(key=lambda x: x['likelihood_score'], reverse=True)
         return results
+
+    def analyze_batch(self, texts, vader_scores=None):
+        """
+        Scores a large corpus (e.g. history rescoring) with array operations.
+
+        Returns results in input order, identical to _calculate_score per text.
+        Requires numpy; see processor/batch_scorer.py to rescore with new weights.
+        """
+        from processor.batch_scorer import BatchScorer
+        return BatchScorer(self).prepare(texts, vader_scores).results()
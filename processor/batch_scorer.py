@@ -0,0 +1,187 @@
+import math
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+class KeywordMatrix:
+    """
+    Sparse document x keyword occurrence matrix in COO form.
+
+    Each entry is one keyword match: its document, keyword id, offset in the
+    cleaned lowered text, and the headline and negation channels.
+    Entries are stored per document in the order the scalar scorer visits them
+    (keyword order, then text order), so sums over them are bit-identical.
+    """
+
+    # Channel ids returned by counts()
+    BODY, HEADLINE, NEGATED_BODY, NEGATED_HEADLINE = range(4)
+
+    def __init__(self, doc, keyword, position, headline, negated, n_docs, n_keywords):
+        self.doc = doc
+        self.keyword = keyword
+        self.position = position
+        self.headline = headline
+        self.negated = negated
+        self.n_docs = n_docs
+        self.n_keywords = n_keywords
+
+    def counts(self):
+        """Returns aggregated (doc, keyword, channel, count) arrays."""
+        channel = self.headline.astype(np.int64) + 2 * self.negated.astype(np.int64)
+        key = (self.doc.astype(np.int64) * self.n_keywords + self.keyword) * 4 + channel
+        unique, count = np.unique(key, return_counts=True)
+        return unique // 4 // self.n_keywords, unique // 4 % self.n_keywords, unique % 4, count
+
+    def impacts(self, weights, entries):
+        """Per-document sum of weighted matches over the selected entries (boolean mask)."""
+        values = weights[self.keyword[entries]]
+        # Headline Multiplier
+        values = np.where(self.headline[entries], values * 2.0, values)
+        # Negation flips and softens the impact
+        values = np.where(self.negated[entries], values * -0.8, values)
+
+        total = np.zeros(self.n_docs)
+        # add.at is unbuffered: each document accumulates its entries in order
+        np.add.at(total, self.doc[entries], values)
+        return total
+
+
+class Batch:
+    """Documents prepared by BatchScorer; scores can be recomputed with new weights."""
+
+    def __init__(self, analyzer, texts, metadata, vader_scores, matrix, entry_ranges):
+        self.analyzer = analyzer
+        self.texts = texts
+        self.metadata = metadata
+        self.vader_scores = vader_scores
+        self.matrix = matrix
+        self.entry_ranges = entry_ranges
+
+    def weight_vector(self, positive_weights=None, negative_weights=None):
+        """Weights indexed by keyword id (positive ids first, then negative)."""
+        analyzer = self.analyzer
+        positive_weights = analyzer.positive_weights if positive_weights is None else positive_weights
+        negative_weights = analyzer.negative_weights if negative_weights is None else negative_weights
+
+        weights = [positive_weights.get(kw, 0) for kw in analyzer.positive_keywords]
+        weights += [negative_weights.get(kw, 0) for kw in analyzer.negative_keywords]
+        return np.array(weights, dtype=float)
+
+    def final_scores(self, positive_weights=None, negative_weights=None):
+        """
+        Returns the unrounded 0-100 scores for every document.
+
+        Pass alternative {keyword: weight} maps to rescore the batch without
+        re-matching, e.g. when tuning keywords.yaml.
+        """
+        weights = self.weight_vector(positive_weights, negative_weights)
+        is_positive = self.matrix.keyword < len(self.analyzer.positive_keywords)
+
+        pos_impact = self.matrix.impacts(weights, is_positive)
+        neg_impact = self.matrix.impacts(weights, ~is_positive)
+
+        # Net Keyword Score
+        raw_keyword_score = pos_impact - neg_impact
+
+        # math.tanh element-wise: np.tanh can differ in the last bit
+        keyword_norm = np.fromiter(map(math.tanh, raw_keyword_score / 5.0), dtype=float, count=len(raw_keyword_score))
+
+        # Formula: 30% VADER, 70% Keywords, mapped from -1.0..1.0 to 0..100
+        combined_score = (0.3 * self.vader_scores) + (0.7 * keyword_norm)
+        return (combined_score + 1) * 50
+
+    def results(self):
+        """Result dicts in input order, identical to Analyzer._calculate_score."""
+        analyzer = self.analyzer
+        matrix = self.matrix
+        final_scores = self.final_scores()
+        n_pos = len(analyzer.positive_keywords)
+        all_keywords = analyzer.positive_keywords + analyzer.negative_keywords
+
+        keyword_ids = matrix.keyword.tolist()
+        positions = matrix.position.tolist()
+        negated = matrix.negated.tolist()
+
+        results = []
+        for d, text in enumerate(self.texts):
+            pos_matches = []
+            neg_matches = []
+            start, end = self.entry_ranges[d]
+            for e in range(start, end):
+                k = keyword_ids[e]
+                label = analyzer._match_label(all_keywords[k], positions[e], negated[e])
+                (pos_matches if k < n_pos else neg_matches).append(label)
+
+            ticker, exchange, company = self.metadata[d]
+            results.append(analyzer._build_result(
+                text, float(final_scores[d]), float(self.vader_scores[d]),
+                pos_matches, neg_matches, ticker, exchange, company
+            ))
+        return results
+
+
+class BatchScorer:
+    """
+    Scores many documents at once with NumPy (pip install numpy).
+
+    Text work (cleaning, scanning, keyword matching, VADER) stays per document;
+    the weighted impacts, tanh normalization, VADER/keyword blend and 0-100
+    mapping run as array operations over the whole batch.
+    """
+
+    def __init__(self, analyzer):
+        if not HAS_NUMPY:
+            raise ImportError("Batch scoring requires numpy: pip install numpy")
+        self.analyzer = analyzer
+
+    def prepare(self, texts, vader_scores=None):
+        """
+        Cleans, scans and keyword-matches every text and returns a Batch.
+
+        `vader_scores` may be passed to reuse sentence-level VADER averages from
+        an earlier run; they only depend on the text, not on keyword weights.
+        """
+        analyzer = self.analyzer
+
+        cleaned = []
+        metadata = []
+        vader = []
+        doc_ids, keyword_ids, positions, negated = [], [], [], []
+        entry_ranges = []
+
+        for d, raw_text in enumerate(texts):
+            url, text = analyzer._clean_text(raw_text)
+            text_lower = text.lower()
+            scan = analyzer.scanner.scan(text, text_lower)
+
+            cleaned.append(text)
+            metadata.append(analyzer._extract_metadata(text, url, scan))
+            if vader_scores is None:
+                vader.append(analyzer._vader_score(text))
+
+            start = len(doc_ids)
+            hits = analyzer.keyword_matcher.find(text_lower)
+            for k in sorted(hits):
+                for idx in hits[k]:
+                    doc_ids.append(d)
+                    keyword_ids.append(k)
+                    positions.append(idx)
+                    negated.append(scan.is_negated(idx))
+            entry_ranges.append((start, len(doc_ids)))
+
+        position_array = np.array(positions, dtype=np.int64)
+        matrix = KeywordMatrix(
+            np.array(doc_ids, dtype=np.int64),
+            np.array(keyword_ids, dtype=np.int64),
+            position_array,
+            position_array < analyzer.HEADLINE_LIMIT,
+            np.array(negated, dtype=bool),
+            n_docs=len(cleaned),
+            n_keywords=len(analyzer.keyword_matcher.keywords),
+        )
+        vader_array = np.array(vader if vader_scores is None else vader_scores, dtype=float)
+        return Batch(analyzer, cleaned, metadata, vader_array, matrix, entry_ranges)
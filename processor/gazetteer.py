@@ -0,0 +1,183 @@
+import csv
+import hashlib
+import logging
+import os
+import pickle
+import re
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# Trailing words dropped from master-file names before indexing ("Apple Inc." -> "apple")
+CORPORATE_SUFFIXES = frozenset({
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "plc", "llc", "lp", "l.p", "sa", "s.a", "nv", "n.v", "ag", "se",
+})
+
+# Key marking the end of a complete name in the trie
+_TERMINAL = ""
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9&'.\-]*")
+
+
+def file_digest(path):
+    """sha1 of a file's bytes, used to tell whether a prebuilt index is stale."""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _normalize_token(token):
+    return token.lower().rstrip(".'-")
+
+
+def name_tokens(name):
+    """Normalized token sequence used to index and match a company name."""
+    tokens = [_normalize_token(t) for t in _TOKEN_RE.findall(name)]
+    tokens = [t for t in tokens if t]
+    while len(tokens) > 1 and tokens[-1] in CORPORATE_SUFFIXES:
+        tokens.pop()
+    if tokens and tokens[0] == "the" and len(tokens) > 1:
+        tokens.pop(0)
+    return tokens
+
+
+class Gazetteer:
+    """
+    Local ticker/company master used to validate ticker guesses and resolve company names.
+
+    The source is a CSV with `symbol,exchange,name` rows (see build_symbols.py). It is
+    compiled once into a pickled index next to the CSV — a ticker hash map plus a
+    token trie of company names — and reloaded from there while the CSV is unchanged.
+    """
+
+    def __init__(self, source_path="config/symbols.csv", index_path=None):
+        self.source_path = source_path
+        self.index_path = index_path or os.path.splitext(source_path)[0] + ".pkl"
+        self.tickers = {}      # symbol -> (exchange, name)
+        self.name_trie = {}    # token -> subtree, _TERMINAL -> symbol
+        self.exchanges = frozenset()
+        self.loaded = False
+
+    def load(self):
+        """Loads the prebuilt index, rebuilding it when the source CSV has changed."""
+        if not os.path.exists(self.source_path):
+            logger.info("Symbol master not found (%s); ticker validation disabled.", self.source_path)
+            return False
+
+        digest = file_digest(self.source_path)
+        index = self._read_index(digest)
+        if index is None:
+            index = self._build_index(digest)
+            self._write_index(index)
+
+        self.tickers = index['tickers']
+        self.name_trie = index['name_trie']
+        self.exchanges = frozenset(exchange for exchange, _ in self.tickers.values())
+        self.loaded = True
+        logger.info("Loaded %d symbols from %s", len(self.tickers), self.source_path)
+        return True
+
+    def _read_index(self, digest):
+        if not os.path.exists(self.index_path):
+            return None
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = pickle.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable symbol index %s: %s", self.index_path, e)
+            return None
+        if index.get('version') != INDEX_VERSION or index.get('source_digest') != digest:
+            return None
+        return index
+
+    def _build_index(self, digest):
+        tickers = {}
+        name_trie = {}
+        with open(self.source_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                symbol = (row.get('symbol') or '').strip().upper()
+                if not symbol or symbol in tickers:
+                    continue
+                exchange = (row.get('exchange') or 'NA').strip().upper() or 'NA'
+                name = (row.get('name') or '').strip()
+                tickers[symbol] = (exchange, name)
+
+                tokens = name_tokens(name)
+                if not tokens:
+                    continue
+                node = name_trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                # First listing wins for names shared by several share classes
+                node.setdefault(_TERMINAL, symbol)
+
+        return {
+            'version': INDEX_VERSION,
+            'source_digest': digest,
+            'tickers': tickers,
+            'name_trie': name_trie,
+        }
+
+    def _write_index(self, index):
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # Read-only deployments (e.g. Lambda) keep the in-memory index only
+            logger.warning("Could not write symbol index %s: %s", self.index_path, e)
+
+    def covers(self, exchange):
+        """True if the master file lists symbols for this exchange."""
+        return exchange in self.exchanges
+
+    def lookup(self, ticker):
+        """Returns (exchange, name) for a known ticker, else None."""
+        return self.tickers.get(ticker)
+
+    def find_companies(self, text):
+        """
+        Finds known company names in one pass over the text's tokens.
+
+        Returns (start, symbol) pairs, leftmost first, using the longest name at each
+        start. Names must be capitalized in the text, and one-word names must be
+        followed by a corporate suffix ("Acme Corp") to avoid matching plain words.
+        """
+        found = []
+        tokens = list(_TOKEN_RE.finditer(text))
+        i = 0
+        while i < len(tokens):
+            first = tokens[i].group()
+            if not first[0].isupper() or _normalize_token(first) not in self.name_trie:
+                i += 1
+                continue
+
+            node = self.name_trie
+            best = None
+            j = i
+            while j < len(tokens):
+                word = tokens[j].group()
+                if not word[0].isupper() and not word[0].isdigit() and word.lower() not in ("of", "and"):
+                    break
+                node = node.get(_normalize_token(word))
+                if node is None:
+                    break
+                j += 1
+                if _TERMINAL in node:
+                    best = (j, node[_TERMINAL])
+
+            if best:
+                end, symbol = best
+                followed_by_suffix = (end < len(tokens)
+                                      and _normalize_token(tokens[end].group()) in CORPORATE_SUFFIXES)
+                if end - i > 1 or followed_by_suffix:
+                    found.append((tokens[i].start(), symbol))
+                    i = end
+                    continue
+            i += 1
+        return found
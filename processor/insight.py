@@ -0,0 +1,69 @@
+_MISSING = object()
+
+# The article text an analyzer result carries; not needed to send alerts
+TEXT_FIELDS = ('company_text', 'full_text')
+
+
+class Insight:
+    """
+    Compact form of an analyzer result, kept from aggregation until the
+    alerts are sent.
+
+    Slotted, so it needs no per-instance dict. By default it drops the two
+    copies of the article text (TEXT_FIELDS) that the analyzer result
+    carries; the email and watchlist only use the score, ticker, company,
+    snippet and source. It reads like the dict it replaces:
+    insight['ticker'], insight.get('company', ''), 'ticker_hints' in insight,
+    and dict(insight) for JSON.
+    """
+
+    __slots__ = ('likelihood_score', 'sentiment_score', 'positive_matches', 'negative_matches', 'match_details',
+                 'snippet', 'ticker', 'exchange', 'company', 'source_url', 'site_name', 'ticker_hints') + TEXT_FIELDS
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_result(cls, result, keep_text=False):
+        """Insight from an Analyzer result dict; the article text only with `keep_text`."""
+        return cls(**{key: value for key, value in result.items() if keep_text or key not in TEXT_FIELDS})
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(f"Insight has no field {key!r}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        return getattr(self, key, default)
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Insight, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Insight({dict(self.items())!r})"
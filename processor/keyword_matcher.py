@@ -0,0 +1,101 @@
+import re
+
+# Non-ASCII characters re.IGNORECASE treats as equal to an ASCII letter
+# (dotted/dotless i, long s, Kelvin sign). Text containing them takes the
+# per-keyword regex path so matches stay identical.
+_CASE_CONFUSABLES_RE = re.compile('[\u0130\u0131\u017f\u212a]')
+
+_WORD_RUN_RE = re.compile(r'\w+')
+_WORD_CHAR_RE = re.compile(r'\w')
+
+
+def keyword_pattern(keyword):
+    """Word-boundary, case-insensitive pattern used to find a keyword."""
+    return re.compile(r'\b' + re.escape(keyword.lower()) + r'\b', re.IGNORECASE)
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword in a lowered document with one pass over its word runs.
+
+    Keywords are bucketed by their leading word, so each word in the text is one
+    dict lookup and only keywords that can start there are compared. Results are
+    the same as running each keyword's pattern with finditer separately; those
+    patterns are only compiled for text the fast path cannot handle, which keeps
+    the matcher cheap to build and to restore from a snapshot.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._lowered = [kw.lower() for kw in self.keywords]
+        self._ends_in_word = [bool(_WORD_CHAR_RE.fullmatch(kw[-1])) if kw else False for kw in self._lowered]
+        self._by_lead = {}
+        self._always_scan = []
+        self._patterns = {}
+
+        for k, kw_lower in enumerate(self._lowered):
+            lead = _WORD_RUN_RE.match(kw_lower)
+            if kw_lower.isascii() and lead:
+                self._by_lead.setdefault(lead.group(), []).append(k)
+            else:
+                self._always_scan.append(k)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Compiled patterns are rebuilt lazily after unpickling
+        state['_patterns'] = {}
+        return state
+
+    def pattern(self, k):
+        """Compiled regex for keyword k (built on first use)."""
+        pattern = self._patterns.get(k)
+        if pattern is None:
+            pattern = self._patterns[k] = keyword_pattern(self.keywords[k])
+        return pattern
+
+    def find(self, text_lower):
+        """
+        Returns {keyword_index: [match starts]} for `text_lower` (already lowered).
+
+        Each keyword's starts are in text order and non-overlapping, like finditer.
+        """
+        if _CASE_CONFUSABLES_RE.search(text_lower):
+            return self._find_each(text_lower, range(len(self.keywords)))
+
+        hits = {}
+        last_end = {}
+        by_lead = self._by_lead
+        lowered = self._lowered
+        ends_in_word = self._ends_in_word
+        n = len(text_lower)
+        for run in _WORD_RUN_RE.finditer(text_lower):
+            candidates = by_lead.get(run.group())
+            if not candidates:
+                continue
+            # A run start is always a word boundary, as the leading \b requires
+            pos = run.start()
+            for k in candidates:
+                if pos < last_end.get(k, 0):
+                    continue
+                kw_lower = lowered[k]
+                if not text_lower.startswith(kw_lower, pos):
+                    continue
+                # Trailing \b: word-ness must change after the keyword
+                end = pos + len(kw_lower)
+                next_is_word = end < n and _WORD_CHAR_RE.match(text_lower, end) is not None
+                if next_is_word == ends_in_word[k]:
+                    continue
+                hits.setdefault(k, []).append(pos)
+                last_end[k] = end
+
+        if self._always_scan:
+            hits.update(self._find_each(text_lower, self._always_scan))
+        return hits
+
+    def _find_each(self, text_lower, indices):
+        hits = {}
+        for k in indices:
+            starts = [m.start() for m in self.pattern(k).finditer(text_lower)]
+            if starts:
+                hits[k] = starts
+        return hits
@@ -0,0 +1,173 @@
+import re
+from itertools import accumulate
+
+# Single-word negation terms
+NEGATION_WORDS = frozenset({
+    "not", "no", "never", "unlikely", "refuse", "deny", "denied",
+    "reject", "rejected", "without", "lack", "lacking", "fails",
+    "failed", "unable", "hardly", "barely", "neither", "nor",
+})
+
+# Multi-word negation phrases (matched anywhere in the preceding context)
+NEGATION_PHRASES = (
+    "failed to", "unable to", "lack of", "fell short of", "falls short of",
+    "did not", "does not", "do not", "has not", "have not", "had not",
+    "will not", "would not", "could not", "cannot", "can not",
+    "no longer", "not yet", "far from", "anything but",
+)
+
+# A keyword is negated by cues in the ~50 chars / last 5 words before it
+NEGATION_WINDOW = 50
+NEGATION_MAX_WORDS = 5
+
+# Heuristic: Priority to explicit exchanges, then generic parens
+EXCHANGE_PATTERNS = [
+    (r'(?:NYSE|New York Stock Exchange)\s*:\s*([A-Z]+)', 'NYSE'),
+    (r'(?:NASDAQ|Nasdaq)\s*:\s*([A-Z]+)', 'NASDAQ'),
+    (r'(?:TSX|Toronto Stock Exchange)\s*:\s*([A-Z]+)', 'TSX'),
+    (r'(?:LSE|London Stock Exchange|LN)\s*:\s*([A-Z]+)', 'LN'),
+    (r'(?:SIX)\s*:\s*([A-Z]+)', 'SIX'), # Added from user example "SIX: RO"
+    (r'\(([A-Z]{3,5})\)', 'NA') # Generic Fallback
+]
+
+# Literal prefixes every exchange pattern starts with (used as scan cues)
+EXCHANGE_PREFIXES = (
+    "NYSE", "New York Stock Exchange", "NASDAQ", "Nasdaq", "TSX", "Toronto Stock Exchange",
+    "LSE", "London Stock Exchange", "LN", "SIX", "(",
+)
+
+
+class ScanResult:
+    """Per-document output of DocumentScanner.scan."""
+    __slots__ = ('_negation_depth', 'exchange_candidates')
+
+    def __init__(self, negation_depth, exchange_candidates):
+        self._negation_depth = negation_depth
+        # List of (priority, start, ticker, exchange), best candidate first
+        self.exchange_candidates = exchange_candidates
+
+    def is_negated(self, idx):
+        """True if a keyword starting at offset idx of the lowered text is in a negation scope."""
+        if self._negation_depth is None:
+            return False
+        return self._negation_depth[idx] > 0
+
+
+class DocumentScanner:
+    """
+    Scans a document once for every negation cue and exchange/ticker cue.
+
+    The negation-scope mask reproduces the per-match check the analyzer used to do
+    (last 5 words / 50 chars before a keyword contain a negation word or phrase),
+    so keyword matches can look it up by offset instead of re-slicing the text.
+    """
+
+    def __init__(self, negation_words=NEGATION_WORDS, negation_phrases=NEGATION_PHRASES,
+                 exchange_patterns=EXCHANGE_PATTERNS, exchange_prefixes=EXCHANGE_PREFIXES):
+        self.negation_words = frozenset(negation_words)
+        self.negation_phrases = tuple(negation_phrases)
+        self.exchange_patterns = [(re.compile(p), name) for p, name in exchange_patterns]
+
+        self._words_by_char = self._index_by_first_char(self.negation_words)
+        self._phrases_by_char = self._index_by_first_char(self.negation_phrases)
+
+        # Zero-width cue finder: reports every offset where any cue may start.
+        # Exchange prefixes are lowered so the pass can run over the lowered text.
+        cues = set(self.negation_words) | set(self.negation_phrases)
+        cues |= {prefix.lower() for prefix in exchange_prefixes}
+        self._cue_re = self._build_cue_regex(cues)
+        self._exchange_cue_re = self._build_cue_regex(set(exchange_prefixes))
+
+        # Start of the 5th whitespace token after a position (ends a word negation scope)
+        self._scope_end_re = re.compile(r'(?:\s+\S+){%d}\s+(?=\S)' % (NEGATION_MAX_WORDS - 1))
+
+    @staticmethod
+    def _index_by_first_char(terms):
+        index = {}
+        for term in terms:
+            index.setdefault(term[0], []).append(term)
+        return index
+
+    @staticmethod
+    def _build_cue_regex(cues):
+        alternation = '|'.join(re.escape(c) for c in sorted(cues, key=len, reverse=True))
+        return re.compile(r'(?=(?:' + alternation + r'))')
+
+    def scan(self, text, text_lower):
+        """Returns a ScanResult for `text` (original case) and `text_lower` (text.lower())."""
+        n = len(text_lower)
+        diff = None
+        candidates = []
+
+        # .lower() can change the length of some unicode text; offsets then no longer
+        # line up and exchange cues need their own pass over the original text.
+        aligned = len(text) == n
+
+        for cue in self._cue_re.finditer(text_lower):
+            pos = cue.start()
+            ch = text_lower[pos]
+
+            for word in self._words_by_char.get(ch, ()):
+                if text_lower.startswith(word, pos):
+                    diff = self._mark_word(text_lower, pos, pos + len(word), n, diff)
+
+            for phrase in self._phrases_by_char.get(ch, ()):
+                if text_lower.startswith(phrase, pos):
+                    diff = self._mark_range(diff, n, pos + len(phrase), pos + NEGATION_WINDOW)
+
+            if aligned:
+                self._match_exchanges(text, pos, candidates)
+
+        if not aligned:
+            for cue in self._exchange_cue_re.finditer(text):
+                self._match_exchanges(text, cue.start(), candidates)
+
+        candidates.sort()
+        negation_depth = list(accumulate(diff)) if diff is not None else None
+        return ScanResult(negation_depth, candidates)
+
+    def _match_exchanges(self, text, pos, candidates):
+        for priority, (pattern, exchange) in enumerate(self.exchange_patterns):
+            match = pattern.match(text, pos)
+            if match:
+                candidates.append((priority, pos, match.group(1).strip(), exchange))
+
+    @staticmethod
+    def _mark_range(diff, n, start, end):
+        """Marks offsets start..end (inclusive, clamped to the text) as negated."""
+        end = min(end, n)
+        if start > end:
+            return diff
+        if diff is None:
+            diff = [0] * (n + 2)
+        diff[start] += 1
+        diff[end + 1] -= 1
+        return diff
+
+    def _mark_word(self, text_lower, start, end, n, diff):
+        """
+        Marks the scope of a negation word found at text_lower[start:end].
+
+        The legacy check split text_lower[idx-50:idx] on whitespace, so a word counts
+        when it is a whole token, the tail of a token cut by the window start, or the
+        head of a token cut at idx.
+        """
+        starts_token = start == 0 or text_lower[start - 1].isspace()
+        ends_token = end == n or text_lower[end].isspace()
+
+        if starts_token and not ends_token:
+            # Head of a longer token: only visible when the keyword starts right after it
+            return self._mark_range(diff, n, end, end)
+        if not ends_token:
+            return diff
+
+        window_end = start + NEGATION_WINDOW
+        scope = self._scope_end_re.match(text_lower, end, window_end + 1)
+        scope_end = scope.end() if scope else window_end
+
+        if starts_token:
+            return self._mark_range(diff, n, end, min(window_end, scope_end))
+        # Tail of a longer token: only visible when the window starts exactly at `start`
+        if scope_end >= window_end:
+            return self._mark_range(diff, n, window_end, window_end)
+        return diff
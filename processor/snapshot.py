@@ -0,0 +1,108 @@
+import logging
+import os
+import pickle
+import sys
+
+from processor.gazetteer import file_digest
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+DEFAULT_SNAPSHOT_PATH = os.getenv("ANALYZER_SNAPSHOT_PATH", "config/analyzer_snapshot.pkl")
+
+
+def vader_source_files():
+    """Paths of the lexicon files SentimentIntensityAnalyzer parses on construction."""
+    import vaderSentiment.vaderSentiment as vader_module
+    vader_dir = os.path.dirname(os.path.abspath(vader_module.__file__))
+    return [
+        os.path.join(vader_dir, "vader_lexicon.txt"),
+        os.path.join(vader_dir, "emoji_utf8_lexicon.txt"),
+    ]
+
+
+def source_fingerprint(paths):
+    """
+    Snapshot format plus the content digest of every source file (None if missing).
+
+    Files are keyed by name, not path, so a snapshot built in CI stays valid where
+    the package is installed elsewhere (e.g. the Lambda task root).
+    """
+    return {
+        'snapshot_version': SNAPSHOT_VERSION,
+        'python': sys.version_info[:2],
+        'files': {
+            os.path.basename(path): file_digest(path) if os.path.exists(path) else None
+            for path in paths
+        },
+    }
+
+
+class AnalyzerSnapshot:
+    """
+    Single pickled file holding everything Analyzer() would otherwise parse:
+    the VADER lexicon and emoji dicts, keyword lists and weights, the keyword
+    matcher and the symbol gazetteer.
+
+    The snapshot records the digests of its source files and is ignored (and
+    rebuilt by the Analyzer) as soon as any of them changes.
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+
+    def load(self, fingerprint):
+        """Returns the stored state if it was built from the same sources, else None."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                stored_fingerprint = pickle.load(f)
+                if stored_fingerprint != fingerprint:
+                    logger.info("Analyzer snapshot %s is stale; rebuilding.", self.path)
+                    return None
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable analyzer snapshot %s: %s", self.path, e)
+            return None
+
+    def save(self, state, fingerprint):
+        """Writes the snapshot atomically; read-only deployments just keep running without it."""
+        try:
+            snapshot_dir = os.path.dirname(self.path)
+            if snapshot_dir:
+                os.makedirs(snapshot_dir, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                # Fingerprint first so staleness is known without unpickling the state
+                pickle.dump(fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logger.warning("Could not write analyzer snapshot %s: %s", self.path, e)
+            return False
+
+
+def build_snapshot(path=DEFAULT_SNAPSHOT_PATH):
+    """Build step: (re)writes the snapshot and reports cold vs snapshot start-up times."""
+    from processor.analyzer import Analyzer
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    cold = Analyzer(snapshot_path=path)
+    if not os.path.exists(path):
+        print(f"FAIL: snapshot was not written to {path}")
+        sys.exit(1)
+    warm = Analyzer(snapshot_path=path)
+
+    print(f"Wrote analyzer snapshot: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    print(f"  Cold start (parse sources): {cold.init_seconds * 1000:.1f} ms")
+    print(f"  Snapshot start:             {warm.init_seconds * 1000:.1f} ms")
+    print(f"  Import-to-ready (snapshot): {warm.startup_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    build_snapshot(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SNAPSHOT_PATH)
@@ -0,0 +1,157 @@
+import re
+import threading
+import urllib.parse
+
+# Query parameters that only track where a click came from
+DEFAULT_DROP_PARAMS = [
+    "utm_*", "guccounter", "guce_*", "fbclid", "gclid", "mc_cid", "mc_eid", "cmpid", "ncid",
+]
+
+# Characters left unescaped in a canonical path/query (RFC 3986 reserved + unreserved)
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+_QUERY_SAFE = ":@!$'()*+,;/?-._~"
+# Escapes of these are decoded; any other escape (%2F, %3F, %26, ...) changes
+# what the server sees if decoded, so it is only upper-cased
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_ESCAPE_RE = re.compile(r'%[0-9A-Fa-f]{2}')
+
+
+def unquote_unreserved(text):
+    """Decodes only escaped unreserved characters (%7E -> ~); %2F and the like stay as they are."""
+    def decode(match):
+        char = chr(int(match.group(0)[1:], 16))
+        return char if char in _UNRESERVED else match.group(0)
+    return _ESCAPE_RE.sub(decode, text)
+
+
+def _normalize_escapes(text, safe):
+    """
+    Percent-encoding in one normal form without changing the resource: escaped
+    unreserved characters decoded, other escapes kept (upper-case hex), and
+    characters outside `safe` (including a stray %) escaped.
+    """
+    out = []
+    position = 0
+    for match in _ESCAPE_RE.finditer(text):
+        out.append(urllib.parse.quote(text[position:match.start()], safe=safe))
+        char = chr(int(match.group(0)[1:], 16))
+        out.append(char if char in _UNRESERVED else match.group(0).upper())
+        position = match.end()
+    out.append(urllib.parse.quote(text[position:], safe=safe))
+    return "".join(out)
+
+
+def _dedup_key(canonical):
+    """A canonical URL with http read as https: the two schemes serve the same article."""
+    return "https://" + canonical[len("http://"):] if canonical.startswith("http://") else canonical
+
+
+class UrlCanonicalizer:
+    """
+    Maps every discovered URL to one canonical form before it is used anywhere
+    else: state keys, in-run de-duplication and the fetcher's cache.
+
+    Defaults: lower-case host without default port, no fragment, tracking
+    parameters removed, remaining parameters sorted and percent-encoding
+    normalized. The scheme is kept, since the canonical form is what gets
+    fetched. Sites can add rules under `canonical:` in sites.yaml:
+
+        canonical:
+          drop_params: ["tc"]        # extra parameters to remove (fnmatch-style *)
+          keep_params: ["id"]        # keep only these parameters
+          strip_www: true            # www.example.com -> example.com
+          strip_trailing_slash: true # /news/ -> /news
+          lowercase_path: true
+          upgrade_http: true         # http://... -> https://...
+
+    It also remembers the URLs seen this run (http and https as one), so the
+    same article reached through another link or site is only fetched once.
+    A URL that cannot be parsed (a bad port, say) is returned unchanged.
+    """
+
+    def __init__(self, drop_params=None):
+        self.drop_params = DEFAULT_DROP_PARAMS if drop_params is None else drop_params
+        self.seen = set()
+        self.duplicates_dropped = 0
+        # Duplicates whose raw URL differed from the first one (http/https,
+        # tracking parameters, encoding...): fetches the raw URL keys would not have caught
+        self.variants_merged = 0
+        self._raw_seen = set()
+        # Site workers dedupe against the same run-wide set
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _param_matcher(patterns):
+        if not patterns:
+            return None
+        regex = "|".join(re.escape(p).replace(r"\*", ".*") for p in patterns)
+        return re.compile(f"^(?:{regex})$", re.IGNORECASE)
+
+    def canonicalize(self, url, rules=None):
+        """Returns the canonical form of `url` under the default plus `rules` (a site's `canonical:` dict)."""
+        rules = rules or {}
+        try:
+            parts = urllib.parse.urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            # Malformed netloc or out-of-range port: left for the fetch to fail on, not the whole listing
+            return url
+        if parts.scheme not in ("http", "https", ""):
+            return url
+        scheme = "https" if rules.get("upgrade_http") or not parts.scheme else parts.scheme
+
+        host = (parts.hostname or "").lower()
+        if rules.get("strip_www") and host.startswith("www."):
+            host = host[4:]
+        netloc = host
+        if port and port != {"http": 80, "https": 443}[scheme]:
+            netloc = f"{host}:{port}"
+
+        path = _normalize_escapes(parts.path, _PATH_SAFE) or "/"
+        if rules.get("lowercase_path"):
+            path = path.lower()
+        if rules.get("strip_trailing_slash") and len(path) > 1:
+            path = path.rstrip("/") or "/"
+
+        drop = self._param_matcher(list(self.drop_params) + list(rules.get("drop_params", [])))
+        keep = rules.get("keep_params")
+        params = []
+        # Rebuilt by hand: a bare flag (?x) stays bare, not ?x=
+        for param in parts.query.split("&"):
+            if not param:
+                continue
+            name, has_value, value = param.partition("=")
+            decoded_name = urllib.parse.unquote_plus(name)
+            if keep is not None and decoded_name not in keep:
+                continue
+            if drop and drop.match(decoded_name):
+                continue
+            name = _normalize_escapes(name, _QUERY_SAFE)
+            params.append((name, f"{name}={_normalize_escapes(value, _QUERY_SAFE)}" if has_value else name))
+        params.sort()
+        query = "&".join(param for _, param in params)
+
+        return urllib.parse.urlunsplit((scheme, netloc, path, query, ""))
+
+    def reset(self):
+        """Forgets the URLs seen so far (a new poll cycle); counters keep running."""
+        with self.lock:
+            self.seen.clear()
+            self._raw_seen.clear()
+
+    def dedupe(self, urls, rules=None):
+        """Canonicalizes `urls`, dropping any already seen this run (order kept)."""
+        canonical_urls = [self.canonicalize(url, rules) for url in urls]
+        unique = []
+        with self.lock:
+            for url, canonical in zip(urls, canonical_urls):
+                key = _dedup_key(canonical)
+                if key in self.seen:
+                    self.duplicates_dropped += 1
+                    if url not in self._raw_seen:
+                        self.variants_merged += 1
+                else:
+                    self.seen.add(key)
+                    unique.append(canonical)
+                self._raw_seen.add(url)
+        return unique
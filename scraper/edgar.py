@@ -0,0 +1,245 @@
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+from scraper.parser import Parser
+
+logger = logging.getLogger(__name__)
+
+# EDGAR asks automated clients to say who they are ("Company contact@example.com")
+# and refuses browser-looking ones; a site's `user_agent` overrides this
+DEFAULT_SEC_USER_AGENT = os.getenv("SEC_USER_AGENT")
+# Newest filing seen per sec_edgar site, so a run only reads the feed back to the last one
+DEFAULT_EDGAR_WATERMARK_PATH = os.getenv("EDGAR_WATERMARK_PATH", "edgar_watermark.json")
+
+# Entries per feed page (the most EDGAR serves)
+FEED_PAGE_SIZE = 100
+
+ATOM = {'atom': 'http://www.w3.org/2005/Atom'}
+ACCESSION_RE = re.compile(r'\d{10}-\d{2}-\d{6}')
+
+
+class EdgarFeed:
+    """
+    Reads EDGAR's current-filings Atom feed (browse-edgar?action=getcurrent),
+    newest first, page by page back to a watermark, and resolves a filing's
+    index page to its primary document.
+    """
+
+    def __init__(self, fetcher, parser=None, user_agent=DEFAULT_SEC_USER_AGENT):
+        self.fetcher = fetcher
+        self.parser = parser or Parser()
+        if user_agent and hasattr(fetcher, 'headers'):
+            fetcher.headers['User-Agent'] = user_agent
+
+    @staticmethod
+    def page_url(feed_url, start=0):
+        """`feed_url` as Atom, FEED_PAGE_SIZE entries from `start`; other query parameters (type, owner) kept."""
+        parts = urllib.parse.urlsplit(feed_url)
+        query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        query.update({'output': 'atom', 'count': str(FEED_PAGE_SIZE), 'start': str(start)})
+        return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+    @staticmethod
+    def parse_feed(xml_content):
+        """
+        Feed entries as listing records: url (the filing's index page), title,
+        published_at (acceptance time, aware), form, accession. A filing listed
+        once per party (filer, subject, ...) comes out once.
+        """
+        if not xml_content:
+            return []
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        try:
+            root = ET.fromstring(xml_content)
+        except ET.ParseError as e:
+            logger.error("Error parsing EDGAR feed: %s", e)
+            return []
+
+        entries = []
+        seen = set()
+        for entry in root.findall('atom:entry', ATOM):
+            link = entry.find('atom:link', ATOM)
+            url = link.get('href') if link is not None else None
+            accession = ACCESSION_RE.search(entry.findtext('atom:id', '', ATOM)) or ACCESSION_RE.search(url or '')
+            updated = entry.findtext('atom:updated', '', ATOM).strip()
+            if not url or not accession or not updated:
+                continue
+            accession = accession.group(0)
+            if accession in seen:
+                continue
+            seen.add(accession)
+            try:
+                published_at = datetime.datetime.fromisoformat(updated)
+            except ValueError:
+                logger.debug("Unreadable EDGAR entry time %r for %s", updated, accession)
+                continue
+            category = entry.find('atom:category', ATOM)
+            title = ' '.join(entry.findtext('atom:title', '', ATOM).split())
+            form = category.get('term') if category is not None else title.split(' - ')[0]
+            entries.append({
+                'url': url,
+                # The accession number keeps two filings by one company apart in the title dedup
+                'title': f"{title} {accession}",
+                'published_at': published_at,
+                'tickers': [],
+                'form': form,
+                'accession': accession,
+            })
+        return entries
+
+    def new_filings(self, feed_url, since=None, form_types=None, max_pages=5):
+        """
+        Filings accepted at or after `since`, newest first, of the `form_types`
+        (all if none given). Pages are read until one reaches back past `since`
+        or the feed ends, at most `max_pages`. Returns (filings, the time every
+        filing after which has been listed: the newest entry if the feed was
+        read back to `since` or its end, else the oldest entry read; None if
+        the feed could not be read).
+        """
+        form_types = set(form_types or ())
+        filings = {}
+        newest = oldest = None
+        complete = False
+        for page in range(max_pages):
+            entries = self.parse_feed(self.fetcher.fetch(self.page_url(feed_url, page * FEED_PAGE_SIZE)))
+            for entry in entries:
+                if since and entry['published_at'] < since:
+                    complete = True
+                    break
+                if newest is None or entry['published_at'] > newest:
+                    newest = entry['published_at']
+                oldest = entry['published_at']
+                if form_types and entry['form'] not in form_types:
+                    continue
+                filings.setdefault(entry['accession'], entry)
+            # An empty page may be a failed fetch rather than the end of the feed
+            if complete or not entries:
+                break
+            if len(entries) < FEED_PAGE_SIZE:
+                complete = True
+                break
+        else:
+            if since:
+                logger.info("EDGAR feed: %d pages did not reach back to %s; older filings skipped",
+                            max_pages, since.isoformat())
+        return list(filings.values()), newest if complete else oldest
+
+    def primary_document_url(self, index_html, index_url):
+        """The primary document (first row of "Document Format Files") of a filing index page."""
+        soup = self.parser.parse(index_html)
+        try:
+            table = soup and (soup.find('table', summary='Document Format Files') or soup.find('table', class_='tableFile'))
+            if not table:
+                return None
+            for row in table.find_all('tr'):
+                link = row.find('a', href=True)
+                if not link:
+                    continue
+                href = link['href']
+                # Inline XBRL documents are linked through the viewer
+                if href.startswith('/ix?doc='):
+                    href = href[len('/ix?doc='):]
+                return urllib.parse.urljoin(index_url, href)
+            return None
+        finally:
+            Parser.free(soup)
+
+    def fetch_primary_document(self, index_url):
+        """Page text of a filing's primary document, via its index page; None if either fetch fails."""
+        index_html = self.fetcher.fetch(index_url)
+        if not index_html:
+            return None
+        document_url = self.primary_document_url(index_html, index_url)
+        if not document_url:
+            logger.warning("No primary document found on %s", index_url)
+            return None
+        return self.fetcher.fetch(document_url)
+
+    @staticmethod
+    def document_text(soup, max_chars):
+        """Readable text of a filing document, whitespace collapsed, cut to `max_chars`."""
+        if not soup:
+            return ""
+        # Hidden inline XBRL facts and styling are not part of the text
+        for tag in soup.find_all(['ix:header', 'script', 'style']):
+            tag.decompose()
+        return ' '.join(soup.get_text(' ').split())[:max_chars]
+
+
+class EdgarWatermark:
+    """
+    Acceptance time per sec_edgar site before which every filing has been
+    handled, kept in `path` between runs. Discovery reads the feed back to it
+    and no further; filings accepted at that same moment are listed again and
+    left to the processed-URL state.
+
+    A run proposes how far its listing reached and holds the watermark at any
+    filing it left unfetched (run budget, memory cap, failed fetch); `save`
+    moves it to the earlier of the two, never backwards.
+    """
+
+    def __init__(self, path=DEFAULT_EDGAR_WATERMARK_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.marks = self._load()
+        # This run's listing reach and unfetched filings, per site, until save
+        self.proposed = {}
+        self.held = {}
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return {name: datetime.datetime.fromisoformat(value) for name, value in json.load(f).items()}
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            logger.warning("Could not read EDGAR watermark %s (%s); reading the feed in full", self.path, e)
+            return {}
+
+    def get(self, site_name):
+        with self.lock:
+            return self.marks.get(site_name)
+
+    def propose(self, site_name, published_at):
+        """This run listed every filing of `site_name` accepted after `published_at`."""
+        with self.lock:
+            self.proposed[site_name] = published_at
+
+    def hold(self, site_name, published_at):
+        """A filing accepted at `published_at` was not fetched; the next run lists it again."""
+        with self.lock:
+            current = self.held.get(site_name)
+            if current is None or published_at < current:
+                self.held[site_name] = published_at
+
+    def _advance(self):
+        for site_name, published_at in self.proposed.items():
+            held = self.held.get(site_name)
+            if held is not None and held < published_at:
+                published_at = held
+            current = self.marks.get(site_name)
+            if current is None or published_at > current:
+                self.marks[site_name] = published_at
+        self.proposed = {}
+        self.held = {}
+
+    def save(self):
+        with self.lock:
+            self._advance()
+            if not self.path or not self.marks:
+                return
+            marks = {name: value.isoformat() for name, value in self.marks.items()}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(marks, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save EDGAR watermark %s: %s", self.path, e)
@@ -1,6 +1,11 @@
+import logging
+import os
 import time
 import random
 import urllib.parse
+from collections import OrderedDict
+
+from scraper.canonicalizer import unquote_unreserved
 
 try:
     from curl_cffi import requests as curl_requests
@@ -11,20 +16,31 @@ except ImportError:
     from urllib3.util.retry import Retry
     HAS_CURL_CFFI = False
 
+logger = logging.getLogger(__name__)
+
+# Pause after each request (seconds, uniform between the two)
+DEFAULT_DELAY_MIN = float(os.getenv("FETCH_DELAY_MIN", 1.0))
+DEFAULT_DELAY_MAX = float(os.getenv("FETCH_DELAY_MAX", 3.0))
+# Multiplies the 403 and 5xx retry backoff (0 retries immediately)
+DEFAULT_BACKOFF_SCALE = float(os.getenv("FETCH_BACKOFF_SCALE", 1.0))
+
 class Fetcher:
-    def __init__(self):
+    def __init__(self, delay_min=DEFAULT_DELAY_MIN, delay_max=DEFAULT_DELAY_MAX,
+                 backoff_scale=DEFAULT_BACKOFF_SCALE, upgrade_http=True):
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+        self.backoff_scale = backoff_scale
+        # False only for plain-HTTP stand-ins (benchmark_fetch.py's local server)
+        self.upgrade_http = upgrade_http
         if HAS_CURL_CFFI:
             # curl_cffi impersonates a real Chrome TLS fingerprint,
             # bypassing WAF bot detection that blocks Python requests.
             self.session = curl_requests.Session(impersonate="chrome")
         else:
-            print("=" * 70)
-            print("WARNING: curl_cffi is NOT installed!")
-            print("Sites with WAF protection (e.g. SeekingAlpha) WILL return 403 errors.")
-            print("Install with: pip install curl_cffi")
-            print("=" * 70)
+            logger.warning("curl_cffi is NOT installed! Sites with WAF protection (e.g. SeekingAlpha) "
+                           "WILL return 403 errors. Install with: pip install curl_cffi")
             self.session = requests.Session()
-            retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+            retries = Retry(total=3, backoff_factor=backoff_scale, status_forcelist=[500, 502, 503, 504])
             self.session.mount('http://', HTTPAdapter(max_retries=retries))
             self.session.mount('https://', HTTPAdapter(max_retries=retries))
 
@@ -46,6 +62,18 @@ class Fetcher:
         }
         self._primed_domains = set()
 
+        # In-run response cache keyed by (canonical) URL, least recently used evicted past
+        # FETCH_CACHE_SIZE pages or FETCH_CACHE_MAX_KB of page text (pages stay alive while cached)
+        self.cache = OrderedDict()
+        self.cache_size = int(os.getenv("FETCH_CACHE_SIZE", 64))
+        self.cache_max_chars = int(os.getenv("FETCH_CACHE_MAX_KB", 4096)) * 1024
+        self.cache_chars = 0
+        self.cache_hits = 0
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.cache_chars = 0
+
     @staticmethod
     def _ensure_https(url):
         """Convert http:// URLs to https:// to avoid 403 from sites that require HTTPS."""
@@ -66,7 +94,7 @@ class Fetcher:
             prime_headers['Sec-Fetch-Site'] = 'none'
             response = self.session.get(root_url, headers=prime_headers, timeout=15)
             self._primed_domains.add(root_url)
-            print(f"Primed session for: {root_url} (status: {response.status_code})")
+            logger.debug("Primed session for: %s (status: %s)", root_url, response.status_code)
 
             # For SeekingAlpha and similar sites, also visit a common intermediate
             # page to build up a realistic cookie/session state
@@ -76,16 +104,17 @@ class Fetcher:
                 nav_headers['Referer'] = root_url + '/'
                 nav_headers['Sec-Fetch-Site'] = 'same-origin'
                 self.session.get(root_url + '/market-news', headers=nav_headers, timeout=15)
-                print(f"  Navigated to market-news page to build session state")
+                logger.debug("Navigated to market-news page to build session state")
         except Exception as e:
-            print(f"Error priming session for {root_url}: {e}")
+            logger.warning("Error priming session for %s: %s", root_url, e)
 
         return root_url
 
     def _add_delay(self):
         """Add a random delay between requests to avoid rate limiting."""
-        delay = random.uniform(1.0, 3.0)
-        time.sleep(delay)
+        delay = random.uniform(self.delay_min, self.delay_max)
+        if delay > 0:
+            time.sleep(delay)
 
     def fetch_raw(self, url, timeout=15):
         """Fetch URL and return the raw response object (for sitemap binary content)."""
@@ -94,25 +123,30 @@ class Fetcher:
             response.raise_for_status()
             return response
         except Exception as e:
-            print(f"Error fetching raw {url}: {e}")
+            logger.warning("Error fetching raw %s: %s", url, e)
             return None
 
     @staticmethod
     def _clean_url(url):
-        """Strip fragment (#...) and fix any pre-encoded characters to avoid double-encoding."""
+        """Strip fragment (#...) and decode escaped unreserved characters."""
         # Remove fragment - it's browser-only and should never be sent to the server
         url = url.split('#')[0]
-        # Decode any existing percent-encoding first, then let the HTTP library handle encoding
-        # This prevents double-encoding (e.g. %3A -> %253A)
-        url = urllib.parse.unquote(url)
-        return url
+        # Valid escapes are passed through as they are (the HTTP library does not
+        # re-encode them); decoding %2F or %3F would ask for a different resource
+        return unquote_unreserved(url)
 
     def fetch(self, url):
         """Fetch URL and return response text, with HTTPS upgrade, session priming, and 403 retry."""
         try:
-            url = self._ensure_https(url)
+            if self.upgrade_http:
+                url = self._ensure_https(url)
             url = self._clean_url(url)
-            print(f"Fetching URL: {url}")
+            if url in self.cache:
+                self.cache.move_to_end(url)
+                self.cache_hits += 1
+                logger.debug("Fetching URL (cached): %s", url)
+                return self.cache[url]
+            logger.debug("Fetching URL: %s", url)
 
             # Prime session before first request to establish cookies
             parsed = urllib.parse.urlparse(url)
@@ -126,17 +160,17 @@ class Fetcher:
             # Retry on 403 with exponential backoff and referer header
             if response.status_code == 403:
                 if not HAS_CURL_CFFI:
-                    print(f"  NOTE: curl_cffi not installed - 403 is likely due to TLS fingerprint detection.")
-                    print(f"  Install curl_cffi to fix: pip install curl_cffi")
+                    logger.debug("curl_cffi not installed - 403 is likely due to TLS fingerprint detection.")
 
                 retry_headers = self.headers.copy()
                 retry_headers['Referer'] = root_url + '/'
                 retry_headers['Sec-Fetch-Site'] = 'same-origin'
 
                 for attempt in range(1, 4):
-                    backoff = 2 ** attempt + random.uniform(0, 2)
-                    print(f"Received 403 for {url}. Retry {attempt}/3 after {backoff:.1f}s...")
-                    time.sleep(backoff)
+                    backoff = (2 ** attempt + random.uniform(0, 2)) * self.backoff_scale
+                    logger.info("Received 403 for %s. Retry %d/3 after %.1fs...", url, attempt, backoff)
+                    if backoff > 0:
+                        time.sleep(backoff)
 
                     # Re-prime session on second retry to get fresh cookies
                     if attempt == 2:
@@ -150,7 +184,14 @@ class Fetcher:
 
             response.raise_for_status()
             self._add_delay()
-            return response.text
+            text = response.text
+            if self.cache_size and len(text) <= self.cache_max_chars:
+                self.cache[url] = text
+                self.cache_chars += len(text)
+                while len(self.cache) > self.cache_size or self.cache_chars > self.cache_max_chars:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cache_chars -= len(evicted)
+            return text
         except Exception as e:
-            print(f"Error fetching {url}: {e}")
+            logger.warning("Error fetching %s: %s", url, e)
             return None
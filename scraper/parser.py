@@ -2,6 +2,10 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
 import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
 
 class Parser:
     def parse(self, html_content):
@@ -9,6 +13,19 @@ class Parser:
             return None
         return BeautifulSoup(html_content, 'html.parser')
 
+    @staticmethod
+    def free(soup):
+        """
+        Frees a parsed page now instead of at the next garbage collection (the
+        tree is full of parent/child cycles). The soup is unusable afterwards.
+        """
+        if soup is None:
+            return
+        # BeautifulSoup.decompose() alone stops at the root, whose next_element is None
+        for child in list(soup.contents):
+            child.decompose()
+        soup.decompose()
+
     def extract_nextjs_data(self, soup):
         """Extracts JSON data from Next.js __NEXT_DATA__ script tag."""
         if not soup:
@@ -48,7 +65,7 @@ class Parser:
                     clean_text = BeautifulSoup(raw_html, 'html.parser').get_text(separator=' ', strip=True)
                     return clean_text
             except Exception as e:
-                print(f"Error extracting text from Next.js data: {e}")
+                logger.warning("Error extracting text from Next.js data: %s", e)
 
         # Default to legacy behavior: find all 'p' if selector is 'p' or None
         if not selector or selector == 'p':
@@ -118,7 +135,7 @@ class Parser:
                 # Fallback to dateutil
                 return date_parser.parse(d_str, fuzzy=True)
             except Exception as e:
-                print(f"Error parsing date '{d_str}': {e}")
+                logger.warning("Error parsing date '%s': %s", d_str, e)
                 return None
 
         # 1. Try regex on text content
@@ -234,7 +251,7 @@ class Parser:
                                 full_url = urljoin(base_url, item['link'])
                                 links.append(full_url)
             except Exception as e:
-                print(f"Error extracting links from Next.js data: {e}")
+                logger.warning("Error extracting links from Next.js data: %s", e)
 
         # Always fallback/supplement with standard anchor tag extraction
         for a_tag in soup.find_all('a', href=True):
@@ -244,6 +261,106 @@ class Parser:
             
         return list(set(links)) # Return unique links
 
+    def extract_link_records(self, soup, base_url, listing=None):
+        """
+        Like extract_links, but keeps what the listing page already says about
+        each link: {'url', 'title', 'published_at', 'tickers'} (unique by URL,
+        page order).
+
+        Investing.com items come from the __NEXT_DATA__ newsStore lists
+        (headline, ISO publish time, related stock symbols). Other anchors
+        only carry metadata on sites with `listing:` rules: the anchor text
+        becomes the title, a date_regex/date_formats/timezone is matched in
+        the link's row and a ticker_regex in its URL and row.
+        """
+        listing = listing or {}
+        records = {}
+        if not soup:
+            return []
+
+        def add(url, title=None, published_at=None, tickers=None):
+            record = records.setdefault(url, {'url': url, 'title': None, 'published_at': None, 'tickers': []})
+            record['title'] = record['title'] or title or None
+            record['published_at'] = record['published_at'] or published_at
+            for ticker in tickers or []:
+                if ticker not in record['tickers']:
+                    record['tickers'].append(ticker)
+
+        nextjs_data = self.extract_nextjs_data(soup)
+        if nextjs_data:
+            try:
+                news_store = nextjs_data.get('props', {}).get('pageProps', {}).get('state', {}).get('newsStore', {})
+                related_pairs = news_store.get('_relatedPairs') or {}
+                for key in ('_news', '_breakingNews', '_mostPopularNews', '_topArticles', '_featuredNews'):
+                    for item in news_store.get(key) or []:
+                        if not isinstance(item, dict) or 'link' not in item:
+                            continue
+                        pairs = (item.get('pairs') or []) + (related_pairs.get(str(item.get('id'))) or [])
+                        add(
+                            urljoin(base_url, item['link']),
+                            title=item.get('title') or item.get('headline'),
+                            published_at=self._parse_iso_date(item.get('published_at')),
+                            tickers=[p['stock_symbol'] for p in pairs if isinstance(p, dict) and p.get('stock_symbol')],
+                        )
+            except Exception as e:
+                logger.warning("Error extracting link records from Next.js data: %s", e)
+
+        date_regex = listing.get('date_regex')
+        ticker_regex = listing.get('ticker_regex')
+        for a_tag in soup.find_all('a', href=True):
+            url = urljoin(base_url, a_tag['href'])
+            # Bare anchor text ("Read more", ...) is only trusted as a title on configured listings
+            title = " ".join(a_tag.get_text(" ", strip=True).split()) if listing else None
+            published_at = None
+            tickers = []
+            if date_regex or ticker_regex:
+                row = a_tag.find_parent(['tr', 'li', 'article']) or a_tag.parent
+                row_text = " ".join(row.get_text(" ", strip=True).split()) if row else title
+                if date_regex:
+                    match = re.search(date_regex, row_text)
+                    if match:
+                        published_at = self._parse_listing_date(match.group(1), listing)
+                        # The timestamp is often inside the link itself (PRNewswire <small>)
+                        title = " ".join(title.replace(match.group(0), " ").split())
+                if ticker_regex:
+                    tickers = re.findall(ticker_regex, f"{url} {row_text}")
+            if title and len(title.split()) < 3:
+                title = None
+            add(url, title=title, published_at=published_at, tickers=tickers)
+
+        return list(records.values())
+
+    @staticmethod
+    def _parse_iso_date(value):
+        if not value:
+            return None
+        from datetime import datetime
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_listing_date(value, listing):
+        """Parses a listing timestamp with the first matching format; time-only formats mean today."""
+        from datetime import datetime
+        from dateutil import tz
+
+        zone = tz.gettz(listing['timezone']) if listing.get('timezone') else None
+        formats = listing.get('date_formats') or []
+        if isinstance(formats, str):
+            formats = [formats]
+        for fmt in formats:
+            try:
+                parsed = datetime.strptime(value.strip(), fmt)
+            except ValueError:
+                continue
+            if '%d' not in fmt:
+                today = datetime.now(zone)
+                parsed = parsed.replace(year=today.year, month=today.month, day=today.day)
+            return parsed.replace(tzinfo=zone) if zone else parsed
+        return None
+
     def format_for_analysis(self, text, url, max_chars=3000):
         if not text:
             return None
@@ -286,7 +403,7 @@ class Parser:
                 if soup.select_one(selector):
                     return True
             except Exception as e:
-                print(f"Error checking paywall selector '{selector}': {e}")
+                logger.warning("Error checking paywall selector '%s': %s", selector, e)
                 
         return False
 
@@ -2,6 +2,8 @@ import gzip
 import xml.etree.ElementTree as ET
 import logging
 
+logger = logging.getLogger(__name__)
+
 class SitemapParser:
     def __init__(self, fetcher):
         self.fetcher = fetcher
@@ -22,7 +24,7 @@ class SitemapParser:
 
             return response.content
         except Exception as e:
-            logging.error(f"Error fetching sitemap {url}: {e}")
+            logger.error("Error fetching sitemap %s: %s", url, e)
             return None
 
     def extract_urls(self, xml_content):
@@ -59,7 +61,7 @@ class SitemapParser:
                         urls.append({'url': url, 'is_sitemap': is_sitemap})
                         
         except ET.ParseError as e:
-            logging.error(f"Error parsing XML: {e}")
+            logger.error("Error parsing XML: %s", e)
             
         return urls
 
@@ -84,7 +86,7 @@ class SitemapParser:
                 continue
             
             visited.add(current_url)
-            print(f"Parsing sitemap: {current_url}")
+            logger.debug("Parsing sitemap: %s", current_url)
             
             content = self.fetch_content(current_url)
             if not content:
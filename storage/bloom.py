@@ -0,0 +1,82 @@
+import math
+import struct
+
+_HEADER = struct.Struct('<QIQ')
+
+
+class BloomFilter:
+    """
+    Bloom filter over the hex md5 url_hash keys used by the state backends.
+
+    A miss means the URL was definitely never marked processed, so the backend
+    lookup can be skipped; a hit only means "maybe" and must be confirmed.
+    Two filters with the same size can be merged with union().
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01, num_bits=None, num_hashes=None):
+        if num_bits is None:
+            num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        if num_hashes is None:
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8)
+        # Number of keys added (with repeats); used to size the next rebuild
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: md5 hex already gives two independent 64-bit values
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:32], 16) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def union(self, other):
+        """ORs another filter of the same size into this one."""
+        if (other.num_bits, other.num_hashes) != (self.num_bits, self.num_hashes):
+            raise ValueError("Cannot merge Bloom filters of different sizes")
+        self.bits = bytearray(a | b for a, b in zip(self.bits, other.bits))
+        self.count = max(self.count, other.count)
+
+    def fill_ratio(self):
+        return bin(int.from_bytes(self.bits, 'little')).count('1') / self.num_bits
+
+    def estimated_fpr(self):
+        """False-positive rate implied by the fraction of bits set."""
+        return self.fill_ratio() ** self.num_hashes
+
+    def to_bytes(self):
+        return _HEADER.pack(self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        bloom = cls(num_bits=num_bits, num_hashes=num_hashes)
+        bloom.bits = bytearray(data[_HEADER.size:])
+        bloom.count = count
+        if len(bloom.bits) != (num_bits + 7) // 8:
+            raise ValueError("Truncated Bloom filter")
+        return bloom
+
+
+class BloomStats:
+    """Counts how often the filter let a lookup skip the backend."""
+
+    def __init__(self):
+        self.lookups = 0
+        self.skipped = 0
+        self.maybe = 0
+        self.false_positives = 0
+
+    def observed_fpr(self):
+        """Share of URLs not in the backend that the filter still reported as maybe-seen."""
+        negatives = self.skipped + self.false_positives
+        return self.false_positives / negatives if negatives else 0.0
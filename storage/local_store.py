@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from struct import error as struct_error
+import time
+
+from storage.bloom import BloomFilter, BloomStats
+
+logger = logging.getLogger(__name__)
+
+
+def url_hash(url):
+    """Key used for a URL in every state backend."""
+    return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+
+class SQLiteStateStore:
+    """
+    Local processed-URL store backed by SQLite in WAL mode.
+
+    Marks are buffered and written in batched transactions instead of rewriting
+    a file per URL. Every entry carries the time it was processed, and entries
+    older than `retention_days` are compacted away when the store is opened.
+    A legacy processed_urls.json next to the database is imported once.
+
+    A Bloom filter of every stored key is kept in the same database so most
+    new URLs are answered without a query. Each batch merges the stored filter
+    into this store's under the write lock and writes the union back, so
+    several processes can share one database. It is rebuilt from the table
+    after compaction or migration.
+    """
+
+    def __init__(self, path="processed_urls.db", retention_days=30, batch_size=50,
+                 legacy_json_path="processed_urls.json", bloom_capacity=100000, bloom_error_rate=0.01):
+        self.path = path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.legacy_json_path = legacy_json_path
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.pending = {}
+        self.migrated_count = 0
+        self.compacted_count = 0
+        self.bloom = None
+        self.bloom_stats = BloomStats()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: a crash can lose the last commit but never corrupts the file
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_urls ("
+            " url_hash TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " processed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_processed_at ON processed_urls (processed_at)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS state_meta (name TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self.conn.commit()
+
+        self._migrate_legacy_json()
+        self.compact()
+        if self.bloom is None:
+            self._load_bloom()
+
+    def _migrate_legacy_json(self):
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, 'r') as f:
+                urls = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Could not migrate %s: %s", self.legacy_json_path, e)
+            return
+
+        # The JSON file has no per-URL times; its last write is the best bound
+        processed_at = os.path.getmtime(self.legacy_json_path)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO processed_urls (url_hash, url, processed_at) VALUES (?, ?, ?)",
+                ((url_hash(url), url, processed_at) for url in urls)
+            )
+        os.replace(self.legacy_json_path, self.legacy_json_path + ".migrated")
+        self.migrated_count = len(urls)
+        logger.info("Migrated %d URLs from %s to %s", len(urls), self.legacy_json_path, self.path)
+
+    def compact(self):
+        """Deletes entries older than the retention window. Returns the number removed."""
+        if not self.retention_days:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        with self.conn:
+            removed = self.conn.execute(
+                "DELETE FROM processed_urls WHERE processed_at < ?", (cutoff,)
+            ).rowcount
+        self.compacted_count += removed
+        if removed or self.migrated_count:
+            self.rebuild_bloom()
+        return removed
+
+    def _load_bloom(self):
+        row = self.conn.execute("SELECT value FROM state_meta WHERE name = 'bloom'").fetchone()
+        if row:
+            try:
+                self.bloom = BloomFilter.from_bytes(row[0])
+                # Grown past its capacity: rebuild larger instead of answering "maybe" to everything
+                if self.bloom.estimated_fpr() <= 2 * self.bloom_error_rate:
+                    return
+            except (ValueError, struct_error) as e:
+                logger.warning("Rebuilding unreadable Bloom filter: %s", e)
+        self.rebuild_bloom()
+
+    def rebuild_bloom(self):
+        """Rebuilds the Bloom filter from every stored key, sized for future growth."""
+        with self.conn:
+            # Write lock first: no other writer commits between the scan and the save
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._fill_bloom()
+            self._save_bloom()
+
+    def _fill_bloom(self):
+        rows = self.conn.execute("SELECT COUNT(*) FROM processed_urls").fetchone()[0]
+        self.bloom = BloomFilter(max(self.bloom_capacity, 2 * rows), self.bloom_error_rate)
+        for (key,) in self.conn.execute("SELECT url_hash FROM processed_urls"):
+            self.bloom.add(key)
+        for key in self.pending:
+            self.bloom.add(key)
+
+    def _merge_stored_bloom(self):
+        """ORs the stored filter (other writers' keys) into ours; called under the write lock."""
+        row = self.conn.execute("SELECT value FROM state_meta WHERE name = 'bloom'").fetchone()
+        if not row:
+            return
+        try:
+            self.bloom.union(BloomFilter.from_bytes(row[0]))
+        except (ValueError, struct_error):
+            # Resized (or unreadable) by another writer: the table is the source of truth
+            self._fill_bloom()
+
+    def _save_bloom(self):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO state_meta (name, value) VALUES ('bloom', ?)",
+            (self.bloom.to_bytes(),)
+        )
+
+    def _maybe_stored(self, key):
+        """False only when the key is definitely not in the table."""
+        self.bloom_stats.lookups += 1
+        if key not in self.bloom:
+            self.bloom_stats.skipped += 1
+            return False
+        self.bloom_stats.maybe += 1
+        return True
+
+    def contains(self, url):
+        key = url_hash(url)
+        if key in self.pending:
+            return True
+        if not self._maybe_stored(key):
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM processed_urls WHERE url_hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.bloom_stats.false_positives += 1
+        return row is not None
+
+    def filter_unprocessed(self, urls):
+        """Returns the URLs not in the store, in order and without repeats."""
+        candidates = {}
+        for url in urls:
+            key = url_hash(url)
+            if key not in self.pending:
+                candidates.setdefault(key, url)
+
+        # Only keys the filter may have seen need a query
+        keys = [key for key in candidates if self._maybe_stored(key)]
+        maybe_count = len(keys)
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for (key,) in self.conn.execute(
+                f"SELECT url_hash FROM processed_urls WHERE url_hash IN ({placeholders})", chunk
+            ):
+                del candidates[key]
+                maybe_count -= 1
+        self.bloom_stats.false_positives += maybe_count
+        return list(candidates.values())
+
+    def add(self, url, processed_at=None):
+        key = url_hash(url)
+        self.pending[key] = (url, processed_at or time.time())
+        self.bloom.add(key)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commits buffered marks in one transaction."""
+        if not self.pending:
+            return
+        with self.conn:
+            # Write lock before reading the stored filter, so no other writer's keys are lost
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO processed_urls (url_hash, url, processed_at) VALUES (?, ?, ?)",
+                ((key, url, processed_at) for key, (url, processed_at) in self.pending.items())
+            )
+            # Our keys, every other writer's and the rows just written, saved in one transaction
+            self._merge_stored_bloom()
+            self._save_bloom()
+        self.pending = {}
+
+    def count(self):
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM processed_urls").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+# Below this many words a few changed words move too many bits to compare reliably
+MIN_TOKENS = 30
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text, shingle_size=2):
+    """
+    64-bit SimHash of `text` over word shingles, or None for text too short to
+    fingerprint reliably. Similar texts get fingerprints a small Hamming distance apart.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < max(MIN_TOKENS, shingle_size):
+        return None
+    shingles = Counter(" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1))
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle, count in shingles.items():
+        h = _feature_hash(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def band_masks(max_distance):
+    """
+    Splits the fingerprint into max_distance + 1 bands. Two fingerprints within
+    max_distance bits differ in at most max_distance bands, so they share at
+    least one band exactly (pigeonhole) and meet in that band's bucket.
+    """
+    bands = max_distance + 1
+    masks = []
+    start = 0
+    for band in range(bands):
+        width = FINGERPRINT_BITS // bands + (1 if band < FINGERPRINT_BITS % bands else 0)
+        masks.append(((1 << width) - 1) << start)
+        start += width
+    return masks
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class NearDuplicateIndex:
+    """
+    Persistent banded-LSH index of article SimHash fingerprints.
+
+    Fingerprints live in a small SQLite file and are loaded into in-memory
+    band buckets at startup, so a lookup is a few dict probes plus a popcount
+    per candidate. Entries older than `retention_days` are dropped on open
+    and by prune() (a long-lived process calls it periodically).
+    """
+
+    def __init__(self, path="near_duplicates.db", max_distance=6, retention_days=7):
+        self.path = path
+        self.max_distance = max_distance
+        self.retention_days = retention_days
+        self.masks = band_masks(max_distance)
+        self.buckets = {}
+        self.pending = []
+        self.checked = 0
+        self.dropped = 0
+        # Shared by site workers: check-and-add must be atomic
+        self.lock = threading.Lock()
+
+        try:
+            self.conn = self._open(path)
+        except sqlite3.Error as e:
+            # e.g. read-only deployment: still catch duplicates within this run
+            logger.warning("Near-duplicate index %s unavailable (%s); using memory only.", path, e)
+            self.conn = self._open(":memory:")
+
+        for fingerprint, url in self.conn.execute("SELECT fingerprint, url FROM fingerprints"):
+            self._index(fingerprint & ((1 << 64) - 1), url)
+
+    def _open(self, path):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " fingerprint INTEGER NOT NULL,"
+            " url TEXT NOT NULL,"
+            " added_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_fingerprints_added_at ON fingerprints (added_at)"
+        )
+        self._delete_expired(conn)
+        conn.commit()
+        return conn
+
+    def _delete_expired(self, conn):
+        if not self.retention_days:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        return conn.execute("DELETE FROM fingerprints WHERE added_at < ?", (cutoff,)).rowcount
+
+    def prune(self):
+        """
+        Drops fingerprints past the retention window from the file and the
+        in-memory buckets, which otherwise only grow. Returns the number removed.
+        """
+        self.flush()
+        with self.lock:
+            with self.conn:
+                removed = self._delete_expired(self.conn)
+            if removed:
+                self.buckets = {}
+                for fingerprint, url in self.conn.execute("SELECT fingerprint, url FROM fingerprints"):
+                    self._index(fingerprint & ((1 << 64) - 1), url)
+            return removed
+
+    def _index(self, fingerprint, url):
+        for band, mask in enumerate(self.masks):
+            self.buckets.setdefault((band, fingerprint & mask), []).append((fingerprint, url))
+
+    def find(self, fingerprint):
+        """URL of an indexed article within max_distance bits of `fingerprint`, or None."""
+        for band, mask in enumerate(self.masks):
+            for candidate, url in self.buckets.get((band, fingerprint & mask), ()):
+                if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint, url):
+        self._index(fingerprint, url)
+        self.pending.append((_to_signed(fingerprint), url, time.time()))
+
+    def check(self, text, url):
+        """
+        Returns the URL of an earlier near-duplicate of `text`, or None after
+        indexing `text` under `url`. Text too short to fingerprint is never a duplicate.
+        """
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return None
+        with self.lock:
+            self.checked += 1
+            duplicate_of = self.find(fingerprint)
+            if duplicate_of is not None:
+                self.dropped += 1
+                return duplicate_of
+            self.add(fingerprint, url)
+            return None
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO fingerprints (fingerprint, url, added_at) VALUES (?, ?, ?)", self.pending
+                )
+            self.pending = []
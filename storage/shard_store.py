@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Where sharded workers leave their results for the reduce step: a directory,
+# or s3://bucket/prefix (on Lambda, where /tmp is not shared)
+DEFAULT_SHARD_STORE = os.getenv("SHARD_STORE", "shards")
+
+
+def open_shard_store(location=DEFAULT_SHARD_STORE):
+    if location.startswith("s3://"):
+        bucket, _, prefix = location[len("s3://"):].partition('/')
+        return S3ShardStore(bucket, prefix)
+    return DirectoryShardStore(location)
+
+
+class DirectoryShardStore:
+    """
+    Shard results as JSON files, <path>/<run_id>/<name>.json. A directory
+    every worker can reach (local disk, NFS) is the shared store.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def put(self, run_id, name, payload):
+        directory = os.path.join(self.path, run_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, default=str)
+        # The reduce step never sees a half-written shard
+        os.replace(tmp_path, path)
+        return path
+
+    def get_all(self, run_id):
+        """{name: payload} of every result stored for the run."""
+        directory = os.path.join(self.path, run_id)
+        results = {}
+        if not os.path.isdir(directory):
+            return results
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    results[filename[:-len(".json")]] = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read shard result %s: %s", filename, e)
+        return results
+
+    def claim(self, run_id, name):
+        """True for the first caller only (creates the marker `name` atomically)."""
+        directory = os.path.join(self.path, run_id)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fd = os.open(os.path.join(directory, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+
+class S3ShardStore:
+    """Shard results as JSON objects, s3://<bucket>/<prefix>/<run_id>/<name>.json."""
+
+    def __init__(self, bucket, prefix="", client=None):
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = client or boto3.client('s3')
+
+    def _key(self, run_id, name):
+        return "/".join(part for part in (self.prefix, run_id, name) if part)
+
+    def put(self, run_id, name, payload):
+        key = self._key(run_id, f"{name}.json")
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(payload, default=str).encode('utf-8'),
+                               ContentType="application/json")
+        return f"s3://{self.bucket}/{key}"
+
+    def get_all(self, run_id):
+        prefix = self._key(run_id, "")
+        prefix = prefix + "/" if prefix else ""
+        results = {}
+        for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                key = item['Key']
+                if not key.endswith(".json"):
+                    continue
+                body = self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+                results[key[len(prefix):-len(".json")]] = json.loads(body)
+        return results
+
+    def claim(self, run_id, name):
+        """
+        True unless the marker exists. Best effort: two reducers started at
+        the same moment could both pass, so start the reduce step once.
+        """
+        from botocore.exceptions import ClientError
+        key = self._key(run_id, name)
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return False
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ("404", "NoSuchKey", "NotFound"):
+                raise
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=b"")
+        return True
@@ -1,64 +1,471 @@
-import json
+import datetime
+import logging
 import os
-import hashlib
+import threading
+import time
+import uuid
+from struct import error as struct_error
 import boto3
 from botocore.exceptions import ClientError
 
+from storage.bloom import BloomFilter, BloomStats
+from storage.local_store import SQLiteStateStore, url_hash
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB request limits
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+# Attempts for keys/items DynamoDB returns as unprocessed (throttling)
+MAX_BATCH_ATTEMPTS = 6
+
+# Reserved keys (never an md5 hex digest) for the Bloom filter snapshot and
+# the marker saying items were written after the snapshot was last saved
+BLOOM_ITEM_KEY = "__bloom__"
+BLOOM_DIRTY_KEY = "__bloom_dirty__"
+# The snapshot's bytes are split over items of this size (DynamoDB items are at most 400 KB)
+BLOOM_CHUNK_BYTES = 350 * 1024
+# A run's dirty stamp older than this (before a rebuild's Scan) belongs to writes the Scan saw
+BLOOM_MARKER_GRACE_SECONDS = 300
+# A run restamps on every batch and clears its stamp when it saves the filter; one
+# not restamped for this long (a Lambda run's limit) stopped without saving it
+BLOOM_WRITER_TIMEOUT_SECONDS = 900
+
 class StateManager:
     def __init__(self, table_name=None, region_name="us-east-1"):
         self.table_name = table_name or os.getenv("DYNAMODB_TABLE")
         self.region_name = region_name or os.getenv("AWS_REGION", "us-east-1")
-        self.local_file = "processed_urls.json"
-        
+        self.local_file = os.getenv("STATE_DB_PATH", "processed_urls.db")
+        # Entries older than this are compacted away locally and expired by
+        # DynamoDB TTL in Lambda mode (0 keeps everything)
+        self.retention_days = float(os.getenv("STATE_RETENTION_DAYS", 30))
+        # Marks are committed in batches of this size (and by flush())
+        self.batch_size = int(os.getenv("STATE_BATCH_SIZE", 50))
+        # Site workers share one StateManager; public methods hold this lock
+        self.lock = threading.RLock()
+        # Bloom filter in front of the state lookups
+        self.bloom_capacity = int(os.getenv("BLOOM_CAPACITY", 100000))
+        self.bloom_error_rate = float(os.getenv("BLOOM_ERROR_RATE", 0.01))
+
         if self.table_name:
             self.dynamodb = boto3.resource('dynamodb', region_name=self.region_name)
             self.table = self.dynamodb.Table(self.table_name)
-            print(f"StateManager using DynamoDB table: {self.table_name}")
+            self.pending = {}
+            self.bloom_stats = BloomStats()
+            self.bloom_dirty = False
+            # This run's entry in the dirty marker: run_<token> = time of its last write (ms)
+            self.bloom_run_attr = f"run_{uuid.uuid4().hex}"
+            self.bloom_dirty_stamp = None
+            self.bloom_chunk_keys = []
+            self.bloom = self._load_dynamodb_bloom()
+            logger.info("StateManager using DynamoDB table: %s", self.table_name)
         else:
             self.table = None
-            self.processed = self._load_local_state()
-            print("StateManager using local file.")
+            self.store = SQLiteStateStore(
+                self.local_file,
+                retention_days=self.retention_days,
+                batch_size=self.batch_size,
+                bloom_capacity=self.bloom_capacity,
+                bloom_error_rate=self.bloom_error_rate,
+            )
+            self.bloom_stats = self.store.bloom_stats
+            logger.info("StateManager using local database: %s (compacted %d entries older than %g days)",
+                        self.local_file, self.store.compacted_count, self.retention_days)
 
-    def _load_local_state(self):
-        if os.path.exists(self.local_file):
-            with open(self.local_file, 'r') as f:
-                try:
-                    return set(json.load(f))
-                except json.JSONDecodeError:
-                    return set()
-        return set()
+    def flush(self):
+        """
+        Writes any buffered marks (and, in DynamoDB mode, the Bloom filter) to
+        the backend. Callers flush when they are done: nothing is written at exit.
+        """
+        with self.lock:
+            if self.table:
+                self._flush_dynamodb()
+                if self.bloom and self.bloom_dirty:
+                    self._save_dynamodb_bloom()
+            else:
+                self.store.flush()
 
-    def _save_local_state(self):
-        with open(self.local_file, 'w') as f:
-            json.dump(list(self.processed), f)
+    def compact(self):
+        """
+        Applies the retention window again, for a long-lived process (the
+        stores apply it only when opened). Locally, expired entries are
+        deleted (and the Bloom filter rebuilt). In DynamoDB mode TTL expires
+        the items, so the Bloom filter is saved and loaded again instead: it
+        picks up other runs' marks, and is rebuilt once past the window.
+        Returns the number of local entries removed.
+        """
+        with self.lock:
+            if not self.table:
+                return self.store.compact()
+            self.flush()
+            self.bloom = self._load_dynamodb_bloom()
+            return 0
+
+    def bloom_report(self):
+        """One-line summary of how many lookups the Bloom filter answered."""
+        stats = self.bloom_stats
+        # The local store replaces its filter when it rebuilds it
+        bloom = self.bloom if self.table else self.store.bloom
+        if not bloom or not stats.lookups:
+            return "Bloom filter: no lookups"
+        return (f"Bloom filter: {stats.skipped}/{stats.lookups} lookups skipped the backend, "
+                f"{stats.false_positives} false positives (observed FPR {stats.observed_fpr():.2%}, "
+                f"estimated {bloom.estimated_fpr():.2%})")
 
     def is_processed(self, url):
-        if self.table:
-            try:
+        return not self.filter_unprocessed([url])
+
+    def filter_unprocessed(self, urls):
+        """
+        Returns the URLs that have not been processed, in order and without repeats.
+
+        In DynamoDB mode this is one BatchGetItem per 100 URLs instead of a
+        GetItem per URL.
+        """
+        with self.lock:
+            if not self.table:
+                return self.store.filter_unprocessed(urls)
+
+            candidates = {}
+            for url in urls:
                 # Use URL hash as key to avoid invalid characters in PK
-                url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()
-                response = self.table.get_item(Key={'url_hash': url_hash})
-                return 'Item' in response
+                key = url_hash(url)
+                if key not in self.pending:
+                    candidates.setdefault(key, url)
+
+            # Definite Bloom misses need no lookup; only "maybe seen" keys are confirmed
+            keys = [key for key in candidates if self._maybe_stored(key)]
+            maybe_keys = set(keys)
+            for i in range(0, len(keys), BATCH_GET_LIMIT):
+                request = {
+                    self.table_name: {
+                        'Keys': [{'url_hash': key} for key in keys[i:i + BATCH_GET_LIMIT]],
+                        'ProjectionExpression': 'url_hash',
+                    }
+                }
+                try:
+                    for item in self._batch_get(request):
+                        candidates.pop(item['url_hash'], None)
+                        maybe_keys.discard(item['url_hash'])
+                except ClientError as e:
+                    # Same fallback as before: an unreadable state means "not processed"
+                    logger.error("DynamoDB Error checking state: %s", e)
+            if self.bloom:
+                self.bloom_stats.false_positives += len(maybe_keys)
+            return list(candidates.values())
+
+    def _maybe_stored(self, key):
+        if not self.bloom:
+            return True
+        self.bloom_stats.lookups += 1
+        if key not in self.bloom:
+            self.bloom_stats.skipped += 1
+            return False
+        self.bloom_stats.maybe += 1
+        return True
+
+    def mark_processed(self, url):
+        with self.lock:
+            if self.table:
+                now = time.time()
+                item = {
+                    'url_hash': url_hash(url),
+                    'url': url,
+                    'timestamp': datetime.datetime.fromtimestamp(now, datetime.timezone.utc).isoformat(timespec='seconds'),
+                }
+                if self.retention_days:
+                    # Numeric epoch seconds: the table's TTL attribute
+                    item['expires_at'] = int(now + self.retention_days * 86400)
+                self.pending[item['url_hash']] = item
+                if len(self.pending) >= self.batch_size:
+                    self._flush_dynamodb()
+            else:
+                self.store.add(url)
+
+    def _flush_dynamodb(self):
+        items = list(self.pending.values())
+        self.pending = {}
+        if not items:
+            return
+        if self.bloom:
+            self._mark_bloom_dirty()
+            for item in items:
+                self.bloom.add(item['url_hash'])
+        for i in range(0, len(items), BATCH_WRITE_LIMIT):
+            request = {
+                self.table_name: [{'PutRequest': {'Item': item}} for item in items[i:i + BATCH_WRITE_LIMIT]]
+            }
+            try:
+                self._batch_write(request)
             except ClientError as e:
-                print(f"DynamoDB Error checking state: {e}")
-                return False
+                logger.error("DynamoDB Error saving state: %s", e)
+
+    def _batch_get(self, request):
+        """BatchGetItem, re-requesting UnprocessedKeys with exponential backoff."""
+        items = []
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = self.dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(self.table_name, []))
+            request = response.get('UnprocessedKeys')
+            if not request:
+                return items
+            time.sleep(0.05 * 2 ** attempt)
+        unprocessed = len(request.get(self.table_name, {}).get('Keys', []))
+        logger.error("DynamoDB Error checking state: %d keys still unprocessed after retries", unprocessed)
+        return items
+
+    def _batch_write(self, request):
+        """BatchWriteItem, resending UnprocessedItems with exponential backoff."""
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = self.dynamodb.batch_write_item(RequestItems=request)
+            request = response.get('UnprocessedItems')
+            if not request:
+                return
+            time.sleep(0.05 * 2 ** attempt)
+        unprocessed = len(request.get(self.table_name, []))
+        logger.error("DynamoDB Error saving state: %d items still unprocessed after retries", unprocessed)
+
+    def _load_dynamodb_bloom(self):
+        """
+        Loads the Bloom filter snapshot, or rebuilds it with a table Scan when
+        it is missing or incomplete, older than the retention window (TTL has
+        expired keys it still holds), over capacity, or a run stopped without
+        saving items it wrote (its entry in the dirty marker is older than
+        BLOOM_WRITER_TIMEOUT_SECONDS). Runs still writing merge their items
+        into the snapshot when they save it, so they do not force a Scan.
+        """
+        try:
+            items = self._batch_get({
+                self.table_name: {'Keys': [{'url_hash': BLOOM_ITEM_KEY}, {'url_hash': BLOOM_DIRTY_KEY}]}
+            })
+        except ClientError as e:
+            logger.error("DynamoDB Error loading Bloom filter, lookups go to the table: %s", e)
+            return None
+
+        by_key = {item['url_hash']: item for item in items}
+        snapshot = by_key.get(BLOOM_ITEM_KEY)
+        stamps = self._dirty_stamps(by_key.get(BLOOM_DIRTY_KEY))
+        dead_before_ms = (time.time() - BLOOM_WRITER_TIMEOUT_SECONDS) * 1000
+        dead = [name for name, stamp in stamps.items() if self._stamp_ms(name, stamp) < dead_before_ms]
+        reason = None
+        if dead:
+            reason = f"{len(dead)} run(s) stopped without saving items it lacks"
+        elif not snapshot:
+            reason = "no snapshot"
+        elif self.retention_days and time.time() - float(snapshot['built_at']) > self.retention_days * 86400:
+            reason = "older than the retention window"
         else:
-            return url in self.processed
+            bloom = self._read_snapshot(snapshot)
+            if bloom is None:
+                reason = "incomplete snapshot"
+            elif bloom.estimated_fpr() > 2 * self.bloom_error_rate:
+                reason = "over capacity"
+            else:
+                if stamps:
+                    logger.info("Bloom filter loaded while %d other run(s) are writing; they merge "
+                                "their items when they save it", len(stamps))
+                self._adopt_snapshot(snapshot)
+                self.bloom_built_at = float(snapshot['built_at'])
+                return bloom
 
-    def mark_processed(self, url):
-        if self.table:
+        logger.info("Rebuilding Bloom filter from %s (%s)...", self.table_name, reason)
+        scan_started = time.time()
+        bloom = self._rebuild_dynamodb_bloom(snapshot)
+        if bloom is not None:
+            self._clear_stale_stamps(stamps, scan_started)
+        return bloom
+
+    @staticmethod
+    def _dirty_stamps(marker):
+        """{attribute: stamp} of the runs listed in the dirty marker item."""
+        if not marker:
+            return {}
+        # 'since': the single marker written before markers were per run
+        return {name: value for name, value in marker.items() if name.startswith("run_") or name == "since"}
+
+    @staticmethod
+    def _stamp_ms(name, stamp):
+        # The legacy marker held seconds, not milliseconds
+        return float(stamp) * (1000 if name == "since" else 1)
+
+    def _clear_stale_stamps(self, stamps, scan_started):
+        """
+        Removes the entries a rebuild's Scan made redundant: stamped well before
+        the Scan, and unchanged since they were read (a run writing again restamps
+        first, so its entry stays until it saves the filter itself).
+        """
+        cutoff_ms = (scan_started - BLOOM_MARKER_GRACE_SECONDS) * 1000
+        for name, stamp in stamps.items():
+            if self._stamp_ms(name, stamp) < cutoff_ms:
+                self._remove_stamp(name, stamp)
+
+    def _remove_stamp(self, name, stamp):
+        try:
+            self.table.update_item(
+                Key={'url_hash': BLOOM_DIRTY_KEY},
+                UpdateExpression='REMOVE #run',
+                ConditionExpression='#run = :stamp',
+                ExpressionAttributeNames={'#run': name},
+                ExpressionAttributeValues={':stamp': stamp},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error("DynamoDB Error clearing Bloom filter marker: %s", e)
+
+    def _adopt_snapshot(self, snapshot):
+        """The next save replaces `snapshot` (None: no snapshot yet) and deletes its chunks."""
+        self.bloom_version = int(snapshot['version']) if snapshot else 0
+        self.bloom_chunk_keys = []
+        if snapshot and 'chunk_prefix' in snapshot:
+            self.bloom_chunk_keys = [f"{snapshot['chunk_prefix']}#{i}" for i in range(int(snapshot['chunks']))]
+
+    def _read_snapshot(self, snapshot):
+        """The filter a snapshot item points to, or None if a chunk is missing or unreadable."""
+        try:
+            if 'bloom' in snapshot:
+                # Unchunked snapshot of an earlier version
+                return BloomFilter.from_bytes(snapshot['bloom'].value)
+            keys = [f"{snapshot['chunk_prefix']}#{i}" for i in range(int(snapshot['chunks']))]
+            chunks = {}
+            for i in range(0, len(keys), BATCH_GET_LIMIT):
+                for item in self._batch_get({self.table_name: {'Keys': [{'url_hash': key} for key in keys[i:i + BATCH_GET_LIMIT]]}}):
+                    chunks[item['url_hash']] = item['bloom'].value
+            if len(chunks) != len(keys):
+                return None
+            return BloomFilter.from_bytes(b"".join(chunks[key] for key in keys))
+        except (ClientError, KeyError, ValueError, struct_error) as e:
+            logger.warning("Unreadable Bloom filter snapshot: %s", e)
+            return None
+
+    def _rebuild_dynamodb_bloom(self, snapshot):
+        keys = []
+        # Strongly consistent: the rebuild clears dirty entries on the strength of it
+        scan_kwargs = {'ProjectionExpression': 'url_hash', 'ConsistentRead': True}
+        try:
+            while True:
+                response = self.table.scan(**scan_kwargs)
+                keys.extend(item['url_hash'] for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error("DynamoDB Error rebuilding Bloom filter, lookups go to the table: %s", e)
+            return None
+
+        # Reserved items (snapshot, chunks, marker) all start with "__"; md5 hex never does
+        keys = [key for key in keys if not key.startswith("__")]
+        bloom = BloomFilter(max(self.bloom_capacity, 2 * len(keys)), self.bloom_error_rate)
+        for key in keys:
+            bloom.add(key)
+        self._adopt_snapshot(snapshot)
+        self.bloom_built_at = time.time()
+        # Saved at the next flush()
+        self.bloom_dirty = True
+        return bloom
+
+    def _mark_bloom_dirty(self):
+        """
+        Stamps this run's entry in the marker item before each batch of writes:
+        items are about to exist that the saved filter lacks. Saving the filter
+        removes the entry only if it still holds the last stamp.
+        """
+        # Set first: the filter must be saved at flush() even if the marker fails
+        self.bloom_dirty = True
+        stamp = int(time.time() * 1000)
+        try:
+            self.table.update_item(
+                Key={'url_hash': BLOOM_DIRTY_KEY},
+                UpdateExpression='SET #run = :stamp',
+                ExpressionAttributeNames={'#run': self.bloom_run_attr},
+                ExpressionAttributeValues={':stamp': stamp},
+            )
+            self.bloom_dirty_stamp = stamp
+        except ClientError as e:
+            logger.error("DynamoDB Error saving state: %s", e)
+
+    def _write_chunks(self, data, prefix):
+        keys = []
+        for i in range(0, max(1, len(data)), BLOOM_CHUNK_BYTES):
+            key = f"{prefix}#{len(keys)}"
+            self.table.put_item(Item={'url_hash': key, 'bloom': data[i:i + BLOOM_CHUNK_BYTES]})
+            keys.append(key)
+        return keys
+
+    def _delete_chunks(self, keys):
+        for key in keys:
+            try:
+                self.table.delete_item(Key={'url_hash': key})
+            except ClientError as e:
+                logger.warning("DynamoDB Error deleting Bloom filter chunk %s: %s", key, e)
+
+    def _save_dynamodb_bloom(self):
+        """
+        Saves the filter with an optimistic version check. Its bytes go to
+        chunk items under a key prefix of their own, then the snapshot item is
+        pointed at them. If another run saved in the meantime, its filter is
+        merged in (bitwise OR) and the save retried; if that filter has another
+        size (rebuilt from a newer Scan) ours is rebuilt too rather than
+        overwriting it.
+        """
+        for _ in range(MAX_BATCH_ATTEMPTS):
+            version = self.bloom_version + 1
+            prefix = f"{BLOOM_ITEM_KEY}#{self.bloom_run_attr[len('run_'):]}#{version}"
+            try:
+                chunk_keys = self._write_chunks(self.bloom.to_bytes(), prefix)
+            except ClientError as e:
+                logger.error("DynamoDB Error saving Bloom filter: %s", e)
+                return
             try:
-                url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()
                 self.table.put_item(
                     Item={
-                        'url_hash': url_hash,
-                        'url': url,
-                        'timestamp': os.popen('date /t').read().strip() # Simple timestamp, safer to use datetime
-                    }
+                        'url_hash': BLOOM_ITEM_KEY,
+                        'chunk_prefix': prefix,
+                        'chunks': len(chunk_keys),
+                        'version': version,
+                        'built_at': int(self.bloom_built_at),
+                    },
+                    ConditionExpression='attribute_not_exists(url_hash) OR version = :v',
+                    ExpressionAttributeValues={':v': self.bloom_version},
                 )
             except ClientError as e:
-                print(f"DynamoDB Error saving state: {e}")
-        else:
-            self.processed.add(url)
-            self._save_local_state()
+                self._delete_chunks(chunk_keys)
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    logger.error("DynamoDB Error saving Bloom filter: %s", e)
+                    return
+                if not self._merge_current_snapshot():
+                    return
+                continue
+            # Readers of the previous snapshot rebuild if its chunks are gone by then
+            self._delete_chunks(self.bloom_chunk_keys)
+            self.bloom_chunk_keys = chunk_keys
+            self.bloom_version = version
+            if self.bloom_dirty_stamp is not None:
+                self._remove_stamp(self.bloom_run_attr, self.bloom_dirty_stamp)
+                self.bloom_dirty_stamp = None
+            self.bloom_dirty = False
+            return
+        logger.error("DynamoDB Error saving Bloom filter: too many concurrent updates")
 
+    def _merge_current_snapshot(self):
+        """After a lost save race: takes in the stored filter. False if the save must be given up."""
+        try:
+            current = self.table.get_item(Key={'url_hash': BLOOM_ITEM_KEY}).get('Item')
+        except ClientError as e:
+            logger.error("DynamoDB Error saving Bloom filter: %s", e)
+            return False
+        if not current:
+            self._adopt_snapshot(None)
+            return True
+        other = self._read_snapshot(current)
+        if other is not None and (other.num_bits, other.num_hashes) == (self.bloom.num_bits, self.bloom.num_hashes):
+            self.bloom.union(other)
+            self._adopt_snapshot(current)
+            return True
+        # Sized differently (or unreadable): it may hold keys ours never saw, and
+        # ours cannot be merged into it. Rebuild from the table, which has both.
+        logger.info("Stored Bloom filter differs in size; rebuilding before saving")
+        rebuilt = self._rebuild_dynamodb_bloom(current)
+        if rebuilt is None:
+            return False
+        self.bloom = rebuilt
+        return True
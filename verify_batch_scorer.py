@@ -0,0 +1,45 @@
+import json
+import sys
+from processor.analyzer import Analyzer
+from processor.batch_scorer import BatchScorer
+
+GOLDEN_PATH = "fixtures/golden_corpus.json"
+
+def verify():
+    with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+        texts = [doc['text'] for doc in json.load(f)]
+
+    analyzer = Analyzer()
+    print(f"Batch scoring {len(texts)} documents...")
+
+    # 1. Batch results must match the per-document scorer exactly
+    batch_results = analyzer.analyze_batch(texts)
+    mismatches = 0
+    for n, text in enumerate(texts):
+        expected = analyzer._calculate_score(text)
+        if batch_results[n] != expected:
+            mismatches += 1
+            print(f"FAIL doc {n}: {batch_results[n]['likelihood_score']} vs {expected['likelihood_score']}")
+
+    # 2. Rescoring with new weights must match a fresh scalar pass with those weights
+    batch = BatchScorer(analyzer).prepare(texts)
+    tuned_positive = {kw: w * 1.5 for kw, w in analyzer.positive_weights.items()}
+    tuned_scores = batch.final_scores(positive_weights=tuned_positive)
+
+    analyzer.positive_weights = tuned_positive
+    for n, text in enumerate(texts):
+        expected = analyzer._calculate_score(text)['likelihood_score']
+        if round(float(tuned_scores[n]), 2) != expected:
+            mismatches += 1
+            print(f"FAIL rescored doc {n}: {tuned_scores[n]} vs {expected}")
+
+    doc_ids, keyword_ids, channels, counts = batch.matrix.counts()
+    print(f"Keyword matrix: {len(batch.matrix.doc)} matches, {len(counts)} non-zero (doc, keyword, channel) cells")
+
+    if mismatches:
+        print(f"FAIL: {mismatches} mismatches")
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,76 @@
+import sys
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.fetcher import Fetcher
+
+def verify():
+    canonicalizer = UrlCanonicalizer()
+    prn_rules = {'keep_params': []}
+
+    cases = [
+        # The scheme is what gets fetched: kept unless the site opts in to the upgrade
+        ("http://finance.yahoo.com:80/news/acme-rises-123.html", None,
+         "http://finance.yahoo.com/news/acme-rises-123.html"),
+        ("http://finance.yahoo.com/news/acme-rises-123.html", {'upgrade_http': True},
+         "https://finance.yahoo.com/news/acme-rises-123.html"),
+        ("http://example.com:443/a", None, "http://example.com:443/a"),
+        # A bad port is left for the fetch to fail on
+        ("http://x.com:99999/a", None, "http://x.com:99999/a"),
+        ("http://[::1/a", None, "http://[::1/a"),
+        ("https://finance.yahoo.com/news/acme-rises-123.html?guccounter=1&utm_source=x#comments", None,
+         "https://finance.yahoo.com/news/acme-rises-123.html"),
+        ("https://WWW.Investing.com:443/news/stock-market-news/acme%2dbeats%20estimates", None,
+         "https://www.investing.com/news/stock-market-news/acme-beats%20estimates"),
+        ("https://example.com/search?b=2&a=1&utm_campaign=z", None,
+         "https://example.com/search?a=1&b=2"),
+        ("https://www.prnewswire.com/news-releases/acme-302000000.html?tc=eml_cleartime", prn_rules,
+         "https://www.prnewswire.com/news-releases/acme-302000000.html"),
+        ("https://www.example.com/news/", {'strip_www': True, 'strip_trailing_slash': True},
+         "https://example.com/news"),
+        # Reserved escapes and bare flags name a different resource when rewritten
+        ("https://example.com/files/a%2fb%3Fc%7e?x&q=a%26b&e=", None,
+         "https://example.com/files/a%2Fb%3Fc~?e=&q=a%26b&x"),
+        ("https://example.com/s?q=caf%c3%a9+bar&r=100%", None,
+         "https://example.com/s?q=caf%C3%A9+bar&r=100%25"),
+    ]
+
+    failed = False
+    for url, rules, expected in cases:
+        result = canonicalizer.canonicalize(url, rules)
+        status = "OK" if result == expected else "FAIL"
+        failed |= status == "FAIL"
+        print(f"{status}: {url} -> {result}")
+
+    urls = [
+        "https://finance.yahoo.com/news/a.html",
+        "http://finance.yahoo.com/news/a.html?guccounter=2",
+        "https://finance.yahoo.com/news/a.html",
+        "https://finance.yahoo.com/news/b.html",
+    ]
+    unique = canonicalizer.dedupe(urls)
+    ok = (unique == ["https://finance.yahoo.com/news/a.html", "https://finance.yahoo.com/news/b.html"]
+          and canonicalizer.duplicates_dropped == 2 and canonicalizer.variants_merged == 1)
+    failed |= not ok
+    print(f"{'OK' if ok else 'FAIL'}: dedupe kept {len(unique)} of {len(urls)} "
+          f"({canonicalizer.variants_merged} variants merged)")
+    # One bad href does not break the listing it came from
+    unique = canonicalizer.dedupe(["https://x.com:99999/a", "https://x.com/c"])
+    ok = unique == ["https://x.com:99999/a", "https://x.com/c"]
+    failed |= not ok
+    print(f"{'OK' if ok else 'FAIL'}: bad port kept as listed")
+    # Already seen this run: a second site linking the same article gets nothing
+    ok = canonicalizer.dedupe(["https://finance.yahoo.com/news/b.html#x"]) == []
+    failed |= not ok
+    print(f"{'OK' if ok else 'FAIL'}: cross-site duplicate dropped")
+
+    # The fetcher sends what the canonicalizer produced, reserved escapes included
+    cleaned = Fetcher._clean_url("https://example.com/files/a%2Fb%7e?q=a%26b#top")
+    ok = cleaned == "https://example.com/files/a%2Fb~?q=a%26b"
+    failed |= not ok
+    print(f"{'OK' if ok else 'FAIL'}: fetched as {cleaned}")
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
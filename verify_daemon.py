@@ -0,0 +1,130 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from pipeline.context import RunContext
+from pipeline.daemon import Daemon
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+WORDS = "market quarter revenue shares board growth product launch demand region price deal".split()
+ARTICLE = """<html><body><h1>{title}</h1>
+<p>{company} (NASDAQ: {ticker}) announced record revenue and raised its full-year guidance after
+strong demand. The company reported a breakthrough approval and an expanded partnership, and
+analysts upgraded the shares following the quarter beat. Management said growth accelerated
+in every region and the board approved a new buyback. Shares rose sharply in early trading.</p>
+<p>{filler}</p></body></html>"""
+
+# Articles published so far per host; the test adds to it between cycles
+PUBLISHED = {}
+FACTORY_CALLS = []
+
+class NewsFetcher:
+    """Listing shows everything published so far on the host."""
+
+    def __init__(self):
+        FACTORY_CALLS.append(self)
+        self.cache_hits = 0
+        self.cache_clears = 0
+
+    def clear_cache(self):
+        self.cache_clears += 1
+
+    def fetch(self, url):
+        host = url.split('/')[2]
+        if url.endswith('/list'):
+            links = "".join(f'<a href="https://{host}/news/{n}">x</a>' for n in range(PUBLISHED.get(host, 0)))
+            return f"<html><body>{links}</body></html>"
+        n = int(url.rsplit('/', 1)[1])
+        filler = " ".join(random.Random(url).choice(WORDS) for _ in range(300))
+        return ARTICLE.format(title=f"{host} story {n}", company=f"Acme{n}", ticker=f"AC{n}", filler=filler)
+
+def site(name, poll_seconds):
+    return {'name': name, 'type': 'page', 'url': f"https://{name}.example.com/list",
+            'include_filters': ["/news/"], 'poll_seconds': poll_seconds}
+
+def make_daemon(tmp_dir, ctx, notify):
+    config = {'sites': [site("fast", 0.2), site("slow", 0.6)], 'site_workers': 2}
+    return Daemon(ctx, config, notify, checkpoint_path=os.path.join(tmp_dir, "checkpoint.json"),
+                  schedule_state_path=os.path.join(tmp_dir, "schedule.json"),
+                  history_path=os.path.join(tmp_dir, "history.jsonl"))
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+        ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                         NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=NewsFetcher)
+        alerts = []
+        daemon = make_daemon(tmp_dir, ctx, notify=lambda insights: alerts.append([i['source_url'] for i in insights]))
+
+        PUBLISHED.update({"fast.example.com": 2, "slow.example.com": 1})
+        daemon.run(max_cycles=1)
+        first = sorted(alerts[-1])
+        check(f"first cycle alerts on everything published ({len(first)})", len(first) == 3)
+
+        # New articles appear; each is alerted once, in the cycle after it appears
+        PUBLISHED["fast.example.com"] = 3
+        started = time.time()
+        daemon.run(max_cycles=2)
+        check("fast site polled again within its interval", time.time() - started < 0.5)
+        check(f"only the new article alerted ({alerts[-1]})", alerts[-1] == ["https://fast.example.com/news/2"])
+
+        polls = {name: t for name, t in daemon.last_polled.items()}
+        check("slow site not polled as often", polls["slow"] < polls["fast"])
+        check("one warm fetcher per site", len(FACTORY_CALLS) == 2)
+        check("fetch caches cleared every cycle", all(f.cache_clears >= 1 for f in FACTORY_CALLS))
+
+        # Crash while sending: the alerts stay in the checkpoint and are sent on restart
+        PUBLISHED["slow.example.com"] = 2
+        def crash(insights):
+            raise SystemExit("process killed mid-send")
+        daemon.notify = crash
+        time.sleep(0.6)
+        try:
+            daemon.run(max_cycles=3)
+        except SystemExit:
+            pass
+        check("pending alert checkpointed", daemon.pending_alerts and
+              daemon.pending_alerts[0]['source_url'] == "https://slow.example.com/news/1")
+
+        resent = []
+        restarted = make_daemon(tmp_dir, ctx, notify=lambda insights: resent.extend(i['source_url'] for i in insights))
+        check("restart resumes the polling schedule", restarted.last_polled == daemon.last_polled)
+        restarted.stop()
+        restarted.run()
+        check(f"restart sends the interrupted alert ({resent})", resent == ["https://slow.example.com/news/1"])
+        check("checkpoint cleared after sending", not make_daemon(tmp_dir, ctx, notify=None).pending_alerts)
+        ctx.state_manager.flush()
+
+        # A long-lived process still expires old state: once a day, at the start of a cycle
+        ctx.near_duplicates.flush()
+        seen_urls = [f"https://fast.example.com/news/{n}" for n in range(3)]
+        with ctx.near_duplicates.conn:
+            ctx.near_duplicates.conn.execute("UPDATE fingerprints SET added_at = added_at - 8 * 86400")
+        with ctx.state_manager.store.conn:
+            ctx.state_manager.store.conn.execute("UPDATE processed_urls SET processed_at = processed_at - 31 * 86400")
+        ctx.start_cycle()
+        check("retention not applied again within a day", ctx.near_duplicates.buckets
+              and not ctx.state_manager.filter_unprocessed(seen_urls))
+        ctx.retention_applied_at -= 86400
+        ctx.start_cycle()
+        count = ctx.near_duplicates.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        check("expired fingerprints dropped from the index and memory", count == 0 and not ctx.near_duplicates.buckets)
+        check("expired processed URLs compacted", ctx.state_manager.filter_unprocessed(seen_urls) == seen_urls)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import boto3
+from moto import mock_aws
+import storage.state_manager as state_manager_module
+from storage.state_manager import BLOOM_DIRTY_KEY, BLOOM_ITEM_KEY, StateManager
+
+# Requires moto (pip install moto); no AWS account or network access needed
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+TABLE_NAME = "ProcessedUrlsTest"
+
+class CountingResource:
+    """Wraps the DynamoDB resource to count batch calls and inject unprocessed responses."""
+
+    def __init__(self, resource, drop_first_write=0):
+        self.resource = resource
+        self.drop_first_write = drop_first_write
+        self.calls = {'batch_get_item': 0, 'batch_write_item': 0}
+
+    def batch_get_item(self, **kwargs):
+        self.calls['batch_get_item'] += 1
+        return self.resource.batch_get_item(**kwargs)
+
+    def batch_write_item(self, **kwargs):
+        self.calls['batch_write_item'] += 1
+        requests = kwargs['RequestItems'][TABLE_NAME]
+        # Simulate throttling: hand the tail of the first batch back as unprocessed
+        if self.drop_first_write:
+            kept, dropped = requests[:-self.drop_first_write], requests[-self.drop_first_write:]
+            self.drop_first_write = 0
+            self.resource.batch_write_item(RequestItems={TABLE_NAME: kept})
+            return {'UnprocessedItems': {TABLE_NAME: dropped}}
+        return self.resource.batch_write_item(**kwargs)
+
+@mock_aws
+def verify():
+    failed = False
+
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    boto3.client('dynamodb', region_name='us-east-1').create_table(
+        TableName=TABLE_NAME,
+        AttributeDefinitions=[{'AttributeName': 'url_hash', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'url_hash', 'KeyType': 'HASH'}],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5},
+    )
+
+    manager = StateManager(table_name=TABLE_NAME)
+    manager.dynamodb = CountingResource(manager.dynamodb, drop_first_write=5)
+
+    urls = [f"https://example.com/news/{i}" for i in range(120)]
+    for url in urls[:60]:
+        manager.mark_processed(url)
+    check("marks buffered until batch size", len(manager.pending) == 10)
+    manager.flush()
+    check("flush empties buffer", not manager.pending)
+    # 60 items -> 3 batches of 25/25/10, plus one resend of the throttled tail
+    check("BatchWriteItem with unprocessed retry", manager.dynamodb.calls['batch_write_item'] == 4)
+
+    unprocessed = manager.filter_unprocessed(urls + urls[:10])
+    check("filter_unprocessed drops processed and repeated URLs", unprocessed == urls[60:])
+    # Only the 60 keys the Bloom filter may have seen are looked up: one request
+    check("one BatchGetItem for maybe-seen keys", manager.dynamodb.calls['batch_get_item'] == 1)
+
+    check("is_processed", manager.is_processed(urls[0]) and not manager.is_processed(urls[-1]))
+    manager.mark_processed(urls[-1])
+    check("buffered mark counts as processed", manager.is_processed(urls[-1]))
+
+    manager.flush()
+    table = boto3.resource('dynamodb', region_name='us-east-1').Table(TABLE_NAME)
+    stored = [i for i in table.scan()['Items'] if not i['url_hash'].startswith('__')]
+    expires = [int(i['expires_at']) for i in stored]
+    check("all items stored", len(stored) == 61)
+    check("numeric TTL attribute ~30 days out",
+          all(abs(e - (time.time() + 30 * 86400)) < 120 for e in expires))
+
+    # The saved Bloom filter answers new URLs without touching the table
+    def dirty_runs():
+        marker = table.get_item(Key={'url_hash': BLOOM_DIRTY_KEY}).get('Item', {})
+        return sorted(name for name in marker if name.startswith('run_'))
+
+    check("Bloom filter saved, dirty marker cleared",
+          'Item' in table.get_item(Key={'url_hash': BLOOM_ITEM_KEY}) and dirty_runs() == [])
+    reloaded = StateManager(table_name=TABLE_NAME)
+    reloaded.dynamodb = CountingResource(reloaded.dynamodb)
+    fresh = [f"https://example.com/fresh/{i}" for i in range(200)]
+    check("new URLs skip BatchGetItem", reloaded.filter_unprocessed(fresh) == fresh
+          and reloaded.dynamodb.calls['batch_get_item'] <= 1)
+    check("processed URLs still confirmed", reloaded.filter_unprocessed(urls[:60]) == [])
+    print(reloaded.bloom_report())
+
+    def backdate(run_attr, seconds):
+        table.update_item(Key={'url_hash': BLOOM_DIRTY_KEY}, UpdateExpression='SET #r = :s',
+                          ExpressionAttributeNames={'#r': run_attr},
+                          ExpressionAttributeValues={':s': int((time.time() - seconds) * 1000)})
+
+    # A run still writing does not force a Scan; one that died before saving the filter does
+    reloaded.mark_processed("https://example.com/crashed")
+    reloaded._flush_dynamodb()
+    concurrent = StateManager(table_name=TABLE_NAME)
+    # A rebuild leaves the filter to be saved; a loaded snapshot does not
+    check("live writer: snapshot loaded without a Scan", not concurrent.bloom_dirty)
+    backdate(reloaded.bloom_run_attr, 3600)
+    recovered = StateManager(table_name=TABLE_NAME)
+    check("filter rebuilt after unsaved run", recovered.bloom_dirty and recovered.is_processed("https://example.com/crashed"))
+
+    # Two concurrent runs: one saving does not clear the other's entry in the marker
+    recovered.flush()
+    check("the rebuild's Scan cleared the dead run's entry", dirty_runs() == [])
+    run_a, run_b = StateManager(table_name=TABLE_NAME), StateManager(table_name=TABLE_NAME)
+    run_a.mark_processed("https://example.com/run-a")
+    run_b.mark_processed("https://example.com/run-b")
+    run_a._flush_dynamodb()
+    run_b._flush_dynamodb()
+    run_a.flush()
+    check("saving clears only the saver's entry", dirty_runs() == [run_b.bloom_run_attr])
+    # Run B dies without saving: once its entry is past the timeout the next run learns about its URL
+    backdate(run_b.bloom_run_attr, 3600)
+    run_a.mark_processed("https://example.com/run-a-again")
+    run_a._flush_dynamodb()
+    after_crash = StateManager(table_name=TABLE_NAME)
+    check("dead run's unsaved write forces a rebuild", after_crash.is_processed("https://example.com/run-b"))
+    check("the rebuild clears the dead entry, not the live one", dirty_runs() == [run_a.bloom_run_attr])
+    run_a.flush()
+
+    # A stored filter of another size (rebuilt meanwhile) is not overwritten with ours
+    stale = StateManager(table_name=TABLE_NAME)
+    os.environ["BLOOM_CAPACITY"] = "300000"
+    bigger = StateManager(table_name=TABLE_NAME)
+    bigger.mark_processed("https://example.com/only-in-bigger")
+    bigger._flush_dynamodb()
+    bigger.bloom = bigger._rebuild_dynamodb_bloom(table.get_item(Key={'url_hash': BLOOM_ITEM_KEY})['Item'])
+    bigger.flush()
+    del os.environ["BLOOM_CAPACITY"]
+    stale.mark_processed("https://example.com/only-in-stale")
+    stale.flush()
+    final = StateManager(table_name=TABLE_NAME)
+    final.dynamodb = CountingResource(final.dynamodb)
+    check("size mismatch: rebuilt, not overwritten",
+          final.bloom.num_bits == stale.bloom.num_bits != 0
+          and all(url_hash in final.bloom for url_hash in (
+              state_manager_module.url_hash("https://example.com/only-in-bigger"),
+              state_manager_module.url_hash("https://example.com/only-in-stale"))))
+
+    # A filter bigger than one item is split over several
+    state_manager_module.BLOOM_CHUNK_BYTES = 4096
+    chunked = StateManager(table_name=TABLE_NAME)
+    chunked.mark_processed("https://example.com/chunked")
+    chunked.flush()
+    snapshot = table.get_item(Key={'url_hash': BLOOM_ITEM_KEY})['Item']
+    chunk_items = [i for i in table.scan()['Items'] if i['url_hash'].startswith(BLOOM_ITEM_KEY + "#")]
+    check(f"snapshot split into {int(snapshot['chunks'])} chunk items, old chunks deleted",
+          int(snapshot['chunks']) > 1 and len(chunk_items) == int(snapshot['chunks']))
+    reread = StateManager(table_name=TABLE_NAME)
+    check("chunked snapshot loads without a rebuild",
+          reread.bloom_version == int(snapshot['version']) and reread.is_processed("https://example.com/chunked"))
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
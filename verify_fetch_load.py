@@ -0,0 +1,79 @@
+import logging
+import sys
+from benchmark_fetch import format_results, make_fetcher, run_load
+from fake_news_server import FakeNewsServer
+from scraper.fetcher import Fetcher
+from scraper.sitemap_parser import SitemapParser
+
+HOSTS = 8
+URLS = 30
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    # Injected failures are logged as warnings by Fetcher; counted below instead
+    logging.getLogger("scraper").setLevel(logging.CRITICAL)
+
+    # Defaults for real sites are unchanged
+    fetcher = Fetcher()
+    check("real-site defaults kept (1-3 s delay, HTTPS upgrade)",
+          (fetcher.delay_min, fetcher.delay_max, fetcher.backoff_scale, fetcher.upgrade_http) == (1.0, 3.0, 1.0, True))
+
+    # Clean server: every URL discovered through the sitemap index and fetched once
+    with FakeNewsServer(hosts=HOSTS, articles=URLS, sitemap_size=10, article_bytes=2000) as server:
+        check("hosts are distinct loopback addresses",
+              len(set(server.hosts)) == HOSTS and all(h.startswith("127.") for h in server.hosts))
+        urls = SitemapParser(make_fetcher()).get_article_urls(server.sitemap_url(server.hosts[0]), 100)
+        check(f"sitemap index -> {len(urls)} article URLs", len(urls) == URLS and len(set(urls)) == URLS)
+        check("listing page served", "/news/" in (make_fetcher().fetch(server.listing_url(server.hosts[0])) or ""))
+
+        results = run_load(server, urls_per_host=URLS, concurrency=8)
+        print(format_results(results))
+        check("every URL fetched", results['urls_discovered'] == HOSTS * URLS
+              and results['urls_ok'] == HOSTS * URLS and results['urls_failed'] == 0)
+        stats = results['server']
+        check("all 200, no retries", set(stats['status_counts']) == {200} and stats['retries'] == 0)
+        # Per host: sitemap index and 3 sitemaps for discovery, then the home page (priming) and the articles
+        check(f"requests as expected ({stats['requests']})", stats['requests'] == HOSTS * (1 + 3 + 1 + URLS))
+        check("throughput and latency reported", results['urls_per_second'] and results['p95_ms_per_url'] is not None)
+
+    # Injected 403/500/503: retried by Fetcher, and what it gives up on is accounted for
+    errors = {403: 0.1, 500: 0.1, 503: 0.1}
+    with FakeNewsServer(hosts=HOSTS, articles=URLS, error_rates=errors, retry_after=0, article_bytes=2000) as server:
+        results = run_load(server, urls_per_host=URLS, concurrency=8)
+        stats = results['server']
+        print(format_results(results))
+        check("errors injected", all(stats['status_counts'].get(status) for status in errors))
+        check(f"failures retried ({stats['retries']} retries)", stats['retries'] > 0)
+        check("every discovered URL either fetched or failed",
+              results['urls_ok'] + results['urls_failed'] == results['urls_discovered'])
+        check("most URLs recovered by retrying", results['urls_ok'] >= 0.9 * results['urls_discovered'])
+        gave_up = sum(count for status, count in stats['final_errors'].items())
+        check(f"URLs given up on left with an error status ({stats['final_errors']})",
+              gave_up >= results['urls_failed'] and not set(stats['final_errors']) - set(errors))
+
+        # Same seed, same injected errors
+        again = run_load(server, urls_per_host=URLS, concurrency=8)
+        check("injection is repeatable", again['server']['status_counts'] == stats['status_counts'])
+
+    # Per-host connection limit: excess connections get 429 + Retry-After, and retrying after it gets through
+    # once the kept-alive connections holding the slots are done
+    with FakeNewsServer(hosts=2, articles=40, latency=0.01, max_connections=2, retry_after=1,
+                        article_bytes=2000) as server:
+        results = run_load(server, urls_per_host=40, concurrency=8, fetchers_per_host=4)
+        stats = results['server']
+        print(format_results(results))
+        check(f"connections over the limit rejected ({stats['rejected_connections']})",
+              stats['rejected_connections'] > 0 and stats['status_counts'].get(429))
+        check("rejected requests retried after Retry-After", results['urls_ok'] == results['urls_discovered'] == 80)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
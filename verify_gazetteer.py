@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+from processor.analyzer import Analyzer
+from processor.gazetteer import Gazetteer
+
+SYMBOLS_CSV = """symbol,exchange,name
+ACME,NYSE,Acme Corp
+BETA,NASDAQ,Beta Therapeutics Inc.
+GLWD,NASDAQ,Global Widgets Holdings Ltd
+TGT,NYSE,Target Corp
+"""
+
+def verify():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_path = os.path.join(tmp_dir, "symbols.csv")
+        with open(source_path, 'w') as f:
+            f.write(SYMBOLS_CSV)
+
+        gazetteer = Gazetteer(source_path)
+        assert gazetteer.load()
+        assert os.path.exists(gazetteer.index_path), "Index should be prebuilt on first load"
+
+        # Second load must come from the index, third must notice the CSV changed
+        reloaded = Gazetteer(source_path)
+        assert reloaded.load() and reloaded.lookup("ACME") == ("NYSE", "Acme Corp")
+        with open(source_path, 'a') as f:
+            f.write("ZETA,NYSE,Zeta Systems Inc\n")
+        rebuilt = Gazetteer(source_path)
+        rebuilt.load()
+        assert rebuilt.lookup("ZETA") == ("NYSE", "Zeta Systems Inc"), "Stale index was not rebuilt"
+
+        analyzer = Analyzer()
+        analyzer.gazetteer = rebuilt
+
+        cases = [
+            # Acronym in parentheses is no longer taken as a ticker
+            ("The Chief Executive Officer (CEO) said growth was strong.", None, None),
+            # Known symbol in parentheses is accepted, exchange comes from the master
+            ("Beta Therapeutics (BETA) reports Strong demand.", "BETA", "NASDAQ"),
+            # Explicit exchange ticker not in the master is rejected for a covered exchange
+            ("Foo Corp (NYSE: FOOX) reports growth.", None, None),
+            # Acronym skipped, later real ticker found
+            ("The FDA (FDA) cleared it; Acme Corp (ACME) rose.", "ACME", "NYSE"),
+            # No ticker at all: resolved from the company name
+            ("Global Widgets Holdings announced record high sales.", "GLWD", "NASDAQ"),
+            # One-word names need a corporate suffix to count
+            ("Analysts raised the price Target on shares.", None, None),
+            ("Target Corp. raised guidance.", "TGT", "NYSE"),
+        ]
+
+        failed = False
+        for text, ticker, exchange in cases:
+            result = analyzer._calculate_score(text)
+            status = "OK" if (result['ticker'], result['exchange']) == (ticker, exchange) else "FAIL"
+            failed |= status == "FAIL"
+            print(f"{status}: {text[:50]!r} -> {result['ticker']} / {result['exchange']} / {result['company']}")
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,46 @@
+import json
+import sys
+from processor.analyzer import Analyzer
+
+GOLDEN_PATH = "fixtures/golden_corpus.json"
+FIELDS = ['likelihood_score', 'sentiment_score', 'positive_matches', 'negative_matches',
+          'match_details', 'snippet', 'ticker', 'exchange', 'company']
+
+def verify(update=False):
+    with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    analyzer = Analyzer()
+    # Golden tickers reflect the regex heuristics, not whatever symbol master is installed
+    analyzer.gazetteer = None
+    print(f"Scoring {len(corpus)} golden documents...")
+
+    failures = 0
+    for n, doc in enumerate(corpus):
+        result = analyzer._calculate_score(doc['text'])
+        actual = {field: result[field] for field in FIELDS}
+
+        if update:
+            doc['expected'] = actual
+            continue
+
+        for field in FIELDS:
+            if actual[field] != doc['expected'][field]:
+                failures += 1
+                print(f"FAIL doc {n} field '{field}': expected {doc['expected'][field]!r}, got {actual[field]!r}")
+
+    if update:
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(corpus, f, indent=1)
+        print(f"Updated expected scores in {GOLDEN_PATH}")
+        return
+
+    if failures:
+        print(f"FAIL: {failures} mismatches against the golden corpus")
+        sys.exit(1)
+
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    # Only pass --update after an intentional scoring change
+    verify(update='--update' in sys.argv)
@@ -0,0 +1,127 @@
+import datetime
+import os
+import sys
+import tempfile
+from dateutil import tz
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+INVESTING_URL = "https://www.investing.com/news/latest-news"
+PRNEWSWIRE_LISTING = {
+    'date_regex': r'((?:[A-Za-z]{3} \d{1,2}, \d{4}, )?\d{2}:\d{2} ET)',
+    'date_formats': ["%b %d, %Y, %H:%M ET", "%H:%M ET"],
+    'timezone': "America/New_York",
+}
+STOCKWATCH_LISTING = {
+    'date_regex': r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2})',
+    'date_formats': ["%Y-%m-%d %H:%M"],
+    'timezone': "America/New_York",
+    'ticker_regex': r'U!([A-Za-z0-9.\-]+)-\d{8}',
+}
+
+def prnewswire_page(rows):
+    cards = "".join(
+        f'<div class="card"><a class="newsreleaseconsolidatelink" href="/news-releases/{slug}.html">'
+        f'<h3><small>{stamp}</small> {title}</h3></a></div>'
+        for slug, stamp, title in rows
+    )
+    return f"<html><body>{cards}<a href='/news-releases/more.html'>More</a></body></html>"
+
+def stockwatch_page(rows):
+    body = "".join(
+        f'<tr><td>{stamp}</td><td>{symbol}</td><td><a href="/News/Item/U-z{n}-U!{symbol}-{stamp[:10].replace("-", "")}/U/{symbol}">{title}</a></td></tr>'
+        for n, (stamp, symbol, title) in enumerate(rows)
+    )
+    return f"<html><body><table>{body}</table></body></html>"
+
+class ListingFetcher:
+    """Serves one listing page and counts article fetches."""
+
+    cache_hits = 0
+
+    def __init__(self, listing_html):
+        self.listing_html = listing_html
+        self.fetched = []
+
+    def fetch(self, url):
+        if url.endswith('/list'):
+            return self.listing_html
+        self.fetched.append(url)
+        return "<html><body><h1>Unrelated page title here</h1><p>Body.</p></body></html>"
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    parser = Parser()
+
+    # Investing.com: __NEXT_DATA__ newsStore items keep headline, publish time and symbols
+    with open('investing_sample.html', 'r', encoding='utf-8') as f:
+        soup = parser.parse(f.read())
+    records = parser.extract_link_records(soup, INVESTING_URL)
+    dated = [r for r in records if r['published_at']]
+    check(f"Investing records have titles and times ({len(dated)})", dated and all(r['title'] for r in dated))
+    check("Investing publish times are UTC-aware", all(r['published_at'].tzinfo for r in dated))
+    check("Investing ticker hints from related pairs", any(r['tickers'] for r in dated))
+    check("same URLs as extract_links", {r['url'] for r in records} == set(parser.extract_links(soup, INVESTING_URL)))
+    check("anchor text not used as title without listing rules",
+          all(r['title'] is None for r in records if not r['published_at']))
+
+    # PRNewswire: today's rows show only the time, older ones the full date
+    eastern = tz.gettz("America/New_York")
+    html = prnewswire_page([
+        ("acme-raises-guidance-301", "09:00 ET", "Acme Raises Full-Year Guidance"),
+        ("beta-names-new-ceo-302", "Jan 14, 2026, 18:30 ET", "Beta Names New Chief Executive"),
+    ])
+    records = parser.extract_link_records(parser.parse(html), "https://www.prnewswire.com/list", PRNEWSWIRE_LISTING)
+    by_slug = {r['url'].rsplit('/', 1)[1]: r for r in records}
+    today = by_slug['acme-raises-guidance-301.html']
+    check("PRNewswire title without the timestamp", today['title'] == "Acme Raises Full-Year Guidance")
+    check("time-only stamp is today in ET",
+          today['published_at'].date() == datetime.datetime.now(eastern).date() and today['published_at'].hour == 9)
+    check("dated stamp parsed", by_slug['beta-names-new-ceo-302.html']['published_at'] == datetime.datetime(2026, 1, 14, 18, 30, tzinfo=eastern))
+    check("short link text is not a title", by_slug['more.html']['title'] is None)
+
+    # StockWatch rows: time and symbol from the table row
+    html = stockwatch_page([("2026-03-09 16:05", "SPTY", "Spotlight Innovation Announces Private Placement")])
+    record = parser.extract_link_records(parser.parse(html), "https://www.stockwatch.com/list", STOCKWATCH_LISTING)[0]
+    check("StockWatch row time and ticker", record['published_at'].hour == 16 and record['tickers'] == ["SPTY"])
+
+    # Pipeline: stale or duplicate headlines are never fetched
+    now = datetime.datetime.now(eastern)
+    fresh, stale = now.strftime("%Y-%m-%d %H:%M"), (now - datetime.timedelta(hours=5)).strftime("%Y-%m-%d %H:%M")
+    fetcher = ListingFetcher(stockwatch_page([
+        (fresh, "AAA", "Alpha Corp Reports Record Quarter"),
+        (stale, "BBB", "Beta Corp Files Annual Report"),
+        (fresh, "CCC", "Alpha Corp Reports Record Quarter"),
+        (fresh, "DDD", "Delta Corp Wins Large Contract"),
+    ]))
+    site = {'name': "StockWatch", 'type': 'page', 'url': "https://www.stockwatch.com/list",
+            'include_filters': ["/News/Item/"], 'listing': STOCKWATCH_LISTING}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+        ctx = RunContext(parser, UrlCanonicalizer(), StateManager(), None, NearDuplicateIndex(":memory:"),
+                         thresholds=None, fetcher_factory=lambda: fetcher)
+        articles = list(ArticlePipeline(ctx).discover(site))
+        check(f"only fresh, unique headlines left to fetch ({len(articles)})",
+              [a.listing['tickers'] for a in articles] == [["AAA"], ["DDD"]])
+        check("stale and duplicate counted",
+              ctx.skip_counts['stale_listing_date'] == 1 and ctx.skip_counts['duplicate_listing_title'] == 1)
+        check("no article fetched during discovery", fetcher.fetched == [])
+        check("listed title still passes for its own article",
+              ctx.claim_title("Alpha Corp Reports Record Quarter", owner=articles[0].state_key))
+        ctx.state_manager.flush()
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
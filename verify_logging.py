@@ -0,0 +1,122 @@
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from config.log_setup import configure_logging, stop_logging
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+ARTICLES = 30
+ARTICLE = """<html><body><h1>Acme{n} raises guidance</h1>
+<p>Acme{n} (NASDAQ: AC{n}) announced record revenue and raised its full-year guidance after strong
+demand. Analysts upgraded the shares following the quarter beat and the board approved a buyback.
+Story number {n} of the day, with enough distinct words to not look like a copy: {words}.</p></body></html>"""
+
+class NewsFetcher:
+    cache_hits = 0
+
+    def fetch(self, url):
+        if url.endswith('/list'):
+            return "<html><body>" + "".join(f'<a href="https://news.example.com/a/{n}">x</a>' for n in range(ARTICLES)) + "</body></html>"
+        n = int(url.rsplit('/', 1)[1])
+        return ARTICLE.format(n=n, words=" ".join(f"w{n}x{i}" for i in range(40)))
+
+SITE = {'name': "Example", 'type': 'page', 'url': "https://news.example.com/list", 'include_filters': ["/a/"]}
+
+class SlowStream(io.StringIO):
+    """A log destination that takes 20 ms per write (a slow pipe or disk)."""
+
+    def write(self, s):
+        time.sleep(0.02)
+        return super().write(s)
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+def pipeline_log_lines(tmp_dir, level):
+    """Lines one pipeline run over ARTICLES articles logs at `level`."""
+    stream = io.StringIO()
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, f"state_{level}.db")
+    configure_logging(level, "text", stream)
+    ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                     NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=NewsFetcher)
+    ArticlePipeline(ctx).run([SITE])
+    ctx.state_manager.flush()
+    stop_logging()
+    return stream.getvalue().splitlines()
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    logger = logging.getLogger("verify_logging")
+
+    # JSON lines with the standard fields plus `extra=` fields
+    stream = io.StringIO()
+    configure_logging("INFO", "json", stream)
+    logger.info("Found %d URLs", 3, extra={'site': "Example"})
+    logger.debug("hidden %s", "detail")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    stop_logging()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    check("one JSON object per record", len(lines) == 2)
+    check("message, level, logger and extra fields",
+          lines[0]['message'] == "Found 3 URLs" and lines[0]['level'] == "INFO"
+          and lines[0]['logger'] == "verify_logging" and lines[0]['site'] == "Example" and lines[0]['time'])
+    check("exception traceback kept", "ValueError: boom" in lines[1].get('exception', ""))
+
+    # Debug arguments are never formatted when debug is off
+    configure_logging("INFO", "text", io.StringIO())
+    for _ in range(1000):
+        logger.debug("value: %s", Expensive())
+    stop_logging()
+    check("disabled debug messages not formatted", Expensive.formatted == 0)
+
+    # Writing happens on the listener thread: a slow stream does not slow the caller
+    stream = SlowStream()
+    configure_logging("INFO", "text", stream)
+    started = time.perf_counter()
+    for n in range(20):
+        logger.info("record %d", n)
+    elapsed = time.perf_counter() - started
+    stop_logging()
+    print(f"20 records to a 20 ms/write stream logged in {elapsed * 1000:.1f} ms")
+    check("logging does not wait for the stream", elapsed < 0.1)
+    check("every queued record written on stop", len(stream.getvalue().splitlines()) == 20)
+
+    # Per-URL chatter is debug; INFO keeps the per-site and run summaries
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        debug_lines = pipeline_log_lines(tmp_dir, "DEBUG")
+        info_lines = pipeline_log_lines(tmp_dir, "INFO")
+    print(f"{ARTICLES} articles: {len(debug_lines)} lines at DEBUG, {len(info_lines)} at INFO")
+    check("per-URL lines only at DEBUG", any("Processing: " in line for line in debug_lines)
+          and not any("Processing: " in line or "Fetching URL" in line for line in info_lines))
+    check("analyzer match lists only at DEBUG", any("Positive Matches" in line for line in debug_lines)
+          and not any("Positive Matches" in line for line in info_lines))
+    check("INFO volume down by 10x or more", len(info_lines) * 10 <= len(debug_lines))
+
+    logging.getLogger().handlers.clear()
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
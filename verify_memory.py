@@ -0,0 +1,123 @@
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+import bs4
+from notifier.emailer import Emailer
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from pipeline.memory import MemoryGuard, current_rss_mib
+from pipeline.report import RunReport
+from processor.analyzer import Analyzer
+from processor.insight import Insight
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+ARTICLE = """<html><body><h1>{host} story {n}</h1>
+<p>Acme{n} (NASDAQ: AC{n}) announced record revenue and raised its full-year guidance after strong
+demand. Analysts upgraded the shares following the quarter beat and the board approved a buyback.</p>
+<p>Distinct words for story {n}: {words}.</p>{padding}</body></html>"""
+# About 60 KB of markup per page around the text, like a real article page
+PADDING = "".join(f'<div class="nav"><a href="/section/{k}">Section {k}</a><span>Menu item</span></div>'
+                  for k in range(800))
+
+class NewsFetcher:
+    cache_hits = 0
+
+    def __init__(self, articles):
+        self.articles = articles
+
+    def fetch(self, url):
+        host = url.split('/')[2]
+        if url.endswith('/list'):
+            return "<html><body>" + "".join(f'<a href="https://{host}/a/{n}">x</a>' for n in range(self.articles)) + "</body></html>"
+        n = int(url.rsplit('/', 1)[1])
+        return ARTICLE.format(host=host, n=n, words=" ".join(f"{host[:3]}{n}x{i}" for i in range(300)), padding=PADDING)
+
+def site(name):
+    return {'name': name, 'type': 'page', 'url': f"https://{name.lower()}.example.com/list", 'include_filters': ["/a/"]}
+
+def run(tmp_dir, name, articles, sites_config=None, sites=("Alpha",)):
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, f"{name}.db")
+    ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                     NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=lambda: NewsFetcher(articles))
+    pipeline = ArticlePipeline(ctx, sites_config)
+    pipeline.run([site(s) for s in sites])
+    ctx.state_manager.flush()
+    return ctx, pipeline
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Soup trees are freed when extraction finishes, not at the next garbage collection
+        gc.collect()
+        gc.disable()
+        try:
+            ctx, _ = run(tmp_dir, "lifecycle", 20)
+            tags = sum(1 for obj in gc.get_objects() if isinstance(obj, bs4.element.Tag))
+        finally:
+            gc.enable()
+        print(f"{tags} soup tags alive after 20 articles with the garbage collector off")
+        check("documents freed after extraction", tags < 100)
+
+        # Compact insights: dict-like, no article text, JSON-ready
+        insights = ctx.all_insights
+        check(f"insights kept ({len(insights)})", len(insights) == 20)
+        insight = insights[0]
+        check("insights are slotted", isinstance(insight, Insight) and not hasattr(insight, '__dict__'))
+        check("article text dropped", 'full_text' not in insight and insight.get('company_text') is None)
+        check("dict-style reads", insight['likelihood_score'] == insight.get('likelihood_score')
+              and insight.get('sentiment_score', 0) is not None and insight['source_url'].startswith("https://")
+              and insight['site_name'] == "Alpha" and insight.get('missing', "x") == "x")
+        check("JSON round trip", json.loads(json.dumps(dict(insight)))['snippet'] == insight['snippet'])
+        check("email formats them", "alpha.example.com/a/" in Emailer().format_results(insights[:3], insights[3:5]))
+        ctx, _ = run(tmp_dir, "keep_text", 3, {'keep_insight_text': True})
+        check("keep_insight_text keeps the text", all(i.get('full_text') for i in ctx.all_insights))
+
+        # What a run keeps grows by an insight's worth per article, not a page's
+        retained = {}
+        for articles in (10, 60):
+            tracemalloc.start()
+            ctx, _ = run(tmp_dir, f"retained_{articles}", articles)
+            retained[articles] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        per_article = (retained[60] - retained[10]) / 50
+        print(f"Retained per extra article: {per_article / 1024:.1f} KiB "
+              f"(pages are ~{len(NewsFetcher(1).fetch('https://x/a/1')) // 1024} KiB)")
+        check("retained memory per article well under a page", per_article < 8 * 1024)
+
+        # Peak RSS per site in the run report
+        ctx, _ = run(tmp_dir, "report", 5, sites=("Alpha", "Beta"))
+        report = ctx.report.finish()
+        check("peak RSS per site", all(entry['peak_rss_mib'] and entry['peak_rss_mib'] > 0 for entry in report['sites']))
+        check("run peak RSS", report['peak_rss_mib'] and report['peak_rss_mib'] >= max(e['peak_rss_mib'] for e in report['sites']))
+        check("summary shows it", "peak RSS" in RunReport.summary(report))
+
+        # Over the cap: nothing more is fetched, nothing is marked processed
+        rss = current_rss_mib()
+        check(f"RSS measured ({rss:.0f} MiB)", rss and rss > 0)
+        ctx, pipeline = run(tmp_dir, "capped", 10, {'max_memory_mb': 1})
+        alpha = ctx.report.finish()['sites'][0]
+        check("cap trips", pipeline.memory_guard.tripped)
+        check("articles over the cap skipped", alpha['fetched'] == 0 and alpha['skipped'].get('memory_cap') == 10)
+        check("skipped articles left for the next run",
+              len(ctx.state_manager.filter_unprocessed([f"https://alpha.example.com/a/{n}" for n in range(10)])) == 10)
+        check("no cap by default off Lambda", MemoryGuard(None).over_cap() is False
+              or os.getenv("MAX_MEMORY_MB") or os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE"))
+        check("generous cap not reached", not MemoryGuard(rss * 4).over_cap())
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,65 @@
+import json
+import os
+import random
+import sys
+import tempfile
+from storage.near_duplicates import NearDuplicateIndex, hamming_distance, simhash
+
+def load_articles():
+    with open("fixtures/golden_corpus.json", 'r') as f:
+        corpus = json.load(f)
+    return [doc['text'] for doc in corpus if len(doc['text'].split()) >= 100]
+
+def reword(text, edits, rng):
+    words = text.split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(["company", "announced", "said", "results", "shares"])
+    return " ".join(words)
+
+def verify():
+    rng = random.Random(7)
+    articles = load_articles()
+    failed = False
+
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "near_duplicates.db")
+        index = NearDuplicateIndex(path, max_distance=6)
+        for n, text in enumerate(articles):
+            index.check(text, f"https://example.com/original/{n}")
+        # Distinct articles must not collide (the corpus holds one exact repeat)
+        check(f"distinct articles kept ({index.dropped} dropped)", index.dropped <= 1)
+        index.flush()
+
+        # A later run sees reworded copies of earlier articles
+        reopened = NearDuplicateIndex(path, max_distance=6)
+        caught = sum(
+            reopened.check(reword(text, 3, rng), f"https://example.com/copy/{n}") is not None
+            for n, text in enumerate(articles)
+        )
+        check(f"reworded copies caught across runs: {caught}/{len(articles)}", caught >= 0.8 * len(articles))
+
+        # Banding finds every pair within max_distance that a linear scan finds
+        fingerprints = [rng.getrandbits(64) for _ in range(2000)]
+        banded = NearDuplicateIndex(":memory:", max_distance=6)
+        for n, fingerprint in enumerate(fingerprints):
+            banded.add(fingerprint, str(n))
+        probes = [f ^ sum(1 << b for b in rng.sample(range(64), rng.randint(0, 6))) for f in fingerprints[:300]]
+        misses = sum(banded.find(p) is None for p in probes)
+        check(f"banded lookup misses no pair within distance ({misses} misses)", misses == 0)
+        far = fingerprints[0] ^ ((1 << 20) - 1)
+        check("far fingerprint not matched", banded.find(far) is None
+              or hamming_distance(far, fingerprints[int(banded.find(far))]) <= 6)
+
+    check("short text is not fingerprinted", simhash("Acme shares rose today.") is None)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
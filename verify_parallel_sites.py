@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import random
+import time
+from pipeline.context import RunContext
+from pipeline.article_pipeline import ArticlePipeline
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+FETCH_SECONDS = 0.1
+ARTICLES_PER_SITE = 8
+WORDS = "market quarter revenue shares board growth product launch demand region price deal".split()
+
+ARTICLE = """<html><body><h1>{title}</h1>
+<p>{company} (NASDAQ: {ticker}) announced record revenue and raised its full-year guidance after
+strong demand. The company reported a breakthrough approval and an expanded partnership, and
+analysts upgraded the shares following the {n} quarter beat. Management said growth accelerated
+in every region and the board approved a new buyback. Shares rose sharply in early trading.</p>
+<p>{filler}</p></body></html>"""
+
+class FakeFetcher:
+    """Serves listing and article pages for example sites with a fixed latency."""
+
+    cache_hits = 0
+
+    def fetch(self, url):
+        time.sleep(FETCH_SECONDS)
+        host = url.split('/')[2]
+        if url.endswith('/list'):
+            links = "".join(f'<a href="https://{host}/news/{n}">x</a>' for n in range(ARTICLES_PER_SITE))
+            return f"<html><body>{links}</body></html>"
+        n = int(url.rsplit('/', 1)[1])
+        # Every site carries article 0 under the same title: only one may survive
+        title = "Shared wire story" if n == 0 else f"{host} story {n}"
+        # Distinct bodies, so the near-duplicate index leaves them alone
+        rng = random.Random(f"{host}/{n}")
+        filler = " ".join(rng.choice(WORDS) for _ in range(300))
+        return ARTICLE.format(title=title, company=f"Acme{n}", ticker=f"AC{n}", n=n, filler=filler)
+
+def make_context(tmp_dir):
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+    return RunContext(
+        Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+        NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=FakeFetcher,
+    )
+
+def run(sites, workers):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ctx = make_context(tmp_dir)
+        started = time.perf_counter()
+        ArticlePipeline(ctx, {'site_workers': workers}).build().run(sites)
+        elapsed = time.perf_counter() - started
+        ctx.state_manager.flush()
+        return elapsed, ctx
+
+def verify():
+    sites = [
+        {'name': f"Site {s}", 'type': 'page', 'url': f"https://site{s}.example.com/list",
+         'include_filters': ["/news/"], 'max_urls': ARTICLES_PER_SITE, 'min_chars': 0}
+        for s in range(4)
+    ]
+    # One site after another: every listing and article fetch in turn
+    sequential = len(sites) * (ARTICLES_PER_SITE + 1) * FETCH_SECONDS
+    one_worker, seq_ctx = run(sites, workers=1)
+    parallel, par_ctx = run(sites, workers=4)
+    print(f"Sequential fetches: {sequential:.2f}s, one discovery worker: {one_worker:.2f}s, four: {parallel:.2f}s")
+
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    check("parallel run approaches the slowest site", parallel < sequential / 2.5)
+    check(f"same insights either way ({len(par_ctx.all_insights)})",
+          seq_ctx.all_insights and len(seq_ctx.all_insights) == len(par_ctx.all_insights))
+    shared = [i for i in par_ctx.all_insights if "Shared wire story" in i['snippet']]
+    check("duplicate title across sites kept once", len(shared) == 1)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+from pipeline.stages import Stage, Pipeline
+
+QUEUE_SIZE = 4
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    # Fast producer, slow consumer: the queue must stay bounded
+    produced = []
+    in_flight = []
+    lock = threading.Lock()
+    peak = [0]
+
+    def produce(n):
+        for i in range(n):
+            with lock:
+                produced.append(i)
+                in_flight.append(i)
+                peak[0] = max(peak[0], len(in_flight))
+            yield i
+
+    def consume(i):
+        time.sleep(0.005)
+        with lock:
+            in_flight.remove(i)
+        if i % 2 == 0:
+            yield i
+
+    results = []
+    sink = Stage('sink', lambda i: results.append(i), queue_size=QUEUE_SIZE)
+    slow = Stage('slow', consume, workers=2, queue_size=QUEUE_SIZE)
+    pipeline = Pipeline([Stage('produce', produce, queue_size=QUEUE_SIZE), slow, sink])
+    pipeline.run([200])
+
+    check(f"all items delivered ({len(results)})", sorted(results) == list(range(0, 200, 2)))
+    # Queue + one item per worker being handled + the one the producer is putting
+    check(f"backpressure bounds items in flight (peak {peak[0]})", peak[0] <= QUEUE_SIZE + 2 + 1)
+    stats = {row['stage']: row for row in pipeline.stats()}
+    check("stats count items in/out", stats['slow']['received'] == 200 and stats['slow']['emitted'] == 100)
+    check("queue depth recorded", 0 < stats['slow']['max_queue_depth'] <= QUEUE_SIZE)
+    check("producer time blocked on the slow stage", stats['produce']['blocked_seconds'] > stats['produce']['busy_seconds'])
+
+    # Lanes: a slow lane must not hold up a fast one
+    finished = {}
+    def fetch(item):
+        lane, _ = item
+        time.sleep(0.05 if lane == 'slow' else 0.001)
+        finished[lane] = time.perf_counter()
+        return ()
+    def discover(lane):
+        for n in range(10):
+            yield lane, n
+    lanes = Stage('fetch', fetch, queue_size=QUEUE_SIZE, lane_key=lambda item: item[0])
+    started = time.perf_counter()
+    Pipeline([Stage('discover', discover, workers=2), lanes]).run(['slow', 'fast'])
+    check("fast lane finishes long before the slow one",
+          finished['fast'] - started < (finished['slow'] - started) / 3)
+    check("one worker per lane", lanes.stats.as_dict()['workers'] == 2)
+
+    # Errors in a handler are counted, the item dropped and the pipeline drains
+    def flaky(i):
+        if i == 3:
+            raise ValueError("bad item")
+        yield i
+    out = []
+    flaky_stage = Stage('flaky', flaky)
+    Pipeline([flaky_stage, Stage('sink', lambda i: out.append(i))]).run(range(6))
+    check("handler errors counted and skipped", flaky_stage.stats.errors == 1 and sorted(out) == [0, 1, 2, 4, 5])
+
+    # Nothing to do still terminates
+    empty = Pipeline([Stage('a', lambda i: [i]), Stage('b', lambda i: [i], lane_key=str)])
+    empty.run([])
+    check("empty input drains", all(stage.done.is_set() for stage in empty.stages))
+
+    print(pipeline.report())
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
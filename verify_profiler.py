@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import tracemalloc
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from pipeline.profiler import StageProfiler
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+ARTICLES = 12
+ARTICLE = """<html><body><h1>{host} story {n}</h1>
+<p>Acme{n} (NASDAQ: AC{n}) announced record revenue and raised its full-year guidance after strong
+demand. Analysts upgraded the shares following the quarter beat and the board approved a buyback.
+Distinct words for story {n}: {words}.</p></body></html>"""
+
+class NewsFetcher:
+    cache_hits = 0
+
+    def fetch(self, url):
+        host = url.split('/')[2]
+        if url.endswith('/list'):
+            return "<html><body>" + "".join(f'<a href="https://{host}/a/{n}">x</a>' for n in range(ARTICLES)) + "</body></html>"
+        n = int(url.rsplit('/', 1)[1])
+        return ARTICLE.format(host=host, n=n, words=" ".join(f"{host[:3]}{n}x{i}" for i in range(300)))
+
+def site(name):
+    return {'name': name, 'type': 'page', 'url': f"https://{name.lower()}.example.com/list", 'include_filters': ["/a/"]}
+
+def make_context(tmp_dir, name):
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, f"{name}.db")
+    return RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                      NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=NewsFetcher)
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Off: handlers are not wrapped and nothing is traced
+        ctx = make_context(tmp_dir, "off")
+        stages = ArticlePipeline(ctx).build().stages
+        check("no profiling wrappers when off", not any("profiled" in s.handler.__qualname__ for s in stages))
+        check("tracemalloc off", not tracemalloc.is_tracing())
+
+        ctx = make_context(tmp_dir, "on")
+        profiler = StageProfiler(output_dir=os.path.join(tmp_dir, "profile"), sample_interval=0.001).start()
+        ArticlePipeline(ctx, profiler=profiler).run([site("Alpha"), site("Beta")])
+        with profiler.section('notify'):
+            sorted(str(i) for i in range(20000))
+        profiler.stop()
+        ctx.state_manager.flush()
+        print(profiler.report())
+
+        summary = profiler.summary()
+        alpha = summary['sites'].get('Alpha', {}).get('stages', {})
+        check(f"per-site stage profiles ({sorted(alpha)})",
+              all(stage in alpha for stage in ('discover', 'fetch', 'parse', 'extract', 'analyze', 'aggregate'))
+              and 'Beta' in summary['sites'])
+        check("every item sampled by default", alpha.get('fetch', {}).get('sampled') == ARTICLES)
+        check("memory peak per stage", alpha.get('parse', {}).get('peak_kib', 0) > 0)
+        check("notify section profiled", 'notify' in summary['sites'].get('run', {}).get('stages', {}))
+        functions = {func for (_, _, func) in profiler.stats['Alpha'].stats}
+        check("analyzer work attributed to the site", '_calculate_score' in functions)
+        check("top-N hotspots", 0 < len(summary['sites']['Alpha']['hotspots']) <= profiler.top_n)
+        check("tracemalloc stopped and top allocations kept", not tracemalloc.is_tracing() and summary['top_allocations'])
+        check("sampler thread stopped", not any(t.name == "profiler-sampler" for t in threading.enumerate()))
+
+        path = profiler.write()
+        check("profile files written", path and all(
+            os.path.exists(os.path.join(path, name))
+            for name in ("stacks.folded", "Alpha.pstats", "Beta.pstats", "hotspots.txt", "summary.json")))
+        with open(os.path.join(path, "stacks.folded")) as f:
+            stacks = f.read().splitlines()
+        check(f"collapsed stacks for flamegraphs ({len(stacks)} stacks)",
+              stacks and all(re.fullmatch(r"[^ ]+(;[^;]+)+ \d+", line) for line in stacks)
+              and any(line.startswith(("Alpha;", "Beta;")) for line in stacks))
+        with open(os.path.join(path, "summary.json")) as f:
+            check("summary is JSON", json.load(f)['sites'].keys() == summary['sites'].keys())
+
+        # Sampling: every third item per stage
+        ctx = make_context(tmp_dir, "sampled")
+        profiler = StageProfiler(output_dir=None, sample_every=3).start()
+        ArticlePipeline(ctx, profiler=profiler).run([site("Gamma")])
+        profiler.stop()
+        ctx.state_manager.flush()
+        fetched = profiler.summary()['sites']['Gamma']['stages']['fetch']['sampled']
+        check(f"sample_every=3 profiles a third of the items ({fetched})", fetched == ARTICLES // 3)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
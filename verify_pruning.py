@@ -0,0 +1,40 @@
+import json
+import sys
+import yaml
+from processor.analyzer import Analyzer
+from main import get_alert_thresholds
+
+GOLDEN_PATH = "fixtures/golden_corpus.json"
+
+def passes(insight, t):
+    positive = insight['likelihood_score'] >= t['email_min_score'] and insight['sentiment_score'] >= t['email_min_sentiment']
+    negative = insight['likelihood_score'] <= t['email_max_negative_score'] and insight['sentiment_score'] <= t['email_max_negative_sentiment']
+    return positive or negative
+
+def verify():
+    with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+        texts = [doc['text'] for doc in json.load(f)]
+    with open('config/sites.yaml', 'r') as f:
+        thresholds = get_alert_thresholds(yaml.safe_load(f))
+
+    full = Analyzer()
+    pruning = Analyzer(thresholds=thresholds)
+
+    expected = sorted(r['snippet'] for r in full.analyze(texts) if passes(r, thresholds))
+    kept = pruning.analyze(texts)
+    actual = sorted(r['snippet'] for r in kept if passes(r, thresholds))
+
+    print(f"Thresholds: {thresholds}")
+    print(f"Pruned {pruning.pruned_count} of {pruning.scored_count} documents before VADER")
+    print(f"Alerts without pruning: {len(expected)}, with pruning: {len(actual)}")
+
+    if expected != actual:
+        print("FAIL: pruning changed which documents produce alerts")
+        sys.exit(1)
+    if pruning.scored_count != len(texts):
+        print("FAIL: not every document was counted")
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,91 @@
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from pipeline.report import RunReport
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+WORDS = "market quarter revenue shares board growth product launch demand region price deal".split()
+BODY = """(NASDAQ: ACME) announced record revenue and raised its full-year guidance after strong demand.
+Analysts upgraded the shares following the quarter beat and the board approved a new buyback. """
+
+def page(title, body, extra=""):
+    return f"<html><body><h1>{title}</h1>{extra}<p>{body}</p></body></html>"
+
+def filler(seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(300))
+
+OLD = (datetime.datetime.now() - datetime.timedelta(hours=5)).strftime("%Y-%m-%d %H:%M")
+PAGES = {
+    'fresh': page("Acme raises guidance", BODY + filler(1)),
+    'paywall': page("Locked story", BODY + filler(2), extra='<div class="paywall-banner">Subscribe</div>'),
+    'short': page("Brief item", "Too short."),
+    'old': page("Old news", f"Posted {OLD} ET. " + BODY + filler(3)),
+    'copy': page("Acme raises guidance", BODY + filler(4)),
+    'missing': None,
+}
+
+class ReportFetcher:
+    cache_hits = 0
+
+    def fetch(self, url):
+        if url.endswith('/list'):
+            return "<html><body>" + "".join(f'<a href="https://news.example.com/a/{key}">x</a>' for key in PAGES) + "</body></html>"
+        return PAGES[url.rsplit('/', 1)[1]]
+
+SITE = {
+    'name': "Example", 'type': 'page', 'url': "https://news.example.com/list", 'include_filters': ["/a/"],
+    'min_chars': 200, 'paywall_selector': ".paywall-banner",
+    'date_regex': r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}) ET', 'date_format': "%Y-%m-%d %H:%M",
+}
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+        ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                         NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=ReportFetcher)
+        stages = ArticlePipeline(ctx).run([SITE])
+        report = ctx.report.finish(pipeline=stages.stats(), skipped=dict(ctx.skip_counts))
+        history = os.path.join(tmp_dir, "logs", "run_history.jsonl")
+        RunReport.append_to(report, history)
+        RunReport.append_to(report, history)
+        ctx.state_manager.flush()
+
+        site = report['sites'][0]
+        print(RunReport.summary(report))
+        check("URLs found", site['urls_found'] == len(PAGES))
+        check("fetched and failed counted", site['fetched'] == 5 and site['skipped'].get('fetch_failed') == 1)
+        check("bytes counted", site['bytes'] == sum(len(html.encode()) for html in PAGES.values() if html))
+        check(f"skips by reason ({site['skipped']})",
+              all(site['skipped'].get(reason) == 1 for reason in ('paywall', 'min_chars', 'freshness', 'duplicate_title')))
+        check("insights counted", site['insights'] == len(ctx.all_insights) == 1)
+        check("wall and CPU time per stage",
+              all(stage in site['stages'] for stage in ('discover', 'fetch', 'parse', 'extract', 'analyze'))
+              and site['stages']['analyze']['cpu_seconds'] > 0)
+        check("run-level fields", report['version'] and report['totals']['fetched'] == 5 and report['pipeline'])
+
+        with open(history) as f:
+            lines = [json.loads(line) for line in f]
+        check("reports appended as JSON lines", len(lines) == 2 and lines[0]['sites'][0]['site'] == "Example")
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
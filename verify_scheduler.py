@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from pipeline.scheduler import CrawlScheduler
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+FETCH_SECONDS = 0.05
+ARTICLES_PER_SITE = 20
+
+class SlowFetcher:
+    """Listing of ARTICLES_PER_SITE links; every fetch takes FETCH_SECONDS."""
+
+    cache_hits = 0
+
+    def fetch(self, url):
+        time.sleep(FETCH_SECONDS)
+        host = url.split('/')[2]
+        if url.endswith('/list'):
+            links = "".join(f'<a href="https://{host}/news/{n}">x</a>' for n in range(ARTICLES_PER_SITE))
+            return f"<html><body>{links}</body></html>"
+        return f"<html><body><h1>{url}</h1><p>Short body.</p></body></html>"
+
+def site(name, **extra):
+    return dict({'name': name, 'type': 'page', 'url': f"https://{name}.example.com/list",
+                 'include_filters': ["/news/"], 'max_urls': ARTICLES_PER_SITE}, **extra)
+
+def run(tmp_dir, sites, run_seconds, reserve_seconds=0):
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+    ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                     NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=SlowFetcher)
+    scheduler = CrawlScheduler(run_seconds, reserve_seconds, state_path=os.path.join(tmp_dir, "schedule.json"))
+    started = time.monotonic()
+    ArticlePipeline(ctx, {'site_workers': 1}, scheduler=scheduler).run(sites)
+    elapsed = time.monotonic() - started
+    scheduler.save()
+    ctx.state_manager.flush()
+    return elapsed, ctx, scheduler
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 0.5 s run with 0.2 s kept back: fetching must stop around 0.3 s
+        elapsed, ctx, scheduler = run(tmp_dir, [site("alpha"), site("beta", budget_seconds=0.15)],
+                                      run_seconds=0.5, reserve_seconds=0.2)
+        print(f"Run took {elapsed:.2f}s")
+        check("run stops before the deadline", elapsed < 0.5)
+        fetched = {name: stats['articles'] for name, stats in scheduler.run_stats.items()}
+        carried = {name: len(records) for name, records in scheduler.carryover.items()}
+        check(f"unfetched URLs carried over ({carried})",
+              all(fetched[name] + carried.get(name, 0) == ARTICLES_PER_SITE for name in fetched))
+        check(f"site budget caps a site ({fetched.get('beta')} fetched)", fetched.get('beta', 0) <= 0.15 / FETCH_SECONDS + 1)
+        check("deadline skips counted", ctx.skip_counts['deadline'] == sum(carried.values()))
+
+        with open(os.path.join(tmp_dir, "schedule.json")) as f:
+            state = json.load(f)
+        check("carry-over persisted", sum(len(v) for v in state['carryover'].values()) == sum(carried.values()))
+
+        # Next run, no deadline: the carried URLs are picked up and finished
+        elapsed, ctx, scheduler = run(tmp_dir, [site("alpha"), site("beta", budget_seconds=10)], run_seconds=None)
+        fetched_now = {name: stats['articles'] for name, stats in scheduler.run_stats.items()}
+        check(f"carried URLs processed next run ({fetched_now})", fetched_now == carried)
+        check("nothing left to carry", not scheduler.carryover)
+
+        # Ordering: unmeasured sites first, then by past insights per second
+        scheduler.state['sites'] = {'slow': {'insights': 1, 'seconds': 100}, 'rich': {'insights': 50, 'seconds': 10}}
+        order = [s['name'] for s in scheduler.order_sites([site("slow"), site("rich"), site("new")])]
+        check(f"sites ordered by expected yield ({order})", order == ["new", "rich", "slow"])
+
+        # No time at all: sites are skipped and their old carry-over is kept
+        scheduler = CrawlScheduler(1, reserve_seconds=5, state_path=None)
+        scheduler.state['carryover'] = {'alpha': [{'carried_at': "2099-01-01T00:00:00+00:00", 'record': {'url': "u"}}]}
+        check("site skipped when the deadline has passed", not scheduler.start_site(site("alpha")))
+        scheduler.save()
+        check("skipped site keeps its carry-over", len(scheduler.state['carryover']['alpha']) == 1)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,217 @@
+import datetime
+import os
+import sys
+import tempfile
+import urllib.parse
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.edgar import EdgarFeed, EdgarWatermark
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.state_manager import StateManager
+
+FEED_URL = "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&owner=include"
+USER_AGENT = "Verify Corp alerts@example.com"
+SITE = {'name': "SEC EDGAR Data", 'type': 'sec_edgar', 'url': FEED_URL, 'user_agent': USER_AGENT,
+        'form_types': ["8-K", "6-K"], 'max_urls': 50, 'max_chars': 1500, 'min_chars': 0}
+# Every third filing is an insider Form 4, which the site does not want
+FORMS = ["8-K", "4", "6-K"]
+
+ENTRY = """<entry>
+<title>{form} - Company {n} Inc (000{cik}) ({role})</title>
+<link rel="alternate" type="text/html" href="https://www.sec.gov/Archives/edgar/data/{cik}/{folder}/{accession}-index.htm"/>
+<summary type="html"> &lt;b&gt;Filed:&lt;/b&gt; 2026-10-19 &lt;b&gt;AccNo:&lt;/b&gt; {accession} </summary>
+<updated>{updated}</updated>
+<category scheme="https://www.sec.gov/" label="form type" term="{form}"/>
+<id>urn:tag:sec.gov,2008:accession-number={accession}</id>
+</entry>"""
+INDEX = """<html><body><table class="tableFile" summary="Document Format Files">
+<tr><th>Seq</th><th>Description</th><th>Document</th><th>Type</th><th>Size</th></tr>
+<tr><td>1</td><td>{form}</td><td><a href="{href}">primary.htm</a></td><td>{form}</td><td>40000</td></tr>
+<tr><td>2</td><td>EX-99.1</td><td><a href="/Archives/edgar/data/{cik}/{folder}/ex99.htm">ex99.htm</a></td><td>EX-99.1</td><td></td></tr>
+</table></body></html>"""
+DOCUMENT = """<html><body><div style="display:none"><ix:header><ix:hidden>XBRLFACT{n} 0000{cik} --12-31</ix:hidden></ix:header></div>
+<div><font>Item 8.01 Other Events.</font></div><div>Company {n} Inc (NASDAQ: CO{n}) announced record revenue and raised its
+full-year guidance after strong demand. The board approved a new buyback and analysts upgraded the shares.</div>
+<div>{filler}</div></body></html>"""
+
+
+def accession(n):
+    return f"{1000000 + n:010d}-26-{n:06d}"
+
+
+class EdgarFetcher:
+    """EDGAR stand-in: a current-filings feed, one index page and one primary document per filing."""
+    cache_hits = 0
+
+    def __init__(self):
+        self.headers = {'User-Agent': "Mozilla/5.0"}
+        self.now = datetime.datetime.now(datetime.timezone.utc)
+        # Filing numbers, newest first
+        self.filings = []
+        self.requests = []
+        # Filing numbers whose primary document does not load
+        self.failing = set()
+
+    def publish(self, count):
+        start = max(self.filings, default=-1) + 1
+        self.filings = list(range(start + count - 1, start - 1, -1)) + self.filings
+
+    def updated(self, n):
+        # Accepted ten seconds apart, within the last half hour
+        return (self.now - datetime.timedelta(minutes=30) + datetime.timedelta(seconds=10 * n)).isoformat()
+
+    def fetch(self, url):
+        self.requests.append(url)
+        if "browse-edgar" in url:
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+            start, count = int(query['start']), int(query['count'])
+            entries = []
+            for n in self.filings[start:start + count]:
+                fields = dict(form=FORMS[n % 3], n=n, cik=1000 + n, folder=accession(n).replace('-', ''),
+                              accession=accession(n), updated=self.updated(n))
+                entries.append(ENTRY.format(role="Filer", **fields))
+                if n % 5 == 0:
+                    # Listed once more for the subject company of the same filing
+                    entries.append(ENTRY.format(role="Subject", **fields))
+            return ('<?xml version="1.0" encoding="ISO-8859-1" ?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+                    "<title>Latest Filings</title>" + "".join(entries) + "</feed>")
+        path = urllib.parse.urlsplit(url).path
+        cik, folder = path.split('/')[4:6]
+        n = int(cik) - 1000
+        if path.endswith("-index.htm"):
+            document = f"/Archives/edgar/data/{cik}/{folder}/primary.htm"
+            # Inline XBRL filings link their document through the viewer
+            href = f"/ix?doc={document}" if n % 2 else document
+            return INDEX.format(form=FORMS[n % 3], href=href, cik=cik, folder=folder)
+        if path.endswith("/primary.htm"):
+            if n in self.failing:
+                return None
+            return DOCUMENT.format(n=n, cik=cik, filler=" ".join(f"paragraph{n}x{k}" for k in range(2000)))
+        return None
+
+    def fetched(self, suffix):
+        return [url for url in self.requests if url.endswith(suffix)]
+
+
+def run(tmp_dir, fetcher, watermark=None):
+    # One state database: later runs see what earlier ones processed
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+    ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                     NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=lambda: fetcher)
+    fetcher.requests = []
+    ArticlePipeline(ctx, watermark=watermark).run([SITE])
+    ctx.state_manager.flush()
+    return ctx
+
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    fetcher = EdgarFetcher()
+    fetcher.publish(150)
+    feed = EdgarFeed(fetcher, user_agent=USER_AGENT)
+    check("declared User-Agent", fetcher.headers['User-Agent'] == USER_AGENT)
+
+    # Feed parsing: one record per accession number, acceptance time aware
+    page_url = EdgarFeed.page_url(FEED_URL, 100)
+    query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(page_url).query))
+    check("feed page URL", query == {'action': 'getcurrent', 'owner': 'include', 'output': 'atom',
+                                     'count': '100', 'start': '100'})
+    entries = EdgarFeed.parse_feed(fetcher.fetch(EdgarFeed.page_url(FEED_URL)))
+    check(f"one record per filing ({len(entries)})", len(entries) == 100
+          and len({e['accession'] for e in entries}) == 100)
+    first = entries[0]
+    check("record fields", first['accession'] == accession(149) and first['form'] == FORMS[149 % 3]
+          and first['url'].endswith(f"{accession(149)}-index.htm") and first['published_at'].tzinfo is not None
+          and accession(149) in first['title'])
+    check("bad feed gives nothing", EdgarFeed.parse_feed("<not xml") == [] and EdgarFeed.parse_feed(None) == [])
+
+    # Index page -> primary document, inline XBRL viewer link unwrapped
+    for entry, n in zip(entries, (149, 148)):
+        document = feed.primary_document_url(fetcher.fetch(entry['url']), entry['url'])
+        check(f"primary document of {'an inline XBRL' if n % 2 else 'a plain'} filing",
+              document == f"https://www.sec.gov/Archives/edgar/data/{1000 + n}/{accession(n).replace('-', '')}/primary.htm")
+    check("no table, no document", feed.primary_document_url("<html><p>x</p></html>", first['url']) is None)
+
+    # Document text: hidden XBRL facts dropped, cut to the budget
+    text = EdgarFeed.document_text(Parser().parse(DOCUMENT.format(n=7, cik=1007, filler="word " * 5000)), 1500)
+    check("document text", text.startswith("Item 8.01 Other Events.") and "XBRLFACT" not in text and len(text) == 1500)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        watermark_path = os.path.join(tmp_dir, "edgar_watermark.json")
+        watermark = EdgarWatermark(watermark_path)
+        ctx = run(tmp_dir, fetcher, watermark)
+        site = ctx.report.finish()['sites'][0]
+        wanted = [n for n in fetcher.filings if FORMS[n % 3] in SITE['form_types']]
+        print(f"First run: {site['urls_found']} filings listed, {len(ctx.all_insights)} insights, "
+              f"{len(fetcher.requests)} requests")
+        check("filings listed, not the listing page", site['urls_found'] == len(wanted) == 100)
+        check("feed read to its end", sum("browse-edgar" in u for u in fetcher.requests) == 2)
+        check("newest max_urls filings fetched", len(fetcher.fetched("-index.htm")) == SITE['max_urls']
+              and ctx.skip_counts.get('max_urls') == len(wanted) - SITE['max_urls']
+              and {int(u.split('/')[-3]) - 1000 for u in fetcher.fetched("-index.htm")} == set(wanted[:SITE['max_urls']]))
+        check("one primary document per filing", len(fetcher.fetched("/primary.htm")) == SITE['max_urls'])
+        check("exhibits not fetched", not fetcher.fetched("ex99.htm"))
+        check("insights link the filing index", len(ctx.all_insights) == SITE['max_urls']
+              and all(i['source_url'].endswith("-index.htm") for i in ctx.all_insights))
+        check("scored text cut to max_chars", all(len(i['snippet']) <= SITE['max_chars'] for i in ctx.all_insights))
+
+        check("watermark not moved before save", watermark.get(SITE['name']) is None)
+        watermark.save()
+        saved = EdgarWatermark(watermark_path).get(SITE['name'])
+        check("watermark held at the oldest filing left out", saved and saved.isoformat() == fetcher.updated(wanted[-1]))
+
+        # Next run: three new filings; those left out are listed again and processed ones skipped
+        fetcher.publish(3)
+        watermark = EdgarWatermark(watermark_path)
+        ctx = run(tmp_dir, fetcher, watermark)
+        new = [n for n in fetcher.filings[:3] if FORMS[n % 3] in SITE['form_types']]
+        fetched = {int(u.split('/')[-3]) - 1000 for u in fetcher.fetched("/primary.htm")}
+        print(f"Second run: {len(fetcher.requests)} requests, {len(fetched)} filings fetched")
+        check("new and left-out filings fetched", fetched == set((new + wanted[SITE['max_urls']:])[:SITE['max_urls']]))
+        check("processed filings skipped", ctx.skip_counts.get('processed') == SITE['max_urls'])
+        watermark.save()
+        left = wanted[SITE['max_urls'] + SITE['max_urls'] - len(new):]
+        check("watermark still held", watermark.get(SITE['name']).isoformat() == fetcher.updated(left[-1]))
+
+        # A filing whose document fails to load keeps the watermark behind it
+        fetcher.failing = {left[0]}
+        watermark = EdgarWatermark(watermark_path)
+        ctx = run(tmp_dir, fetcher, watermark)
+        watermark.save()
+        check("failed fetch holds the watermark", ctx.skip_counts.get('fetch_failed') == 1
+              and watermark.get(SITE['name']).isoformat() == fetcher.updated(left[0]))
+        fetcher.failing = set()
+        watermark = EdgarWatermark(watermark_path)
+        ctx = run(tmp_dir, fetcher, watermark)
+        watermark.save()
+        check("failed filing fetched next run", fetcher.fetched("/primary.htm")
+              == [f"https://www.sec.gov/Archives/edgar/data/{1000 + left[0]}/{accession(left[0]).replace('-', '')}/primary.htm"])
+        check("watermark caught up", watermark.get(SITE['name']).isoformat() == fetcher.updated(fetcher.filings[0]))
+        fetcher.requests = []
+        ctx = run(tmp_dir, fetcher, EdgarWatermark(watermark_path))
+        check("caught up: one feed page, nothing fetched",
+              sum("browse-edgar" in u for u in fetcher.requests) == 1 and not fetcher.fetched("-index.htm"))
+
+        # Without a watermark processed filings are listed again but not fetched again
+        ctx = run(tmp_dir, fetcher)
+        check("no watermark: processed filings skipped",
+              ctx.skip_counts.get('processed') == len(wanted) + len(new) and not fetcher.fetched("/primary.htm"))
+
+        with open(watermark_path, 'w') as f:
+            f.write("{oops")
+        check("unreadable watermark ignored", EdgarWatermark(watermark_path).get(SITE['name']) is None)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import boto3
+from moto import mock_aws
+from pipeline.article_pipeline import ArticlePipeline
+from pipeline.context import RunContext
+from pipeline.shard import Shard, reduce_shards, resolve_run_id, write_shard
+from processor.analyzer import Analyzer
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.near_duplicates import NearDuplicateIndex
+from storage.shard_store import DirectoryShardStore, open_shard_store
+from storage.state_manager import StateManager
+
+SHARDS = 3
+RUN_ID = "verify-run"
+ARTICLES_PER_SITE = 12
+SITES = [{'name': name, 'type': 'page', 'url': f"https://{name.lower()}.example.com/list", 'include_filters': ["/news/"]}
+         for name in ("Alpha", "Beta", "Gamma", "Delta")]
+WORDS = "market quarter revenue shares board growth product launch demand region price deal".split()
+ARTICLE = """<html><body><h1>{title}</h1>
+<p>{company} (NASDAQ: {ticker}) announced record revenue and raised its full-year guidance after
+strong demand. Analysts upgraded the shares following the quarter beat and the board approved a
+new buyback.</p><p>{filler}</p></body></html>"""
+
+class FakeFetcher:
+    cache_hits = 0
+
+    def fetch(self, url):
+        host = url.split('/')[2]
+        if url.endswith('/list'):
+            return "<html><body>" + "".join(f'<a href="https://{host}/news/{n}">x</a>'
+                                            for n in range(ARTICLES_PER_SITE)) + "</body></html>"
+        n = int(url.rsplit('/', 1)[1])
+        # Every site carries article 0, a wire story: one alert for it however the run is split
+        title = "Shared wire story" if n == 0 else f"{host} story {n}"
+        rng = random.Random(f"{host}/{n}")
+        # Distinct bodies, so no two articles are near-duplicates (that index is per worker)
+        filler = " ".join(f"{rng.choice(WORDS)}{rng.randrange(1000)}" for _ in range(300))
+        company = "Acme0" if n == 0 else f"{host[:4].title()}{n}"
+        return ARTICLE.format(title=title, company=company, ticker=company.upper()[:5], filler=filler)
+
+def run_pipeline(tmp_dir, name, shard=None, sites_config=None):
+    # Shards share one state database, as the documented local command does
+    os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, f"{name}.db")
+    ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), Analyzer(),
+                     NearDuplicateIndex(":memory:"), thresholds=None, fetcher_factory=FakeFetcher)
+    ArticlePipeline(ctx, sites_config, shard=shard).run(SITES)
+    ctx.state_manager.flush()
+    return ctx
+
+def worker(tmp_dir, store_path, run_id, spec, sites_config):
+    """One worker process: its share of the run, results to the shared directory."""
+    shard = Shard.parse(spec)
+    ctx = run_pipeline(tmp_dir, f"shared_{sites_config.get('shard_by')}", shard, sites_config)
+    report = ctx.report.finish()
+    report['skip_counts'] = dict(ctx.skip_counts)
+    write_shard(DirectoryShardStore(store_path), run_id, shard, ctx.all_insights, report)
+
+def run_sharded(tmp_dir, shard_by, run_id=RUN_ID):
+    store_path = os.path.join(tmp_dir, f"store_{shard_by}")
+    processes = [multiprocessing.Process(target=worker, args=(tmp_dir, store_path, run_id, f"{i}/{SHARDS}", {'shard_by': shard_by}))
+                 for i in range(SHARDS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return DirectoryShardStore(store_path), [process.exitcode for process in processes]
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    # Deterministic partition: every key has exactly one owner
+    shards = [Shard.parse(f"{i}/{SHARDS}") for i in range(SHARDS)]
+    urls = [f"https://site{s}.example.com/news/{n}" for s in range(20) for n in range(50)]
+    owners = [[shard.owns(url) for shard in shards].count(True) for url in urls]
+    check("each URL owned by exactly one shard", set(owners) == {1})
+    counts = [sum(shard.owns(url) for url in urls) for shard in shards]
+    check(f"URLs spread evenly ({counts})", min(counts) > len(urls) / SHARDS * 0.8)
+    check("same split every time", [Shard(1, SHARDS).owns(url) for url in urls] == [shards[1].owns(url) for url in urls])
+    for bad in ("3/3", "-1/3", "1", "a/b"):
+        try:
+            Shard.parse(bad)
+            check(f"rejects {bad!r}", False)
+        except ValueError:
+            pass
+    check("no shard for an empty spec", Shard.parse(None) is None and Shard.parse("") is None)
+    os.environ.pop("RUN_ID", None)
+    try:
+        resolve_run_id(None)
+        check("run id required", False)
+    except ValueError:
+        check("run id required", resolve_run_id("r1") == "r1")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        single = run_pipeline(tmp_dir, "single")
+        expected = sorted(i['source_url'] for i in single.all_insights)
+        print(f"Unsharded run: {len(expected)} insights")
+
+        for shard_by in ("url", "site"):
+            store, exit_codes = run_sharded(tmp_dir, shard_by)
+            check(f"[{shard_by}] {SHARDS} worker processes finished", exit_codes == [0] * SHARDS)
+            results = store.get_all(RUN_ID)
+            per_shard = {name: [i['source_url'] for i in payload['insights']] for name, payload in results.items()}
+            print(f"[{shard_by}] insights per shard: {[len(v) for v in per_shard.values()]}")
+            all_urls = [url for found in per_shard.values() for url in found]
+            check(f"[{shard_by}] no article processed by two shards", len(set(all_urls)) == len(all_urls))
+            if shard_by == 'site':
+                sites_per_shard = [{url.split('/')[2] for url in found} for found in per_shard.values()]
+                check("[site] each site handled by one shard",
+                      sum(len(hosts) for hosts in sites_per_shard) == len(set().union(*sites_per_shard)) == len(SITES))
+
+            sent = []
+            summary = reduce_shards(store, RUN_ID, SHARDS, notify=sent.append)
+            print(f"[{shard_by}] reduce: {summary}")
+            check(f"[{shard_by}] reduce sends once", len(sent) == 1 and summary['sent'] and not summary['missing'])
+            merged = sorted(i['source_url'] for i in sent[0])
+            check(f"[{shard_by}] same insights as the unsharded run (wire story kept once)",
+                  len(merged) == len(expected) and sum(1 for u in merged if u.endswith("/news/0")) == 1
+                  and set(u for u in merged if not u.endswith("/news/0")) == set(u for u in expected if not u.endswith("/news/0")))
+            check(f"[{shard_by}] merged insights are dict-like",
+                  all(i['likelihood_score'] == i.get('likelihood_score') for i in sent[0]))
+            again = reduce_shards(store, RUN_ID, SHARDS, notify=sent.append)
+            check(f"[{shard_by}] second reduce does not send again", len(sent) == 1 and not again['sent'])
+
+            # The next run, against the same shared state database, skips every URL
+            store, exit_codes = run_sharded(tmp_dir, shard_by, run_id=f"{RUN_ID}-again")
+            results = store.get_all(f"{RUN_ID}-again")
+            skipped = sum(payload['report']['skip_counts'].get('processed', 0) for payload in results.values())
+            check(f"[{shard_by}] next run on the shared state skips every URL ({skipped})",
+                  exit_codes == [0] * SHARDS and len(results) == SHARDS
+                  and not any(payload['insights'] for payload in results.values())
+                  and skipped == len(SITES) * ARTICLES_PER_SITE)
+
+        # A reduce before any worker wrote sends nothing and does not block a later one
+        store = open_shard_store(os.path.join(tmp_dir, "early"))
+        sent = []
+        summary = reduce_shards(store, RUN_ID, 2, notify=sent.append)
+        check("early reduce sends nothing", not sent and not summary['sent'] and summary['shards'] == 0)
+        write_shard(store, RUN_ID, Shard(0, 2), single.all_insights[:2])
+        write_shard(store, RUN_ID, Shard(1, 2), single.all_insights[2:4])
+        check("reduce after the workers still sends", reduce_shards(store, RUN_ID, 2, notify=sent.append)['sent']
+              and len(sent) == 1 and len(sent[0]) == 4)
+
+        # A worker that never reported is named, and the rest still go out
+        store = open_shard_store(os.path.join(tmp_dir, "partial"))
+        write_shard(store, RUN_ID, Shard(0, 2), single.all_insights[:2])
+        sent = []
+        summary = reduce_shards(store, RUN_ID, 2, notify=sent.append)
+        check("missing shard reported", summary['missing'] == [Shard(1, 2).name] and len(sent[0]) == 2)
+
+    # The object-store variant (what a Lambda worker uses), against moto: no AWS account needed
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket="shards-test")
+        store = open_shard_store("s3://shards-test/runs")
+        for shard in (Shard(0, 2), Shard(1, 2)):
+            write_shard(store, RUN_ID, shard, single.all_insights[shard.index::2])
+        sent = []
+        summary = reduce_shards(store, RUN_ID, 2, notify=sent.append)
+        check(f"S3 store: reduce merges both shards ({summary['insights']})",
+              summary['shards'] == 2 and len(sent[0]) == len(single.all_insights))
+        check("S3 store: sent once", not reduce_shards(store, RUN_ID, 2, notify=sent.append)['sent'] and len(sent) == 1)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
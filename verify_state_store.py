@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from storage.bloom import BloomFilter
+from storage.local_store import SQLiteStateStore, url_hash
+
+def verify():
+    failed = False
+
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "processed_urls.db")
+        json_path = os.path.join(tmp_dir, "processed_urls.json")
+
+        # Legacy JSON state is imported once and moved aside
+        with open(json_path, 'w') as f:
+            json.dump(["https://example.com/a", "https://example.com/b"], f)
+        store = SQLiteStateStore(db_path, batch_size=3, legacy_json_path=json_path)
+        check("legacy JSON migrated", store.migrated_count == 2 and store.contains("https://example.com/a"))
+        check("legacy JSON moved aside", not os.path.exists(json_path) and os.path.exists(json_path + ".migrated"))
+
+        # Marks are visible immediately but only committed in batches
+        store.add("https://example.com/c")
+        store.add("https://example.com/d")
+        check("buffered marks are visible", store.contains("https://example.com/d"))
+        check("partial batch not yet committed", len(store.pending) == 2)
+        store.add("https://example.com/e")
+        check("full batch committed", not store.pending)
+
+        # Old entries are compacted away on open
+        store.add("https://example.com/old", processed_at=time.time() - 40 * 86400)
+        store.close()
+        reopened = SQLiteStateStore(db_path, retention_days=30, legacy_json_path=json_path)
+        check("expired entry compacted", reopened.compacted_count == 1 and not reopened.contains("https://example.com/old"))
+        check("recent entries kept", reopened.count() == 5)
+
+        # Bloom front: compaction rebuilt it without the expired key
+        check("Bloom filter rebuilt on compaction",
+              url_hash("https://example.com/a") in reopened.bloom
+              and url_hash("https://example.com/old") not in reopened.bloom)
+        fresh = [f"https://example.com/fresh/{i}" for i in range(100)]
+        check("new URLs answered by the filter",
+              reopened.filter_unprocessed(fresh + ["https://example.com/a"]) == fresh
+              and reopened.bloom_stats.skipped >= 99)
+        reopened.close()
+
+        # Two writers on one database: neither overwrites the other's keys in the stored filter
+        shared_path = os.path.join(tmp_dir, "shared.db")
+        store_a = SQLiteStateStore(shared_path, batch_size=1, legacy_json_path=None)
+        store_b = SQLiteStateStore(shared_path, batch_size=1, legacy_json_path=None)
+        store_a.add("https://x.com/a1")
+        store_b.add("https://x.com/b1")
+        store_a.add("https://x.com/a2")
+        store_a.close()
+        store_b.close()
+        shared = SQLiteStateStore(shared_path, legacy_json_path=None)
+        urls = ["https://x.com/a1", "https://x.com/b1", "https://x.com/a2"]
+        check("shared store keeps every writer's keys",
+              shared.count() == 3 and shared.filter_unprocessed(urls) == [])
+        shared.close()
+
+    # Measured false-positive rate stays near the configured target
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(url_hash(f"seen-{i}"))
+    false_positives = sum(url_hash(f"unseen-{i}") in bloom for i in range(20000)) / 20000
+    restored = BloomFilter.from_bytes(bloom.to_bytes())
+    check(f"Bloom FPR {false_positives:.3%} (estimated {bloom.estimated_fpr():.3%})", false_positives < 0.02)
+    check("Bloom filter round-trips", url_hash("seen-1") in restored and restored.count == 10000)
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()
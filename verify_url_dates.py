@@ -0,0 +1,69 @@
+import datetime
+import os
+import sys
+import tempfile
+from pipeline.article_pipeline import ArticlePipeline, url_date_is_stale
+from pipeline.context import RunContext
+from scraper.canonicalizer import UrlCanonicalizer
+from scraper.parser import Parser
+from storage.state_manager import StateManager
+
+STOCKWATCH = {
+    'name': "StockWatch", 'url_date_regex': r'-(\d{8})/', 'url_date_format': "%Y%m%d",
+}
+BUSINESSWIRE = {
+    'name': "BusinessWire", 'url_date_regex': r'/(\d{8})\d+/', 'url_date_format': "%Y%m%d",
+    'mark_stale_urls': True,
+}
+
+def stockwatch_url(day, item):
+    return f"https://www.stockwatch.com/News/Item/U-by{item}-U!SPTY-{day:%Y%m%d}/U/SPTY"
+
+def businesswire_url(day, item):
+    return f"https://www.businesswire.com/news/home/{day:%Y%m%d}{item:06d}/en/Acme-Announces"
+
+def verify():
+    failed = False
+    def check(name, condition):
+        nonlocal failed
+        failed |= not condition
+        print(f"{'OK' if condition else 'FAIL'}: {name}")
+
+    hour = datetime.timedelta(hours=1)
+    now = datetime.datetime(2026, 3, 10, 9, 30)
+    day = datetime.datetime(2026, 3, 9)
+    check("yesterday is not provably stale at 09:30 (time zones)", not url_date_is_stale(day, "%Y%m%d", hour, now=now))
+    check("two days ago is stale", url_date_is_stale(day - datetime.timedelta(days=1), "%Y%m%d", hour, now=now))
+    check("timestamped URL uses its time",
+          url_date_is_stale(datetime.datetime(2026, 3, 10, 8, 0), "%Y%m%d%H%M", hour, now=now)
+          and not url_date_is_stale(datetime.datetime(2026, 3, 10, 9, 0), "%Y%m%d%H%M", hour, now=now))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["STATE_DB_PATH"] = os.path.join(tmp_dir, "state.db")
+        ctx = RunContext(Parser(), UrlCanonicalizer(), StateManager(), None, None, thresholds=None)
+        pipeline = ArticlePipeline(ctx)
+
+        today = datetime.datetime.now()
+        old = today - datetime.timedelta(days=3)
+        fresh = [stockwatch_url(today, 1), stockwatch_url(today, 2), "https://www.stockwatch.com/News/Item/undated"]
+        stale = [stockwatch_url(old, 3), stockwatch_url(old, 4)]
+        kept = pipeline.drop_stale_urls(STOCKWATCH, fresh + stale)
+        check(f"StockWatch: stale URLs dropped before fetch ({len(fresh + stale) - len(kept)})", kept == fresh)
+        check("stale URLs not marked processed by default", not ctx.state_manager.is_processed(stale[0]))
+
+        bw_stale = businesswire_url(old, 1)
+        bw_fresh = businesswire_url(today, 2)
+        kept = pipeline.drop_stale_urls(BUSINESSWIRE, [bw_stale, bw_fresh])
+        check("BusinessWire: stale URL dropped", kept == [bw_fresh])
+        check("mark_stale_urls marks them processed", ctx.state_manager.is_processed(bw_stale))
+
+        check("sites without url_date_regex untouched", pipeline.drop_stale_urls({'name': "Other"}, stale) == stale)
+        check(f"savings counted ({ctx.skip_counts['stale_url_date']})", ctx.skip_counts['stale_url_date'] == 3)
+        ctx.state_manager.flush()
+
+    if failed:
+        sys.exit(1)
+    print("Verification Passed!")
+
+if __name__ == "__main__":
+    verify()